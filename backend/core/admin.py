@@ -12,3 +12,23 @@ from .models import AuditLog
 class AuditLogAdmin(admin.ModelAdmin):
     list_display = ('timestamp','user','action','model','object_id')
     readonly_fields = ('user','action','model','object_id','timestamp','changes')
+
+from .models import SubmissionEvent
+@admin.register(SubmissionEvent)
+class SubmissionEventAdmin(admin.ModelAdmin):
+    list_display = ('timestamp','submission','event_type','actor')
+    readonly_fields = ('submission','event_type','actor','comment','timestamp')
+
+from .models import OutboundEmail
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('created_at','subject','status','attempts','next_attempt_at','sent_at')
+    list_filter = ('status',)
+    readonly_fields = ('to','subject','body','from_email','attempts','last_error','created_at','sent_at')
+
+from .models import JobRun
+@admin.register(JobRun)
+class JobRunAdmin(admin.ModelAdmin):
+    list_display = ('job','status','started_at','duration_ms','rows','worker')
+    list_filter = ('job','status')
+    readonly_fields = ('job','status','started_at','finished_at','duration_ms','rows','error','worker')
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+
+    def ready(self):
+        # Sinais de invalidação do cache de papéis, da lista de revogação, do
+        # acompanhamento de atrasos, do stream e dos contadores de notificações
+        from . import authentication, notification_counters, notification_stream, overdue, roles  # noqa: F401
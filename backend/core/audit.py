@@ -0,0 +1,163 @@
+"""
+Audit log com gravação em lote
+
+Os eventos registrados durante uma requisição ficam em um buffer e são
+gravados com um único bulk_create quando a resposta é gerada
+(AuditBufferMiddleware). Eventos registrados dentro de transaction.atomic()
+só entram no buffer se a transação for confirmada (transaction.on_commit),
+como acontecia com o insert direto.
+
+Com settings.AUDIT_ASYNC=True o lote é entregue a uma thread em segundo
+plano em vez de ser gravado na própria requisição.
+
+Fora de uma requisição (management commands, shell) cada evento é gravado
+imediatamente (após o commit, se houver transação).
+"""
+import atexit
+import contextvars
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_buffer = contextvars.ContextVar('audit_buffer', default=None)
+
+
+def _user_id(user):
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return None
+    return user.pk
+
+
+def log(user, action, model, object_id, changes=None):
+    """
+    Registra um evento no audit log e retorna o AuditLog (ainda não salvo
+    enquanto estiver no buffer). O timestamp é definido no registro.
+    """
+    from .models import AuditLog
+
+    entry = AuditLog(
+        user_id=_user_id(user),
+        action=action,
+        model=model,
+        object_id=str(object_id),
+        timestamp=timezone.now(),
+        changes=changes if changes is not None else {},
+    )
+
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _enqueue([entry]))
+    else:
+        _enqueue([entry])
+    return entry
+
+
+def log_instance(user, action, instance, changes=None):
+    """Registra um evento referente a uma instância de model"""
+    return log(user, action, instance.__class__.__name__, getattr(instance, 'pk', None), changes)
+
+
+def _enqueue(entries):
+    buffer = _buffer.get()
+    if buffer is None:
+        write(entries)
+    else:
+        buffer.extend(entries)
+
+
+def write(entries):
+    """Grava um lote de eventos (ou entrega ao writer em segundo plano)"""
+    if not entries:
+        return
+    if settings.AUDIT_ASYNC:
+        _get_writer().submit(entries)
+        return
+    from .models import AuditLog
+    try:
+        AuditLog.objects.bulk_create(entries)
+    except Exception:
+        # Falha de auditoria não deve derrubar a operação principal
+        logger.exception('Falha ao gravar %d evento(s) de auditoria', len(entries))
+
+
+class AuditBufferMiddleware:
+    """Acumula os eventos da requisição e grava todos de uma vez no final"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _buffer.set([])
+        try:
+            response = self.get_response(request)
+        finally:
+            entries = _buffer.get()
+            _buffer.reset(token)
+            write(entries)
+        return response
+
+
+class AuditWriter:
+    """Thread que grava lotes de eventos fora do ciclo da requisição"""
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def submit(self, entries):
+        for entry in entries:
+            self.queue.put(entry)
+
+    def _drain(self, first):
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self.queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        from .models import AuditLog
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            batch = self._drain(item)
+            try:
+                AuditLog.objects.bulk_create(batch)
+            except Exception:
+                logger.exception('Falha ao gravar %d evento(s) de auditoria', len(batch))
+            finally:
+                close_old_connections()
+
+    def stop(self, timeout=5):
+        """Grava o que estiver na fila e encerra a thread"""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AuditWriter()
+        return _writer
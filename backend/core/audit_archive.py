@@ -0,0 +1,333 @@
+"""
+Arquivo morto do AuditLog
+
+Entradas mais antigas que settings.AUDIT_RETENTION_DAYS saem da tabela e vão
+para arquivos mensais JSON-lines comprimidos em settings.AUDIT_ARCHIVE_DIR:
+
+    2025-01.jsonl.gz     eventos do mês em blocos (membros gzip concatenados,
+                         o arquivo inteiro continua legível com zcat)
+    2025-01.index.json   contagens por usuário, model e usuário+model do mês
+                         e de cada bloco, com sua posição (offset, length) e
+                         faixa de ids
+
+Cada execução acrescenta blocos ao fim do arquivo em vez de regravá-lo. Por
+bloco: bytes gravados e sincronizados em disco -> índice trocado com
+os.replace -> DELETE das entradas do bloco. Só o índice define o que está
+arquivado: bytes após o último bloco indexado (queda no meio da escrita) são
+descartados na execução seguinte, e entradas de um bloco indexado que ainda
+estão na tabela (queda antes do DELETE) são reconhecidas pela faixa de ids e
+não são gravadas de novo.
+
+audit_history() junta a tabela e o arquivo morto em uma única sequência
+(mais recentes primeiro) que pode ser paginada como um queryset. O arquivo
+só é lido quando a página pedida passa do fim da tabela, e as contagens do
+índice permitem pular meses e blocos sem eventos do filtro: uma página
+descomprime apenas os blocos em que cai (até batch_size entradas cada, em
+ordem decrescente). Os blocos ficam na ordem em que foram arquivados, que é
+a do timestamp, já que as entradas recebem a hora em que são criadas.
+"""
+import gzip
+import json
+import os
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import AuditLog
+
+FIELDS = ('id', 'user_id', 'action', 'model', 'object_id', 'timestamp', 'changes')
+
+
+def _archive_dir():
+    return str(settings.AUDIT_ARCHIVE_DIR)
+
+
+def _data_path(month):
+    return os.path.join(_archive_dir(), f'{month}.jsonl.gz')
+
+
+def _index_path(month):
+    return os.path.join(_archive_dir(), f'{month}.index.json')
+
+
+def archived_months():
+    """Meses arquivados (AAAA-MM), do mais recente para o mais antigo"""
+    if not os.path.isdir(_archive_dir()):
+        return []
+    months = [name[:-len('.index.json')] for name in os.listdir(_archive_dir()) if name.endswith('.index.json')]
+    return sorted(months, reverse=True)
+
+
+def _empty_counts():
+    return {'count': 0, 'users': {}, 'models': {}, 'user_models': {}}
+
+
+def _empty_index(month):
+    return {'month': month, 'parts': [], **_empty_counts()}
+
+
+def read_index(month):
+    try:
+        with open(_index_path(month), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return _empty_index(month)
+
+
+def _write_index(month, index):
+    tmp_path = _index_path(month) + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, _index_path(month))
+
+
+def _serialize(row):
+    data = {field: row[field] for field in FIELDS}
+    data['timestamp'] = row['timestamp'].isoformat()
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _count(counts, row):
+    counts['count'] += 1
+    user_key = str(row['user_id'])
+    counts['users'][user_key] = counts['users'].get(user_key, 0) + 1
+    counts['models'][row['model']] = counts['models'].get(row['model'], 0) + 1
+    pair_key = f"{user_key}|{row['model']}"
+    counts['user_models'][pair_key] = counts['user_models'].get(pair_key, 0) + 1
+
+
+def _read_part(month, part):
+    """Entradas de um bloco (mais recentes primeiro), lendo só os bytes dele"""
+    with open(_data_path(month), 'rb') as f:
+        f.seek(part['offset'])
+        data = gzip.decompress(f.read(part['length']))
+    return [json.loads(line) for line in data.decode('utf-8').splitlines() if line.strip()]
+
+
+def _archived_ids(month, index, ids):
+    """Quais de `ids` já estão em blocos do índice (lê só blocos cuja faixa de ids os alcança)"""
+    low, high = min(ids), max(ids)
+    found = set()
+    for part in index['parts']:
+        if part['min_id'] <= high and part['max_id'] >= low:
+            found.update(row['id'] for row in _read_part(month, part) if row['id'] in ids)
+    return found
+
+
+def _append_part(month, index, rows):
+    """Grava um bloco no fim do arquivo do mês e o registra em index (o índice é gravado depois)"""
+    rows = sorted(rows, key=lambda row: (row['timestamp'], row['id']), reverse=True)
+    data = gzip.compress(''.join(_serialize(row) + '\n' for row in rows).encode('utf-8'))
+
+    parts = index['parts']
+    offset = parts[-1]['offset'] + parts[-1]['length'] if parts else 0
+    path = _data_path(month)
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+        # Descarta bytes de uma escrita interrompida que não chegou ao índice
+        f.truncate(offset)
+        f.seek(offset)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+    ids = [row['id'] for row in rows]
+    part = {'offset': offset, 'length': len(data), 'min_id': min(ids), 'max_id': max(ids), **_empty_counts()}
+    for row in rows:
+        _count(part, row)
+        _count(index, row)
+    parts.append(part)
+
+
+def archive_month(month, cutoff, batch_size=1000):
+    """
+    Move para o arquivo do mês (AAAA-MM) as entradas anteriores a cutoff, em
+    blocos de até batch_size entradas. Retorna a quantidade de entradas
+    removidas da tabela; só saem da tabela entradas que já estão no índice.
+    """
+    year, mon = (int(part) for part in month.split('-'))
+    start = datetime(year, mon, 1)
+    end = datetime(year + (mon == 12), mon % 12 + 1, 1)
+
+    rows = AuditLog.objects.filter(
+        timestamp__gte=start, timestamp__lt=min(end, cutoff)
+    ).order_by('timestamp', 'id').values(*FIELDS)
+
+    os.makedirs(_archive_dir(), exist_ok=True)
+    index = read_index(month)
+
+    deleted = 0
+    while True:
+        batch = list(rows[:batch_size])
+        if not batch:
+            break
+        ids = {row['id'] for row in batch}
+        already_archived = _archived_ids(month, index, ids)
+        new_rows = [row for row in batch if row['id'] not in already_archived]
+        if new_rows:
+            _append_part(month, index, new_rows)
+            _write_index(month, index)
+        with transaction.atomic():
+            deleted += AuditLog.objects.filter(id__in=ids).delete()[0]
+    return deleted
+
+
+def archive_before(cutoff, batch_size=1000):
+    """Arquiva todos os meses com entradas anteriores a cutoff. Retorna {mês: removidas}"""
+    months = AuditLog.objects.filter(timestamp__lt=cutoff).dates('timestamp', 'month')
+    return {
+        month.strftime('%Y-%m'): archive_month(month.strftime('%Y-%m'), cutoff, batch_size)
+        for month in months
+    }
+
+
+class AuditHistory:
+    """
+    Sequência (mais recentes primeiro) de eventos da tabela + arquivo morto.
+
+    Suporta len()/count() e fatiamento, então pode ser passada para o
+    Paginator do Django ou para as classes de paginação do DRF. Os itens são
+    dicts com os campos de AuditLog, timestamp como datetime e 'archived'.
+    """
+
+    def __init__(self, user_id=None, model=None, object_id=None):
+        self.user_id = user_id
+        self.model = model
+        self.object_id = str(object_id) if object_id is not None else None
+
+        self.queryset = AuditLog.objects.all()
+        if user_id is not None:
+            self.queryset = self.queryset.filter(user_id=user_id)
+        if model is not None:
+            self.queryset = self.queryset.filter(model=model)
+        if self.object_id is not None:
+            self.queryset = self.queryset.filter(object_id=self.object_id)
+        self.queryset = self.queryset.order_by('-timestamp', '-id')
+
+        self._hot_count = None
+        self._indexes = {}
+        self._month_counts = {}
+        self._part_counts = {}
+        self._part_rows = {}
+
+    def _matches(self, row):
+        return (
+            (self.user_id is None or row['user_id'] == self.user_id) and
+            (self.model is None or row['model'] == self.model) and
+            (self.object_id is None or row['object_id'] == self.object_id)
+        )
+
+    def _index(self, month):
+        if month not in self._indexes:
+            self._indexes[month] = read_index(month)
+        return self._indexes[month]
+
+    def _indexed_count(self, counts):
+        """Quantidade que atende ao filtro pelas contagens do índice (None: object_id exige ler o bloco)"""
+        if self.object_id is not None:
+            if self.model is not None and not counts['models'].get(self.model):
+                return 0
+            return None
+        if self.user_id is not None and self.model is not None:
+            return counts['user_models'].get(f'{self.user_id}|{self.model}', 0)
+        if self.user_id is not None:
+            return counts['users'].get(str(self.user_id), 0)
+        if self.model is not None:
+            return counts['models'].get(self.model, 0)
+        return counts['count']
+
+    def _archived_rows(self, month, part_number):
+        """Entradas do bloco que atendem ao filtro, já em ordem decrescente"""
+        key = (month, part_number)
+        if key not in self._part_rows:
+            rows = [
+                row for row in _read_part(month, self._index(month)['parts'][part_number])
+                if self._matches(row)
+            ]
+            for row in rows:
+                row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+                row['archived'] = True
+            self._part_rows[key] = rows
+        return self._part_rows[key]
+
+    def _part_count(self, month, part_number):
+        key = (month, part_number)
+        if key not in self._part_counts:
+            count = self._indexed_count(self._index(month)['parts'][part_number])
+            if count is None:
+                count = len(self._archived_rows(month, part_number))
+            self._part_counts[key] = count
+        return self._part_counts[key]
+
+    def _month_count(self, month):
+        """Quantidade de eventos do mês que atendem ao filtro (pelo índice, se possível)"""
+        if month not in self._month_counts:
+            count = self._indexed_count(self._index(month))
+            if count is None:
+                count = sum(
+                    self._part_count(month, part_number)
+                    for part_number in range(len(self._index(month)['parts']))
+                )
+            self._month_counts[month] = count
+        return self._month_counts[month]
+
+    def hot_count(self):
+        if self._hot_count is None:
+            self._hot_count = self.queryset.count()
+        return self._hot_count
+
+    def count(self):
+        return self.hot_count() + sum(self._month_count(month) for month in archived_months())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            items = self[key:key + 1]
+            if not items:
+                raise IndexError(key)
+            return items[0]
+
+        start = key.start or 0
+        stop = key.stop if key.stop is not None else self.count()
+        if stop <= start:
+            return []
+
+        items = []
+        hot_count = self.hot_count()
+        if start < hot_count:
+            for row in self.queryset[start:min(stop, hot_count)].values(*FIELDS):
+                row['archived'] = False
+                items.append(row)
+
+        # Parte da página que está no arquivo morto: pula meses e blocos pelas
+        # contagens e descomprime só os blocos em que a página cai
+        offset = max(start - hot_count, 0)
+        remaining = stop - max(start, hot_count)
+        for month in archived_months():
+            if remaining <= 0:
+                break
+            month_count = self._month_count(month)
+            if offset >= month_count:
+                offset -= month_count
+                continue
+            for part_number in reversed(range(len(self._index(month)['parts']))):
+                if remaining <= 0:
+                    break
+                part_count = self._part_count(month, part_number)
+                if offset >= part_count:
+                    offset -= part_count
+                    continue
+                rows = self._archived_rows(month, part_number)[offset:offset + remaining]
+                items.extend(rows)
+                remaining -= len(rows)
+                offset = 0
+        return items
+
+
+def audit_history(user_id=None, model=None, object_id=None):
+    """Histórico de auditoria (tabela + arquivo morto), mais recentes primeiro"""
+    return AuditHistory(user_id=user_id, model=model, object_id=object_id)
@@ -0,0 +1,152 @@
+"""
+Autenticação JWT sem consulta ao banco por requisição
+
+ClaimsJWTAuthentication monta o usuário a partir das claims do access token
+(user_id, username, is_superuser, roles - ver core/roles.py). O registro
+completo de User só é carregado se a view acessar outro atributo ou usar o
+usuário em uma consulta/atribuição do ORM.
+
+Usuários desativados ou excluídos entram em uma lista de revogação
+(cache, recarregada do banco a cada settings.JWT_REVOCATION_CACHE_SECONDS) e
+seus tokens deixam de ser aceitos.
+
+Ativado com JWT_STATELESS_AUTH=True (settings.py).
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .roles import ROLE_CLAIM
+
+REVOKED_CACHE_KEY = 'jwt_revoked_users'
+DELETED_CACHE_KEY = 'jwt_deleted_users'
+
+
+def revoked_user_ids():
+    """IDs de usuários cujos tokens não devem mais ser aceitos"""
+    revoked = cache.get(REVOKED_CACHE_KEY)
+    if revoked is None:
+        revoked = frozenset(User.objects.filter(is_active=False).values_list('id', flat=True))
+        cache.set(REVOKED_CACHE_KEY, revoked, settings.JWT_REVOCATION_CACHE_SECONDS)
+    deleted = cache.get(DELETED_CACHE_KEY) or frozenset()
+    return revoked | deleted
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    Usuário vindo do token. id/pk, username, is_superuser e papéis são lidos
+    das claims; qualquer outro acesso carrega o User do banco.
+    """
+
+    def __init__(self, token):
+        claims = {
+            'id': token[api_settings.USER_ID_CLAIM],
+            'username': token.get('username'),
+            'is_superuser': token.get('is_superuser'),
+            'roles': frozenset(token[ROLE_CLAIM]) if ROLE_CLAIM in token else None,
+        }
+        self.__dict__['_claims'] = claims
+        super().__init__(lambda: self._load_user(claims['id']))
+
+    @staticmethod
+    def _load_user(user_id):
+        try:
+            return User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist:
+            raise AuthenticationFailed('Usuário não encontrado', code='user_not_found')
+
+    def _claim(self, name):
+        value = self.__dict__['_claims'].get(name)
+        if value is None or self._wrapped is not empty:
+            return getattr(self._get_wrapped(), name)
+        return value
+
+    def _get_wrapped(self):
+        if self._wrapped is empty:
+            self._setup()
+        return self._wrapped
+
+    @property
+    def id(self):
+        return self.__dict__['_claims']['id']
+
+    @property
+    def pk(self):
+        return self.__dict__['_claims']['id']
+
+    @property
+    def username(self):
+        return self._claim('username')
+
+    @property
+    def is_superuser(self):
+        return self._claim('is_superuser')
+
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
+    @property
+    def is_active(self):
+        # Usuários inativos são barrados na autenticação (lista de revogação)
+        return True
+
+    @property
+    def _roles(self):
+        roles = self.__dict__.get('_resolved_roles')
+        return roles if roles is not None else self.__dict__['_claims']['roles']
+
+    def __setattr__(self, name, value):
+        if name == '_roles':
+            # get_user_roles guarda o resultado aqui sem carregar o User
+            self.__dict__['_resolved_roles'] = value
+        else:
+            super().__setattr__(name, value)
+
+    def __bool__(self):
+        return True
+
+    def __str__(self):
+        return self.username or ''
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication que não consulta o banco para montar request.user"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token não contém identificação do usuário')
+
+        if user_id in revoked_user_ids():
+            raise AuthenticationFailed('Usuário inativo', code='user_inactive')
+
+        return ClaimsUser(validated_token)
+
+
+@receiver(post_save, sender=User)
+def _user_saved(sender, instance, **kwargs):
+    # Ativação/desativação: recarregar a lista na próxima requisição
+    cache.delete(REVOKED_CACHE_KEY)
+
+
+@receiver(post_delete, sender=User)
+def _user_deleted(sender, instance, **kwargs):
+    # Excluídos não aparecem na consulta de inativos: manter até o token expirar
+    deleted = cache.get(DELETED_CACHE_KEY) or frozenset()
+    cache.set(
+        DELETED_CACHE_KEY,
+        deleted | {instance.pk},
+        int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    )
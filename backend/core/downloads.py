@@ -0,0 +1,171 @@
+"""
+Entrega de arquivos (recibos e anexos) após a autorização
+
+Modos (settings.ATTACHMENT_DOWNLOAD_MODE):
+- django: o próprio worker envia o arquivo, com suporte a Range, ETag e
+  If-None-Match
+- x-accel-redirect: o nginx envia o arquivo a partir de uma location interna
+- x-sendfile: o Apache/lighttpd envia o arquivo (mod_xsendfile)
+
+Com armazenamento S3 (sem caminho local) é retornada uma URL assinada de curta
+duração, independente do modo.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import content_disposition_header, http_date, parse_etags
+
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def receipt_filename(submission):
+    """Nome original do recibo (gravado no upload), sem acessar o storage"""
+    return submission.receipt_filename or os.path.basename(submission.receipt_file.name)
+
+
+def attachment_download_url(submission_id, attachment_id):
+    """URL autenticada de download (download_attachment), sem acessar o storage"""
+    return reverse('download_attachment', kwargs={
+        'submission_id': submission_id,
+        'attachment_id': attachment_id
+    })
+
+
+def _local_path(field_file):
+    """Caminho local do arquivo ou None se o storage não for local"""
+    try:
+        return field_file.path
+    except NotImplementedError:
+        return None
+
+
+def _signed_url_response(field_file, filename):
+    """URL assinada de curta duração para arquivos no S3"""
+    from storages.backends.s3boto3 import S3Boto3Storage
+
+    expire = settings.ATTACHMENT_SIGNED_URL_EXPIRE
+    storage = S3Boto3Storage(querystring_auth=True, querystring_expire=expire)
+    url = storage.url(field_file.name, parameters={
+        'ResponseContentDisposition': content_disposition_header(True, filename),
+    })
+    return JsonResponse({'url': url, 'filename': filename, 'expires_in': expire})
+
+
+def _etag(stat):
+    return f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+
+def _file_iterator(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _parse_range(header, size):
+    """
+    Interpreta um cabeçalho Range com um único intervalo de bytes.
+    Retorna (início, fim) inclusivos, None se o cabeçalho deve ser ignorado
+    ou False se o intervalo não é satisfazível.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N: últimos N bytes (arquivo vazio não tem nenhum)
+        length = int(last)
+        if length == 0 or size == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def _ranged_file_response(request, path, filename, content_type):
+    """Resposta em processo com ETag, If-None-Match e Range"""
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = _etag(stat)
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        return response
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header:
+        # If-Range: só atender o intervalo se o arquivo não mudou
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if not if_range or if_range.strip() == etag:
+            byte_range = _parse_range(range_header, size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _file_iterator(path, start, length), status=206, content_type=content_type
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    else:
+        length = size
+        response = StreamingHttpResponse(
+            _file_iterator(path, 0, length), content_type=content_type
+        )
+
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+def serve_file(request, field_file, filename):
+    """
+    Envia um FieldFile já autorizado usando o modo configurado.
+    """
+    content_type, _ = mimetypes.guess_type(filename)
+    content_type = content_type or 'application/octet-stream'
+
+    path = _local_path(field_file)
+    if path is None:
+        return _signed_url_response(field_file, filename)
+
+    mode = settings.ATTACHMENT_DOWNLOAD_MODE
+
+    if mode in ('x-accel-redirect', 'x-sendfile'):
+        response = HttpResponse(content_type=content_type)
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+        if mode == 'x-accel-redirect':
+            # location interna do nginx apontando para MEDIA_ROOT
+            prefix = settings.ATTACHMENT_ACCEL_PREFIX.rstrip('/')
+            response['X-Accel-Redirect'] = quote(f"{prefix}/{field_file.name}")
+        else:
+            response['X-Sendfile'] = path
+        return response
+
+    return _ranged_file_response(request, path, filename, content_type)
@@ -0,0 +1,61 @@
+"""
+Metadados de arquivos enviados (recibos e anexos)
+
+Tamanho, hash SHA-256 e tipo MIME são calculados uma única vez, quando o
+arquivo é salvo, e gravados no banco. Assim as listagens não precisam abrir
+o arquivo nem consultar o storage (S3) para exibir essas informações.
+"""
+import hashlib
+import mimetypes
+import os
+
+CHUNK_SIZE = 64 * 1024
+
+
+def is_new_upload(field_file):
+    """True se o FieldFile recebeu um arquivo que ainda não foi gravado no storage"""
+    return bool(field_file) and not field_file._committed
+
+
+def file_metadata(field_file, filename=None):
+    """
+    Retorna {'filename', 'size', 'sha256', 'content_type'} de um FieldFile.
+
+    Para uploads ainda não salvos lê o arquivo enviado (memória/temporário);
+    para arquivos já gravados abre o arquivo no storage (usado no backfill).
+    """
+    if is_new_upload(field_file):
+        content = field_file.file
+        filename = filename or os.path.basename(getattr(content, 'name', '') or field_file.name)
+        content_type = getattr(content, 'content_type', None)
+        should_close = False
+    else:
+        field_file.open('rb')
+        content = field_file
+        filename = filename or os.path.basename(field_file.name)
+        content_type = None
+        should_close = True
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks(CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+    finally:
+        if should_close:
+            field_file.close()
+
+    # Extensão primeiro (mesmo resultado no upload e no backfill), depois o navegador
+    content_type = mimetypes.guess_type(filename)[0] or content_type or 'application/octet-stream'
+
+    return {
+        'filename': filename,
+        'size': size,
+        'sha256': digest.hexdigest(),
+        'content_type': content_type,
+    }
@@ -0,0 +1,296 @@
+"""
+Envio de emails em lote
+
+send_messages() divide as mensagens em lotes de settings.EMAIL_BATCH_SIZE e
+envia os lotes em paralelo (settings.EMAIL_WORKERS threads). Cada thread abre
+uma única conexão (get_connection) e a reutiliza para todas as mensagens do
+lote, em vez de um handshake SMTP/TLS por email como no send_mail.
+
+settings.EMAIL_RATE_LIMIT limita o total de mensagens por segundo (0 = sem
+limite), somando todas as threads.
+
+O resultado informa o desfecho de cada mensagem, na mesma ordem da entrada:
+    {'to': [...], 'subject': '...', 'sent': True/False, 'error': None/'...'}
+
+Fila (OutboundEmail): as views não enviam emails diretamente. queue_message()
++ enqueue() gravam a fila com um único INSERT, e drain_outbox() (comando
+send_outbound_emails) envia o que estiver pendente usando send_messages().
+Falhas voltam para a fila com backoff exponencial
+(EMAIL_RETRY_BASE_SECONDS * 2^(tentativas-1)) e, após EMAIL_MAX_ATTEMPTS,
+ficam com status 'dead' para análise.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Espaça as chamadas de acquire() para no máximo `per_second` por segundo"""
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second else 0
+        self.lock = threading.Lock()
+        self.next_at = time.monotonic()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def build_message(subject, body, recipients, from_email=None):
+    """EmailMessage com o remetente padrão do sistema"""
+    return EmailMessage(
+        subject=subject,
+        body=body,
+        from_email=from_email or getattr(settings, 'DEFAULT_FROM_EMAIL', None),
+        to=list(recipients),
+    )
+
+
+def _result(message, sent, error=None):
+    return {
+        'to': list(message.to),
+        'subject': message.subject,
+        'sent': sent,
+        'error': error,
+    }
+
+
+def _send_batch(messages, limiter, backend):
+    """Envia um lote por uma única conexão; falhas não interrompem o lote"""
+    results = []
+    connection = get_connection(backend=backend, fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        logger.exception('Falha ao conectar ao servidor de email')
+        return [_result(message, False, str(e)) for message in messages]
+
+    try:
+        for message in messages:
+            limiter.acquire()
+            try:
+                sent = connection.send_messages([message]) == 1
+                results.append(_result(message, sent, None if sent else 'Mensagem não aceita'))
+            except Exception as e:
+                logger.warning('Falha ao enviar email para %s: %s', message.to, e)
+                results.append(_result(message, False, str(e)))
+                # Conexão pode ter caído: reabrir para o restante do lote
+                try:
+                    connection.close()
+                    connection.open()
+                except Exception:
+                    pass
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass
+    return results
+
+
+def send_messages(messages, workers=None, batch_size=None, rate_limit=None, backend=None):
+    """
+    Envia as mensagens (EmailMessage) e retorna a lista de resultados.
+
+    workers, batch_size e rate_limit usam os valores de settings quando não
+    informados.
+    """
+    messages = list(messages)
+    if not messages:
+        return []
+
+    workers = workers or settings.EMAIL_WORKERS
+    batch_size = batch_size or settings.EMAIL_BATCH_SIZE
+    limiter = RateLimiter(settings.EMAIL_RATE_LIMIT if rate_limit is None else rate_limit)
+
+    batches = [messages[i:i + batch_size] for i in range(0, len(messages), batch_size)]
+    if len(batches) == 1 or workers == 1:
+        return [result for batch in batches for result in _send_batch(batch, limiter, backend)]
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(batches)), thread_name_prefix='mailer') as pool:
+        futures = [pool.submit(_send_batch, batch, limiter, backend) for batch in batches]
+        return [result for future in futures for result in future.result()]
+
+
+def count_sent(results):
+    return sum(1 for result in results if result['sent'])
+
+
+# ---- Fila de envio ----
+
+_DEFAULT = object()
+
+
+def queue_message(subject, body, recipients, from_email=None, dedupe_key=_DEFAULT):
+    """
+    OutboundEmail (não salvo) para enqueue().
+
+    Por padrão o mesmo email (destinatários, assunto e corpo) só entra na
+    fila uma vez por dia; dedupe_key=None desativa a deduplicação.
+    """
+    from .models import OutboundEmail
+
+    recipients = list(recipients)
+    if dedupe_key is _DEFAULT:
+        content = json.dumps([sorted(recipients), subject, body], ensure_ascii=False)
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        dedupe_key = f"{timezone.now().date().isoformat()}:{digest}"
+    return OutboundEmail(
+        to=recipients,
+        subject=subject,
+        body=body,
+        from_email=from_email or getattr(settings, 'DEFAULT_FROM_EMAIL', None),
+        dedupe_key=dedupe_key,
+    )
+
+
+def enqueue(emails):
+    """
+    Grava os emails na fila. Retorna a quantidade realmente inserida: emails
+    com dedupe_key repetida na lista ou já presente na fila são ignorados.
+    """
+    from .models import OutboundEmail
+
+    unique = {}
+    for email in emails:
+        # Sem dedupe_key: sempre inserido
+        unique.setdefault(email.dedupe_key if email.dedupe_key is not None else object(), email)
+    keys = [key for key in unique if isinstance(key, str)]
+    with transaction.atomic():
+        existing = set()
+        for i in range(0, len(keys), 500):
+            existing.update(OutboundEmail.objects.filter(
+                dedupe_key__in=keys[i:i + 500]
+            ).values_list('dedupe_key', flat=True))
+        to_create = [email for key, email in unique.items() if key not in existing]
+        # ignore_conflicts cobre uma inserção concorrente da mesma chave
+        OutboundEmail.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+    return len(to_create)
+
+
+def _claim_outbox(batch_size, worker_id, now):
+    """
+    Reserva até batch_size emails vencidos para este worker. Mesmo padrão de
+    claim_submissions: SKIP LOCKED no PostgreSQL, UPDATE condicional no SQLite.
+    """
+    from .models import OutboundEmail
+
+    locked_until = now + timedelta(seconds=settings.EMAIL_SEND_LEASE_SECONDS)
+    available = Q(locked_until__isnull=True) | Q(locked_until__lte=now)
+    candidates = OutboundEmail.objects.filter(
+        status='pending', next_attempt_at__lte=now
+    ).filter(available).order_by('next_attempt_at', 'id')
+
+    with transaction.atomic():
+        if db_connection.features.has_select_for_update_skip_locked:
+            claimed_ids = list(
+                candidates.select_for_update(skip_locked=True).values_list('id', flat=True)[:batch_size]
+            )
+            OutboundEmail.objects.filter(id__in=claimed_ids).update(
+                locked_by=worker_id, locked_until=locked_until
+            )
+        else:
+            candidate_ids = list(candidates.values_list('id', flat=True)[:batch_size])
+            OutboundEmail.objects.filter(
+                id__in=candidate_ids, status='pending'
+            ).filter(available).update(locked_by=worker_id, locked_until=locked_until)
+
+    return list(OutboundEmail.objects.filter(
+        locked_by=worker_id, locked_until=locked_until, status='pending'
+    ).order_by('next_attempt_at', 'id'))
+
+
+def retry_delay(attempts):
+    """Espera antes da próxima tentativa (backoff exponencial, máximo de 1 dia)"""
+    return timedelta(seconds=min(settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), 86400))
+
+
+def drain_outbox(batch_size=None, backend=None):
+    """
+    Envia um lote de emails vencidos da fila.
+    Retorna {'sent': n, 'retry': n, 'dead': n}.
+    """
+    from .models import OutboundEmail
+
+    batch_size = batch_size or settings.EMAIL_BATCH_SIZE * settings.EMAIL_WORKERS
+    worker_id = str(uuid.uuid4())
+    emails = _claim_outbox(batch_size, worker_id, timezone.now())
+    if not emails:
+        return {'sent': 0, 'retry': 0, 'dead': 0}
+
+    messages = [
+        EmailMessage(subject=email.subject, body=email.body, from_email=email.from_email, to=email.to)
+        for email in emails
+    ]
+    results = send_messages(messages, backend=backend)
+
+    now = timezone.now()
+    summary = {'sent': 0, 'retry': 0, 'dead': 0}
+    sent_ids = []
+    for email, result in zip(emails, results):
+        if result['sent']:
+            sent_ids.append(email.id)
+            summary['sent'] += 1
+            continue
+
+        email.attempts += 1
+        email.last_error = result['error']
+        email.locked_by = None
+        email.locked_until = None
+        if email.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+            email.status = 'dead'
+            summary['dead'] += 1
+            logger.error('Email %s descartado após %d tentativas: %s', email.id, email.attempts, email.last_error)
+        else:
+            email.next_attempt_at = now + retry_delay(email.attempts)
+            summary['retry'] += 1
+        email.save(update_fields=['attempts', 'last_error', 'locked_by', 'locked_until', 'status', 'next_attempt_at'])
+
+    OutboundEmail.objects.filter(id__in=sent_ids).update(
+        status='sent', sent_at=now, locked_by=None, locked_until=None, last_error=None
+    )
+    return summary
+
+
+def requeue_dead():
+    """Devolve os emails 'dead' para a fila com tentativas zeradas"""
+    from .models import OutboundEmail
+
+    return OutboundEmail.objects.filter(status='dead').update(
+        status='pending', attempts=0, next_attempt_at=timezone.now(), last_error=None
+    )
+
+
+def outbox_stats():
+    """Profundidade da fila: quantidade por status e pendência mais antiga"""
+    from .models import OutboundEmail
+
+    counts = dict(OutboundEmail.objects.values_list('status').annotate(total=Count('id')).order_by())
+    pending = OutboundEmail.objects.filter(status='pending')
+    return {
+        'pending': counts.get('pending', 0),
+        'due': pending.filter(next_attempt_at__lte=timezone.now()).count(),
+        'sent': counts.get('sent', 0),
+        'dead': counts.get('dead', 0),
+        'oldest_pending': pending.aggregate(oldest=Min('created_at'))['oldest'],
+    }
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.audit_archive import archive_before
+from core.models import AuditLog
+
+
+class Command(BaseCommand):
+    help = 'Move entradas antigas do AuditLog para o arquivo morto mensal comprimido'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Idade mínima (dias) das entradas arquivadas (padrão: AUDIT_RETENTION_DAYS)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Entradas por bloco do arquivo e por transação de remoção (padrão: 1000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas mostra quantas entradas seriam arquivadas'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.AUDIT_RETENTION_DAYS
+        cutoff = timezone.now() - timedelta(days=days)
+
+        self.stdout.write(f'🗄️ Arquivando entradas anteriores a {cutoff:%d/%m/%Y} em {settings.AUDIT_ARCHIVE_DIR}...')
+
+        if options['dry_run']:
+            count = AuditLog.objects.filter(timestamp__lt=cutoff).count()
+            self.stdout.write(f'[DRY-RUN] {count} entrada(s) seriam arquivadas')
+            return
+
+        result = archive_before(cutoff, options['batch_size'])
+        for month, count in result.items():
+            self.stdout.write(f'  📦 {month}: {count} entrada(s)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {sum(result.values())} entrada(s) arquivada(s) em {len(result)} mês(es)'
+        ))
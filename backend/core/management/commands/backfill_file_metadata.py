@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from core.file_metadata import file_metadata
+from core.models import Submission, SubmissionAttachment
+
+
+class Command(BaseCommand):
+    help = 'Preenche tamanho, hash e tipo MIME de recibos e anexos já enviados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas mostra quantos arquivos seriam processados'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        submissions = Submission.objects.filter(
+            receipt_sha256__isnull=True
+        ).exclude(Q(receipt_file__isnull=True) | Q(receipt_file=''))
+        attachments = SubmissionAttachment.objects.filter(
+            sha256__isnull=True
+        ).exclude(Q(file__isnull=True) | Q(file=''))
+
+        if dry_run:
+            self.stdout.write(
+                f'[DRY-RUN] {submissions.count()} recibo(s) e {attachments.count()} anexo(s) sem metadados'
+            )
+            return
+
+        self.stdout.write('🔍 Calculando metadados dos recibos...')
+        receipts_done, receipts_missing = 0, 0
+        for submission in submissions.iterator():
+            try:
+                metadata = file_metadata(submission.receipt_file)
+            except (FileNotFoundError, OSError):
+                receipts_missing += 1
+                continue
+            submission.receipt_filename = submission.receipt_filename or metadata['filename']
+            submission.receipt_size = metadata['size']
+            submission.receipt_sha256 = metadata['sha256']
+            submission.receipt_content_type = metadata['content_type']
+            # update_fields: não dispara regras de save() nem altera outros campos
+            submission.save(update_fields=[
+                'receipt_filename', 'receipt_size', 'receipt_sha256', 'receipt_content_type'
+            ])
+            receipts_done += 1
+
+        self.stdout.write('🔍 Calculando metadados dos anexos...')
+        attachments_done, attachments_missing = 0, 0
+        for attachment in attachments.iterator():
+            try:
+                metadata = file_metadata(attachment.file, attachment.original_filename)
+            except (FileNotFoundError, OSError):
+                attachments_missing += 1
+                continue
+            attachment.size = metadata['size']
+            attachment.sha256 = metadata['sha256']
+            attachment.content_type = metadata['content_type']
+            attachment.save(update_fields=['size', 'sha256', 'content_type'])
+            attachments_done += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {receipts_done} recibo(s) e {attachments_done} anexo(s) atualizados'
+        ))
+        if receipts_missing or attachments_missing:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️ {receipts_missing} recibo(s) e {attachments_missing} anexo(s) não encontrados no storage'
+            ))
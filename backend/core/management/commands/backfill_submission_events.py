@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+from core.models import AuditLog, Submission, SubmissionEvent
+
+
+class Command(BaseCommand):
+    help = 'Popula SubmissionEvent a partir do histórico de aprovação no AuditLog'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Quantidade de eventos inseridos por lote (padrão: 1000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas mostra quantos eventos seriam criados'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        event_types = [choice[0] for choice in SubmissionEvent.EVENT_CHOICES]
+
+        self.stdout.write('🔍 Lendo eventos de aprovação do AuditLog...')
+
+        # Eventos já existentes (idempotência: rodar de novo não duplica)
+        existing = set(
+            SubmissionEvent.objects.values_list('submission_id', 'event_type', 'timestamp')
+        )
+        submission_ids = set(Submission.objects.values_list('id', flat=True))
+
+        logs = AuditLog.objects.filter(
+            model='Submission',
+            action__in=event_types
+        ).order_by('id').values_list('object_id', 'action', 'user_id', 'timestamp', 'changes')
+
+        pending = []
+        created = 0
+        skipped = 0
+        for object_id, action, user_id, timestamp, changes in logs.iterator(chunk_size=batch_size):
+            try:
+                submission_id = int(object_id)
+            except (TypeError, ValueError):
+                skipped += 1
+                continue
+
+            if submission_id not in submission_ids or (submission_id, action, timestamp) in existing:
+                skipped += 1
+                continue
+
+            existing.add((submission_id, action, timestamp))
+            pending.append(SubmissionEvent(
+                submission_id=submission_id,
+                event_type=action,
+                actor_id=user_id,
+                comment=(changes or {}).get('comment'),
+                timestamp=timestamp
+            ))
+
+            if len(pending) >= batch_size:
+                created += self._flush(pending, dry_run)
+
+        created += self._flush(pending, dry_run)
+
+        prefix = '[DRY-RUN] ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {prefix}{created} evento(s) criado(s), {skipped} ignorado(s) (já existentes ou sem submission)'
+        ))
+
+    def _flush(self, pending, dry_run):
+        count = len(pending)
+        if count and not dry_run:
+            SubmissionEvent.objects.bulk_create(pending)
+        pending.clear()
+        return count
@@ -5,10 +5,17 @@ from core.services import NotificationService
 class Command(BaseCommand):
     help = 'Verifica entregas atrasadas e notifica administradores'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Revarre todas as submissions, ignorando a marca d\'água da última execução'
+        )
+
     def handle(self, *args, **options):
         self.stdout.write('Verificando entregas atrasadas...')
         
-        count = NotificationService.check_late_deliveries()
+        count = NotificationService.check_late_deliveries(full=options['full'])
         
         if count > 0:
             self.stdout.write(
@@ -22,4 +29,3 @@ class Command(BaseCommand):
                     'Nenhuma entrega atrasada encontrada ou notificacoes ja foram enviadas.'
                 )
             )
-
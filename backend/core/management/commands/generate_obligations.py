@@ -26,6 +26,16 @@ class Command(BaseCommand):
         
         self.stdout.write(f'🔄 Iniciando geração automática de obrigações para os próximos {months_ahead} meses...')
         
+        generated_count, skipped_count = self.generate(months_ahead, company_id)
+        
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Geração concluída! {generated_count} obrigações criadas, {skipped_count} já existiam.'
+            )
+        )
+
+    def generate(self, months_ahead, company_id=None):
+        """Gera as obrigações de todas as empresas ativas. Retorna (criadas, já existentes)"""
         # Filtrar empresas
         companies = Company.objects.filter(active=True)
         if company_id:
@@ -43,11 +53,7 @@ class Command(BaseCommand):
                     generated_count += count
                     skipped_count += skipped
         
-        self.stdout.write(
-            self.style.SUCCESS(
-                f'✅ Geração concluída! {generated_count} obrigações criadas, {skipped_count} já existiam.'
-            )
-        )
+        return generated_count, skipped_count
 
     def generate_obligations_for_company_state_type(self, company, state, obligation_type, months_ahead):
         """Gera obrigações para uma combinação específica de empresa/estado/tipo"""
@@ -8,6 +8,7 @@ Executa:
 Uso:
     python manage.py make_notifications
     python manage.py make_notifications --days-ahead 7
+    python manage.py make_notifications --full   # revarre todas as entregas atrasadas
 
 Recomendado executar diariamente via cron/task scheduler.
 """
@@ -27,6 +28,11 @@ class Command(BaseCommand):
             default=3,
             help='Número de dias à frente para verificar vencimentos (padrão: 3)'
         )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Revarre todas as entregas atrasadas, ignorando a marca d\'água da última execução'
+        )
 
     def handle(self, *args, **options):
         days_ahead = options['days_ahead']
@@ -52,7 +58,7 @@ class Command(BaseCommand):
             
             # 3. Verificar entregas atrasadas
             self.stdout.write('\n⚠️ Verificando entregas atrasadas...')
-            late_deliveries_count = NotificationService.check_late_deliveries()
+            late_deliveries_count = NotificationService.check_late_deliveries(full=options['full'])
             self.stdout.write(
                 self.style.SUCCESS(f'✅ {late_deliveries_count} notificação(ões) de entrega atrasada criada(s)')
             )
@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Notification
+from core.services import NotificationService
+
+
+class Command(BaseCommand):
+    help = 'Remove notificações lidas mais antigas que o período de retenção, em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Idade mínima (dias) das notificações lidas removidas (padrão: NOTIFICATION_RETENTION_DAYS)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Quantidade de notificações removidas por transação (padrão: 1000)'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Pausa (segundos) entre lotes (padrão: 0)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas mostra quantas notificações seriam removidas'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.NOTIFICATION_RETENTION_DAYS
+        cutoff = timezone.now() - timedelta(days=days)
+
+        self.stdout.write(f'🧹 Removendo notificações lidas anteriores a {cutoff:%d/%m/%Y}...')
+
+        if options['dry_run']:
+            count = Notification.objects.filter(is_read=True, created_at__lt=cutoff).count()
+            self.stdout.write(f'[DRY-RUN] {count} notificação(ões) seriam removidas')
+            return
+
+        deleted = NotificationService.purge_read_notifications(
+            days=days, batch_size=options['batch_size'], pause=options['pause']
+        )
+        self.stdout.write(self.style.SUCCESS(f'✅ {deleted} notificação(ões) removida(s)'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from core.notification_counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os contadores de notificações por usuário a partir da tabela de notificações'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas mostra os contadores divergentes'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('🔢 Conferindo contadores de notificações...')
+
+        drift = reconcile(dry_run=options['dry_run'])
+        for user_id, current, correct in drift:
+            current_text = f'{current[1]}/{current[0]}' if current else 'sem contador'
+            self.stdout.write(
+                f'  ✏️ usuário {user_id}: {current_text} -> {correct[1]}/{correct[0]} (não lidas/total)'
+            )
+
+        if options['dry_run']:
+            self.stdout.write(f'[DRY-RUN] {len(drift)} contador(es) seriam corrigidos')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ {len(drift)} contador(es) corrigido(s)'))
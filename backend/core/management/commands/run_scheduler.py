@@ -0,0 +1,158 @@
+"""
+Management command que executa as rotinas periódicas (core/scheduler.py).
+
+Uso:
+    python manage.py run_scheduler                 # processo contínuo
+    python manage.py run_scheduler --once          # executa as rotinas vencidas e sai
+    python manage.py run_scheduler --run make_notifications
+    python manage.py run_scheduler --list          # agenda e últimas execuções
+
+Em produção execute um processo contínuo (supervisor/systemd/docker) em vez
+de agendar cada comando no cron. O histórico fica em JobRun (admin).
+"""
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core import scheduler
+from core.models import JobRun
+
+
+class Command(BaseCommand):
+    help = 'Executa as rotinas periódicas (notificações, despachos, obrigações, emails) conforme a agenda'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Executa as rotinas vencidas uma vez e sai (útil via cron)'
+        )
+        parser.add_argument(
+            '--run',
+            metavar='ROTINA',
+            help='Executa a rotina informada agora, fora da agenda'
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='Mostra a agenda, a próxima execução e a última execução de cada rotina'
+        )
+
+    def handle(self, *args, **options):
+        if options['list']:
+            self._print_schedule()
+            return
+
+        if options['run']:
+            try:
+                job = scheduler.get_job(options['run'])
+            except KeyError:
+                names = ', '.join(job.name for job in scheduler.SCHEDULE)
+                raise CommandError(f"Rotina desconhecida: {options['run']}. Disponíveis: {names}")
+            self._report(job, scheduler.run_job(job))
+            return
+
+        jobs = scheduler.enabled_jobs()
+        agenda = scheduler.Scheduler(jobs)
+
+        if options['once']:
+            due = agenda.due_jobs()
+            if not due:
+                self.stdout.write('💤 Nenhuma rotina vencida')
+            for job in due:
+                self._report(job, scheduler.run_job(job))
+            return
+
+        self._loop(agenda)
+
+    def _loop(self, agenda):
+        stop = threading.Event()
+
+        def request_stop(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+
+        # SQLite não aceita escritas simultâneas de várias conexões: uma rotina por vez
+        workers = 1 if connection.vendor == 'sqlite' else settings.SCHEDULER_WORKERS
+
+        self.stdout.write(self.style.SUCCESS(
+            f'🕒 Agendador iniciado com {len(agenda.jobs)} rotina(s) ({workers} em paralelo)'
+        ))
+        for job in agenda.jobs:
+            self.stdout.write(f'  • {job.name}: {job.schedule_display()}')
+
+        running = {}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scheduler') as pool:
+            try:
+                while not stop.is_set():
+                    for name, future in list(running.items()):
+                        if future.done():
+                            del running[name]
+                            self._report(scheduler.get_job(name), future)
+
+                    for job in agenda.due_jobs():
+                        # Ainda executando neste processo: nem tenta
+                        if job.name in running:
+                            continue
+                        self.stdout.write(f'▶️ {timezone.now():%d/%m/%Y %H:%M:%S} {job.name}')
+                        running[job.name] = pool.submit(scheduler.run_job_in_thread, job)
+
+                    stop.wait(settings.SCHEDULER_TICK_SECONDS)
+            except KeyboardInterrupt:
+                pass
+
+            self.stdout.write('\nEncerrando: aguardando rotinas em execução...')
+        for name, future in running.items():
+            self._report(scheduler.get_job(name), future)
+        self.stdout.write(self.style.SUCCESS('✅ Agendador encerrado'))
+
+    def _report(self, job, result):
+        """result: JobRun, None (pulada) ou Future com um dos dois"""
+        if hasattr(result, 'result'):
+            try:
+                result = result.result()
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'❌ {job.name}: erro ao registrar a execução: {e}'))
+                return
+
+        if result is None:
+            self.stdout.write(self.style.WARNING(f'⏭️ {job.name}: pulada, execução anterior ainda em andamento'))
+        elif result.status == 'success':
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {job.name}: {result.rows or 0} linha(s) em {result.duration_ms} ms'
+            ))
+        else:
+            last_line = (result.error or '').strip().splitlines()[-1:] or ['']
+            self.stdout.write(self.style.ERROR(
+                f'❌ {job.name}: falhou em {result.duration_ms} ms: {last_line[0]}'
+            ))
+
+    def _print_schedule(self):
+        jobs = scheduler.SCHEDULE
+        now = timezone.now()
+        next_runs = scheduler.Scheduler(jobs).next_runs(now)
+        self.stdout.write('📋 Rotinas agendadas:')
+        for job in jobs:
+            disabled = ' (desativada)' if job.name in settings.SCHEDULER_DISABLED_JOBS else ''
+            self.stdout.write(f'\n• {job.name}{disabled} — {job.description}')
+            next_run = next_runs[job.name]
+            next_display = 'agora' if next_run <= now else f'{next_run:%d/%m/%Y %H:%M:%S}'
+            self.stdout.write(
+                f'  Agenda: {job.schedule_display()} (jitter até {job.jitter}s). Próxima: {next_display}'
+            )
+            last = JobRun.objects.filter(job=job.name).first()
+            if last is None:
+                self.stdout.write('  Última execução: -')
+                continue
+            details = f'{last.get_status_display()}'
+            if last.duration_ms is not None:
+                details += f', {last.duration_ms} ms'
+            if last.rows is not None:
+                details += f', {last.rows} linha(s)'
+            self.stdout.write(f'  Última execução: {last.started_at:%d/%m/%Y %H:%M:%S} ({details})')
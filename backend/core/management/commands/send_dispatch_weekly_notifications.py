@@ -26,8 +26,7 @@ class Command(BaseCommand):
                     self.style.WARNING('🔍 Modo dry-run ativado - nenhuma notificação será criada')
                 )
                 # Em modo dry-run, apenas contar quantas notificações seriam criadas
-                # Por simplicidade, vamos executar mas não salvar
-                notifications_created = DispatchNotificationService.send_weekly_notifications()
+                notifications_created = DispatchNotificationService.send_weekly_notifications(dry_run=True)
                 self.stdout.write(
                     self.style.SUCCESS(f'📊 Seriam criadas {notifications_created} notificações')
                 )
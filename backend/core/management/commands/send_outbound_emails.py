@@ -0,0 +1,91 @@
+"""
+Management command para enviar os emails da fila (OutboundEmail).
+
+Uso:
+    python manage.py send_outbound_emails              # envia os emails vencidos e sai
+    python manage.py send_outbound_emails --loop       # worker contínuo
+    python manage.py send_outbound_emails --stats      # apenas mostra a fila
+    python manage.py send_outbound_emails --requeue-dead
+
+Em produção execute com --loop (supervisor/systemd) ou a cada minuto via cron.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import mailer
+
+
+class Command(BaseCommand):
+    help = 'Envia os emails pendentes da fila, com novas tentativas e backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Emails reservados por lote (padrão: EMAIL_BATCH_SIZE * EMAIL_WORKERS)'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Continua executando, verificando a fila a cada --interval segundos'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=10,
+            help='Espera (segundos) quando a fila está vazia no modo --loop (padrão: 10)'
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Mostra a profundidade da fila sem enviar'
+        )
+        parser.add_argument(
+            '--requeue-dead',
+            action='store_true',
+            help='Devolve para a fila os emails que esgotaram as tentativas'
+        )
+
+    def handle(self, *args, **options):
+        if options['requeue_dead']:
+            count = mailer.requeue_dead()
+            self.stdout.write(self.style.SUCCESS(f'♻️ {count} email(s) devolvido(s) para a fila'))
+
+        if options['stats']:
+            self._print_stats()
+            return
+
+        self.stdout.write('📧 Enviando emails da fila...')
+        totals = {'sent': 0, 'retry': 0, 'dead': 0}
+        try:
+            while True:
+                summary = mailer.drain_outbox(batch_size=options['batch_size'])
+                for key in totals:
+                    totals[key] += summary[key]
+                if any(summary.values()):
+                    self.stdout.write(
+                        f"  ✉️ {summary['sent']} enviado(s), {summary['retry']} para nova tentativa, "
+                        f"{summary['dead']} descartado(s)"
+                    )
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('\nInterrompido.')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {totals['sent']} email(s) enviado(s), {totals['retry']} para nova tentativa, "
+            f"{totals['dead']} descartado(s)"
+        ))
+        self._print_stats()
+
+    def _print_stats(self):
+        stats = mailer.outbox_stats()
+        oldest = stats['oldest_pending'].strftime('%d/%m/%Y %H:%M') if stats['oldest_pending'] else '-'
+        self.stdout.write(
+            f"📊 Fila: {stats['pending']} pendente(s) ({stats['due']} para envio agora), "
+            f"{stats['sent']} enviado(s), {stats['dead']} com falha. Pendente mais antigo: {oldest}"
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-19 09:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_add_company_code'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['obligation', '-delivered_at', '-id'], name='submission_latest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['-delivered_at', '-id'], name='submission_delivered_idx'),
+        ),
+    ]
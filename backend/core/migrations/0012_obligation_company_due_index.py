@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-19 09:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_submission_latest_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='obligation',
+            index=models.Index(fields=['company', '-due_date'], name='obligation_company_due_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-19 09:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_obligation_company_due_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['approval_status', 'delivered_at', 'id'], name='submission_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.6 on 2026-10-19 09:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_submission_queue_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='claim_expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Reserva expira em'),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claimed_submissions', to=settings.AUTH_USER_MODEL, verbose_name='Em análise por'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-19 09:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_submission_claim'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('approved', 'Aprovada'), ('rejected', 'Recusada'), ('revision_requested', 'Revisão Solicitada'), ('resubmitted', 'Reenviada')], max_length=20, verbose_name='Evento')),
+                ('comment', models.TextField(blank=True, null=True, verbose_name='Comentário')),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data/Hora')),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submission_events', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='core.submission')),
+            ],
+            options={
+                'ordering': ['timestamp', 'id'],
+                'indexes': [models.Index(fields=['submission', 'timestamp'], name='submission_event_timeline_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.0.6 on 2026-10-19 09:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_submission_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='receipt_content_type',
+            field=models.CharField(blank=True, max_length=100, null=True, verbose_name='Tipo do Recibo'),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='receipt_filename',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='Nome do Recibo'),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='receipt_sha256',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='SHA-256 do Recibo'),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='receipt_size',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Tamanho do Recibo (bytes)'),
+        ),
+        migrations.AddField(
+            model_name='submissionattachment',
+            name='content_type',
+            field=models.CharField(blank=True, max_length=100, null=True, verbose_name='Tipo'),
+        ),
+        migrations.AddField(
+            model_name='submissionattachment',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='SHA-256'),
+        ),
+        migrations.AddField(
+            model_name='submissionattachment',
+            name='size',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Tamanho (bytes)'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-19 09:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_notification_dedupe_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='obligation',
+            name='overdue_notified_on',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='obligation',
+            name='overdue_resolved',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='obligation',
+            index=models.Index(fields=['overdue_resolved', 'due_date'], name='obligation_overdue_idx'),
+        ),
+    ]
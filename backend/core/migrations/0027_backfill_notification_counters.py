@@ -0,0 +1,37 @@
+from django.db import migrations
+from django.db.models import Count, Q
+
+
+def backfill_counters(apps, schema_editor):
+    """Preenche NotificationCounter com a mesma contagem agrupada de reconcile()"""
+    Notification = apps.get_model('core', 'Notification')
+    NotificationCounter = apps.get_model('core', 'NotificationCounter')
+
+    counts = {
+        row['user_id']: (row['total'], row['unread'])
+        for row in Notification.objects.values('user_id').annotate(
+            total=Count('id'), unread=Count('id', filter=Q(is_read=False))
+        ).order_by()
+    }
+
+    # Contadores de usuários sem notificações voltam a zero
+    NotificationCounter.objects.exclude(user_id__in=list(counts)).update(total=0, unread=0)
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id, total=total, unread=unread)
+         for user_id, (total, unread) in counts.items()],
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['total', 'unread'],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_job_run'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 import uuid
 
+from .file_metadata import file_metadata, is_new_upload
+
 class State(models.Model):
     code = models.CharField(max_length=2, unique=True)
     name = models.CharField(max_length=100)
@@ -68,9 +71,20 @@ class Obligation(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_obligations')
     created_at = models.DateTimeField(auto_now_add=True)
     notes = models.TextField(blank=True, null=True)
+    
+    # Acompanhamento de atraso (check_overdue_obligations): dia da última
+    # notificação de atraso e se a obrigação já tem submission aprovada
+    overdue_notified_on = models.DateField(null=True, blank=True, editable=False)
+    overdue_resolved = models.BooleanField(default=False, editable=False)
 
     class Meta:
         unique_together = ('company','state','obligation_type','competence')
+        indexes = [
+            # Select dependente de obrigações por empresa (get_company_obligations)
+            models.Index(fields=['company', '-due_date'], name='obligation_company_due_idx'),
+            # Obrigações vencidas ainda em aberto
+            models.Index(fields=['overdue_resolved', 'due_date'], name='obligation_overdue_idx'),
+        ]
 
     def __str__(self):
         return f"{self.company} - {self.obligation_type} - {self.state} ({self.competence})"
@@ -94,6 +108,7 @@ class Submission(models.Model):
     obligation = models.ForeignKey(Obligation, on_delete=models.CASCADE, related_name='submissions')
     delivered_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='deliveries')
     delivered_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     delivery_date = models.DateField()
     receipt_file = models.FileField(upload_to=receipt_upload_to, blank=True, null=True)
     comments = models.TextField(blank=True, null=True)
@@ -106,10 +121,57 @@ class Submission(models.Model):
     approval_decision_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='approval_decisions', verbose_name="Decisão por")
     approval_comment = models.TextField(blank=True, null=True, verbose_name="Comentário da Aprovação")
     
+    # Reserva (lease) da submission por um aprovador durante a análise
+    claimed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='claimed_submissions', verbose_name="Em análise por")
+    claim_expires_at = models.DateTimeField(blank=True, null=True, verbose_name="Reserva expira em")
+    
+    # Metadados do recibo, gravados no upload (ver core/file_metadata.py)
+    receipt_filename = models.CharField(max_length=255, blank=True, null=True, verbose_name="Nome do Recibo")
+    receipt_size = models.BigIntegerField(blank=True, null=True, verbose_name="Tamanho do Recibo (bytes)")
+    receipt_sha256 = models.CharField(max_length=64, blank=True, null=True, verbose_name="SHA-256 do Recibo")
+    receipt_content_type = models.CharField(max_length=100, blank=True, null=True, verbose_name="Tipo do Recibo")
+    
+    class Meta:
+        indexes = [
+            # Submission mais recente por obrigação (list_deliveries)
+            models.Index(fields=['obligation', '-delivered_at', '-id'], name='submission_latest_idx'),
+            # Paginação por cursor em delivered_at, id
+            models.Index(fields=['-delivered_at', '-id'], name='submission_delivered_idx'),
+            # Fila de aprovação por status (pending_approvals)
+            models.Index(fields=['approval_status', 'delivered_at', 'id'], name='submission_queue_idx'),
+            # Varredura incremental por alteração (check_late_deliveries)
+            models.Index(fields=['updated_at', 'id'], name='submission_updated_idx'),
+        ]
+    
     @property
     def is_effective(self):
         """Retorna True apenas se a submissão foi aprovada"""
         return self.approval_status == 'approved'
+    
+    def is_claimed_by_other(self, user, now):
+        """True se outro aprovador tem uma reserva ainda válida"""
+        return (
+            self.claimed_by_id is not None
+            and self.claimed_by_id != user.id
+            and self.claim_expires_at is not None
+            and self.claim_expires_at > now
+        )
+    
+    def save(self, *args, **kwargs):
+        # Capturar metadados do recibo apenas quando um novo arquivo é enviado
+        if is_new_upload(self.receipt_file):
+            metadata = file_metadata(self.receipt_file)
+            self.receipt_filename = metadata['filename']
+            self.receipt_size = metadata['size']
+            self.receipt_sha256 = metadata['sha256']
+            self.receipt_content_type = metadata['content_type']
+        elif not self.receipt_file:
+            self.receipt_filename = None
+            self.receipt_size = None
+            self.receipt_sha256 = None
+            self.receipt_content_type = None
+        
+        super().save(*args, **kwargs)
 
 class SubmissionAttachment(models.Model):
     submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='attachments')
@@ -118,10 +180,49 @@ class SubmissionAttachment(models.Model):
     parsed_cnpj = models.CharField(max_length=14, blank=True, null=True)
     parsed_period = models.CharField(max_length=6, blank=True, null=True, help_text="MMAAAA")
     parsed_obligation_key = models.CharField(max_length=200, blank=True, null=True)
+    size = models.BigIntegerField(blank=True, null=True, verbose_name="Tamanho (bytes)")
+    sha256 = models.CharField(max_length=64, blank=True, null=True, verbose_name="SHA-256")
+    content_type = models.CharField(max_length=100, blank=True, null=True, verbose_name="Tipo")
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
         return f"{self.original_filename} - {self.submission.obligation.company.name}"
+    
+    def save(self, *args, **kwargs):
+        # Capturar metadados apenas quando um novo arquivo é enviado
+        if is_new_upload(self.file):
+            metadata = file_metadata(self.file, self.original_filename or None)
+            self.original_filename = self.original_filename or metadata['filename']
+            self.size = metadata['size']
+            self.sha256 = metadata['sha256']
+            self.content_type = metadata['content_type']
+        
+        super().save(*args, **kwargs)
+
+
+class SubmissionEvent(models.Model):
+    """Evento do fluxo de aprovação de uma submission (timeline)"""
+    EVENT_CHOICES = [
+        ('approved', 'Aprovada'),
+        ('rejected', 'Recusada'),
+        ('revision_requested', 'Revisão Solicitada'),
+        ('resubmitted', 'Reenviada'),
+    ]
+
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='events')
+    event_type = models.CharField(max_length=20, choices=EVENT_CHOICES, verbose_name="Evento")
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='submission_events', verbose_name="Usuário")
+    comment = models.TextField(blank=True, null=True, verbose_name="Comentário")
+    timestamp = models.DateTimeField(default=timezone.now, verbose_name="Data/Hora")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['submission', 'timestamp'], name='submission_event_timeline_idx'),
+        ]
+        ordering = ['timestamp', 'id']
+
+    def __str__(self):
+        return f"{self.timestamp} {self.actor} {self.event_type} Submission({self.submission_id})"
 
 
 class Notification(models.Model):
@@ -142,6 +243,7 @@ class Notification(models.Model):
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
     obligation = models.ForeignKey(Obligation, on_delete=models.CASCADE, null=True, blank=True)
+    dispatch = models.ForeignKey('Dispatch', on_delete=models.CASCADE, null=True, blank=True, related_name='notifications')
     type = models.CharField(max_length=20, choices=TYPE_CHOICES)
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='medium')
     title = models.CharField(max_length=200)
@@ -149,12 +251,48 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     read_at = models.DateTimeField(null=True, blank=True)
+    # Chave de deduplicação diária (usuário, assunto, tipo, dia); nula para
+    # notificações que podem se repetir. A constraint unique garante uma única
+    # notificação por chave mesmo com execuções concorrentes.
+    dedupe_key = models.CharField(max_length=150, null=True, blank=True, unique=True, editable=False)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Feed paginado por cursor (get_notifications)
+            models.Index(fields=['user', '-created_at', '-id'], name='notification_feed_idx'),
+            models.Index(fields=['user', 'is_read', '-created_at', '-id'], name='notification_unread_feed_idx'),
+            # Retenção de notificações lidas (purge_notifications)
+            models.Index(fields=['is_read', 'created_at'], name='notification_retention_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.user.username}"
+    
+    @staticmethod
+    def make_dedupe_key(user_id, subject, notification_type, day=None, once=False):
+        """
+        Ex.: make_dedupe_key(3, 'obligation:10', 'overdue') -> '3:obligation:10:overdue:2025-01-31'
+        once=True: sem o dia ('3:submission:7:overdue:once'), a notificação é criada uma única vez
+        """
+        if once:
+            return f"{user_id}:{subject}:{notification_type}:once"
+        day = day or timezone.now().date()
+        return f"{user_id}:{subject}:{notification_type}:{day.isoformat()}"
+
+
+class NotificationCounter(models.Model):
+    """
+    Totais de notificações por usuário, mantidos a cada criação, leitura e
+    exclusão (core/notification_counters.py). Corrigidos pelo comando
+    reconcile_notification_counters.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    total = models.IntegerField(default=0)
+    unread = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread}/{self.total}"
 
 
 class Dispatch(models.Model):
@@ -263,8 +401,94 @@ class AuditLog(models.Model):
     action = models.CharField(max_length=20)  # created/updated/deleted
     model = models.CharField(max_length=100)
     object_id = models.CharField(max_length=100)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # definido no registro do evento (core/audit.py grava em lote depois)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     changes = models.JSONField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Histórico por usuário (get_user_history)
+            models.Index(fields=['user', '-timestamp'], name='auditlog_user_ts_idx'),
+            # Retenção por idade (archive_audit_logs)
+            models.Index(fields=['timestamp'], name='auditlog_timestamp_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.timestamp} {self.user} {self.action} {self.model}({self.object_id})"
+
+
+class JobCheckpoint(models.Model):
+    """Posição persistida de rotinas incrementais (ex.: check_late_deliveries)"""
+    name = models.CharField(max_length=100, unique=True)
+    position = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.position}"
+
+
+class OutboundEmail(models.Model):
+    """
+    Fila de emails (core/mailer.py). A requisição apenas insere; o comando
+    send_outbound_emails envia, com novas tentativas e backoff exponencial.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pendente'),
+        ('sent', 'Enviado'),
+        ('dead', 'Falhou'),
+    ]
+
+    to = models.JSONField(default=list)
+    subject = models.CharField(max_length=500)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True, null=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # Reserva pelo worker durante o envio (expira se o worker cair)
+    locked_by = models.CharField(max_length=36, blank=True, null=True, editable=False)
+    locked_until = models.DateTimeField(blank=True, null=True, editable=False)
+    last_error = models.TextField(blank=True, null=True)
+    # Evita enfileirar o mesmo email duas vezes (ver mailer.queue_message)
+    dedupe_key = models.CharField(max_length=150, blank=True, null=True, unique=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Próximos envios (send_outbound_emails)
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+
+class JobRun(models.Model):
+    """Histórico de execuções das rotinas periódicas (core/scheduler.py)"""
+    STATUS_CHOICES = [
+        ('running', 'Em execução'),
+        ('success', 'Sucesso'),
+        ('failed', 'Falhou'),
+        ('skipped', 'Pulada'),
+    ]
+
+    job = models.CharField(max_length=100)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.PositiveIntegerField(null=True, blank=True, verbose_name="Duração (ms)")
+    rows = models.IntegerField(null=True, blank=True, verbose_name="Linhas afetadas")
+    error = models.TextField(null=True, blank=True)
+    # hostname:pid do processo que executou
+    worker = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['job', '-started_at'], name='job_run_job_idx'),
+            models.Index(fields=['job', 'status'], name='job_run_status_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.timestamp} {self.user} {self.action} {self.model}({self.object_id})"
\ No newline at end of file
+        return f"{self.job} {self.started_at:%d/%m/%Y %H:%M} ({self.status})"
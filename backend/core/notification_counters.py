@@ -0,0 +1,217 @@
+"""
+Contadores de notificações por usuário (NotificationCounter)
+
+As estatísticas (notifications/stats/, stream, dashboard) leem uma linha por
+usuário em vez de fazer COUNT(*) na tabela de notificações. Os contadores
+são ajustados com UPDATE ... SET total = total + n (expressões F), então
+escritas simultâneas não se sobrescrevem:
+
+- criação via save()/create(): sinal post_save
+- bulk_create: quem insere chama notifications_created(); inserções com
+  deduplicação rodam dentro de locked_counters() para contar só o que foi
+  de fato inserido
+- leitura: mark_read() / mark_all_read()
+- exclusão (inclusive em cascata): sinal post_delete; exclusões em massa
+  sem sinais chamam notifications_deleted(), e QuerySet.delete() de muitas
+  linhas roda dentro de batched_deletes() (um UPDATE por usuário)
+
+A linha do usuário é criada na primeira alteração a partir da contagem real.
+Se os contadores divergirem (ex.: UPDATE manual no banco), o comando
+reconcile_notification_counters recalcula tudo.
+"""
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Notification, NotificationCounter
+
+# Deltas de exclusão acumulados por batched_deletes() nesta thread
+_pending = threading.local()
+
+
+def count_from_table(user_id):
+    """(total, não lidas) calculados na tabela de notificações"""
+    counts = Notification.objects.filter(user_id=user_id).aggregate(
+        total=Count('id'), unread=Count('id', filter=Q(is_read=False))
+    )
+    return counts['total'], counts['unread']
+
+
+def _ensure_counter(user_id):
+    """Cria a linha do usuário a partir da tabela (já incluindo as alterações feitas)"""
+    total, unread = count_from_table(user_id)
+    try:
+        with transaction.atomic():
+            NotificationCounter.objects.create(user_id=user_id, total=total, unread=unread)
+        return True
+    except IntegrityError:
+        # Criada por outra requisição ao mesmo tempo
+        return False
+
+
+def _adjust(deltas, create=True):
+    """deltas: {user_id: (delta_total, delta_unread)}"""
+    for user_id, (total, unread) in deltas.items():
+        if not total and not unread:
+            continue
+        updated = NotificationCounter.objects.filter(user_id=user_id).update(
+            total=F('total') + total, unread=F('unread') + unread
+        )
+        if updated or not create:
+            continue
+        if not _ensure_counter(user_id):
+            NotificationCounter.objects.filter(user_id=user_id).update(
+                total=F('total') + total, unread=F('unread') + unread
+            )
+
+
+def notifications_created(notifications):
+    """Chamar após bulk_create (que não dispara post_save)"""
+    totals = Counter()
+    unread = Counter()
+    for notification in notifications:
+        totals[notification.user_id] += 1
+        if not notification.is_read:
+            unread[notification.user_id] += 1
+    _adjust({user_id: (totals[user_id], unread[user_id]) for user_id in totals})
+
+
+@contextmanager
+def locked_counters(user_ids):
+    """
+    Transação com as linhas de contador dos usuários travadas (criadas antes,
+    se faltarem). Inserções deduplicadas para um mesmo usuário ficam em fila:
+    a checagem de chaves existentes feita dentro do bloco enxerga tudo que as
+    anteriores gravaram, então a contagem do que foi inserido é exata.
+    """
+    user_ids = sorted(set(user_ids))
+    existing = set(NotificationCounter.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+    for user_id in user_ids:
+        if user_id not in existing:
+            _ensure_counter(user_id)
+
+    with transaction.atomic():
+        if connection.features.has_select_for_update:
+            # Ordem fixa de travamento evita deadlock entre lotes
+            list(NotificationCounter.objects.select_for_update().filter(
+                user_id__in=user_ids
+            ).order_by('user_id').values_list('user_id', flat=True))
+        else:
+            # SQLite: a primeira escrita da transação já pega o lock de escrita do banco
+            NotificationCounter.objects.filter(user_id__in=user_ids).update(total=F('total'))
+        yield
+
+
+@contextmanager
+def batched_deletes():
+    """
+    Acumula os ajustes do sinal post_delete em vez de um UPDATE por linha e
+    os aplica ao sair, um por usuário. Os deltas vêm das instâncias que o
+    QuerySet.delete() de fato excluiu.
+    """
+    if getattr(_pending, 'deltas', None) is not None:
+        yield
+        return
+    _pending.deltas = deltas = {}
+    try:
+        yield
+    finally:
+        _pending.deltas = None
+    notifications_deleted(deltas)
+
+
+def notifications_deleted(deltas):
+    """
+    Chamar após exclusões em massa que não disparam post_delete.
+    deltas: {user_id: (excluídas, não lidas excluídas)}
+    """
+    _adjust({user_id: (-total, -unread) for user_id, (total, unread) in deltas.items()}, create=False)
+
+
+def mark_read(user_id, notification_id):
+    """Marca uma notificação como lida. Retorna False se não existe"""
+    updated = Notification.objects.filter(
+        id=notification_id, user_id=user_id, is_read=False
+    ).update(is_read=True, read_at=timezone.now())
+    if updated:
+        _adjust({user_id: (0, -updated)})
+        return True
+    return Notification.objects.filter(id=notification_id, user_id=user_id).exists()
+
+
+def mark_all_read(user_id):
+    """Marca todas as notificações do usuário como lidas. Retorna a quantidade"""
+    updated = Notification.objects.filter(user_id=user_id, is_read=False).update(
+        is_read=True, read_at=timezone.now()
+    )
+    _adjust({user_id: (0, -updated)})
+    return updated
+
+
+def get_counts(user_id):
+    """(total, não lidas) do usuário por chave primária"""
+    counter = NotificationCounter.objects.filter(user_id=user_id).values_list('total', 'unread').first()
+    if counter is None:
+        _ensure_counter(user_id)
+        counter = NotificationCounter.objects.filter(user_id=user_id).values_list('total', 'unread').first()
+    return counter
+
+
+def reconcile(dry_run=False):
+    """
+    Recalcula todos os contadores a partir da tabela.
+    Retorna a lista de (user_id, (total, unread) antigo, (total, unread) correto)
+    dos que estavam divergentes.
+    """
+    from django.contrib.auth.models import User
+
+    actual = {
+        row['user_id']: (row['total'], row['unread'])
+        for row in Notification.objects.values('user_id').annotate(
+            total=Count('id'), unread=Count('id', filter=Q(is_read=False))
+        ).order_by()
+    }
+    stored = dict(
+        (user_id, (total, unread))
+        for user_id, total, unread in NotificationCounter.objects.values_list('user_id', 'total', 'unread')
+    )
+
+    drift = []
+    for user_id in User.objects.values_list('id', flat=True):
+        correct = actual.get(user_id, (0, 0))
+        current = stored.get(user_id)
+        if current is None and correct == (0, 0):
+            continue
+        if current != correct:
+            drift.append((user_id, current, correct))
+
+    if not dry_run:
+        for user_id, current, (total, unread) in drift:
+            NotificationCounter.objects.update_or_create(
+                user_id=user_id, defaults={'total': total, 'unread': unread}
+            )
+    return drift
+
+
+@receiver(post_save, sender=Notification)
+def _notification_saved(sender, instance, created, **kwargs):
+    if created:
+        _adjust({instance.user_id: (1, 0 if instance.is_read else 1)})
+
+
+@receiver(post_delete, sender=Notification)
+def _notification_deleted(sender, instance, **kwargs):
+    pending = getattr(_pending, 'deltas', None)
+    if pending is not None:
+        total, unread = pending.get(instance.user_id, (0, 0))
+        pending[instance.user_id] = (total + 1, unread + (0 if instance.is_read else 1))
+        return
+    # Sem linha ainda: será criada a partir da tabela quando for lida. Não criar
+    # aqui, pois o próprio usuário pode estar sendo excluído (cascata)
+    _adjust({instance.user_id: (-1, 0 if instance.is_read else -1)}, create=False)
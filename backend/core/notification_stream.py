@@ -0,0 +1,170 @@
+"""
+Stream (Server-Sent Events) de notificações
+
+GET /api/notifications/stream/ mantém a conexão aberta e envia ao usuário:
+
+    event: notification   id: <id>   data: notificação serializada
+    event: unread                    data: {"total": n, "unread": n}
+    event: reload         id: <id>   (muitas notificações perdidas: recarregar a lista)
+
+Criar ou marcar notificações chama publish() (sinal post_save ou
+diretamente nos bulk_create/update), que acorda os streams do usuário neste
+processo. Enquanto nada muda, o stream não consulta o banco: fica parado em
+uma Condition e só envia um comentário de keepalive a cada
+NOTIFICATION_STREAM_HEARTBEAT_SECONDS (a conexão com o banco é fechada
+durante a espera).
+
+Notificações criadas em outro processo (management commands, outros
+workers) são detectadas lendo o contador do usuário (NotificationCounter,
+por chave primária) a cada NOTIFICATION_STREAM_POLL_SECONDS (0 desativa). A conexão é encerrada após
+NOTIFICATION_STREAM_MAX_SECONDS; o cliente reconecta enviando Last-Event-ID
+e recebe o que tiver perdido.
+
+O gerador roda na thread que atende a requisição e a ocupa enquanto a
+conexão está aberta (uma por aba). O servidor precisa atender requisições
+em threads (runserver, gunicorn --worker-class gthread --threads N) ou ser
+assíncrono; com workers síncronos cada aba bloqueia um worker inteiro. Por
+isso NOTIFICATION_STREAM_MAX_SECONDS é curto (padrão 55s): a thread é
+liberada com frequência e a reconexão custa poucas consultas indexadas.
+"""
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from rest_framework.renderers import BaseRenderer
+
+from .models import Notification
+from .notification_counters import get_counts
+
+BACKLOG_LIMIT = 50
+
+
+class NotificationBroker:
+    """Versão por usuário; streams esperam a versão mudar"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._versions = {}
+
+    def version(self, user_id):
+        with self._condition:
+            return self._versions.get(user_id, 0)
+
+    def publish(self, user_ids):
+        with self._condition:
+            for user_id in user_ids:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._condition.notify_all()
+
+    def wait(self, user_id, version, timeout):
+        """Espera até a versão do usuário mudar (ou timeout) e retorna a versão atual"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._versions.get(user_id, 0) != version, timeout)
+            return self._versions.get(user_id, 0)
+
+
+broker = NotificationBroker()
+
+
+def publish(user_ids):
+    """Avisa os streams abertos neste processo (após o commit, se houver transação)"""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        transaction.on_commit(lambda: broker.publish(user_ids))
+
+
+@receiver(post_save, sender=Notification)
+def _notification_saved(sender, instance, **kwargs):
+    publish([instance.user_id])
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Permite Accept: text/event-stream na negociação de conteúdo do DRF"""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (bytes, str)):
+            return data
+        return f'event: error\ndata: {json.dumps(data, default=str)}\n\n'
+
+
+def _event(event, data, event_id=None):
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def _latest_id(user_id):
+    return Notification.objects.filter(user_id=user_id).aggregate(last_id=Max('id'))['last_id'] or 0
+
+
+def event_stream(user_id, last_event_id=None):
+    """Gerador de eventos SSE para o usuário"""
+    from .serializers import NotificationSerializer
+
+    heartbeat = settings.NOTIFICATION_STREAM_HEARTBEAT_SECONDS
+    poll = settings.NOTIFICATION_STREAM_POLL_SECONDS
+    deadline = time.monotonic() + settings.NOTIFICATION_STREAM_MAX_SECONDS
+
+    version = broker.version(user_id)
+    total, unread = get_counts(user_id)
+    last_id = last_event_id if last_event_id is not None else _latest_id(user_id)
+    check_new = last_event_id is not None
+    sent_counts = None
+    last_check = last_write = time.monotonic()
+
+    yield f'retry: {settings.NOTIFICATION_STREAM_RETRY_MS}\n\n'
+
+    while True:
+        if check_new:
+            new = list(Notification.objects.filter(
+                user_id=user_id, id__gt=last_id
+            ).order_by('id')[:BACKLOG_LIMIT + 1])
+            if len(new) > BACKLOG_LIMIT:
+                # Muitas perdidas: o cliente recarrega a lista pela API
+                last_id = _latest_id(user_id)
+                yield _event('reload', {}, last_id)
+            else:
+                for notification in new:
+                    last_id = notification.id
+                    yield _event('notification', NotificationSerializer(notification).data, notification.id)
+            last_write = time.monotonic()
+        if sent_counts != (total, unread):
+            sent_counts = (total, unread)
+            yield _event('unread', {'total': total, 'unread': unread})
+            last_write = time.monotonic()
+
+        # Esperar por mudanças sem segurar uma conexão com o banco
+        if not connection.in_atomic_block:
+            connection.close()
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            wake_at = min(deadline, last_write + heartbeat)
+            if poll:
+                wake_at = min(wake_at, last_check + poll)
+            new_version = broker.wait(user_id, version, max(wake_at - now, 0))
+
+            now = time.monotonic()
+            published = new_version != version
+            if published or (poll and now - last_check >= poll):
+                version = new_version
+                last_check = now
+                # Consulta por chave primária; notificações só são buscadas se algo mudou
+                total, unread = get_counts(user_id)
+                check_new = published or (total, unread) != sent_counts
+                if check_new:
+                    break
+            if now - last_write >= heartbeat:
+                yield ': keepalive\n\n'
+                last_write = now
@@ -0,0 +1,26 @@
+"""
+Acompanhamento de obrigações em atraso
+
+check_overdue_obligations só considera obrigações vencidas com
+overdue_resolved=False cujo último lembrete (overdue_notified_on) tenha sido
+há pelo menos settings.OVERDUE_REMINDER_DAYS dias. Obrigações com submission
+aprovada são marcadas como resolvidas na primeira execução que as encontra e
+saem da busca, então o custo diário acompanha as pendências em aberto e não
+o histórico inteiro.
+
+Se a submission aprovada de uma obrigação for excluída, a obrigação volta a
+ser acompanhada.
+"""
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Obligation, Submission
+
+
+@receiver(post_delete, sender=Submission)
+def _approved_submission_deleted(sender, instance, **kwargs):
+    if instance.approval_status != 'approved':
+        return
+    Obligation.objects.filter(pk=instance.obligation_id, overdue_resolved=True).exclude(
+        submissions__approval_status='approved'
+    ).update(overdue_resolved=False)
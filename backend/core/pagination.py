@@ -0,0 +1,84 @@
+"""
+Paginação por chave (keyset) para listagens grandes
+
+Em vez de OFFSET, cada página continua a partir do último registro da página
+anterior, usando o par (campo de ordenação, id) como cursor. O custo de cada
+página é o mesmo, não importa quantos registros já foram percorridos.
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def get_page_size(request, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Lê ?page_size= da requisição, limitado a [1, maximum]"""
+    try:
+        page_size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        page_size = default
+    return max(1, min(page_size, maximum))
+
+
+def encode_cursor(value, pk):
+    """Codifica (valor, id) em um cursor opaco para a URL"""
+    raw = f"{value.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decodifica um cursor gerado por encode_cursor.
+    Retorna (datetime, id) ou None se o cursor for inválido.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        value, pk = raw.rsplit('|', 1)
+        value = parse_datetime(value)
+        if value is None:
+            return None
+        return value, int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def keyset_paginate(queryset, request, field, descending=True, default_page_size=DEFAULT_PAGE_SIZE):
+    """
+    Pagina um queryset por (field, id).
+
+    Query params:
+    - cursor: valor de next_cursor retornado pela página anterior
+    - page_size: quantidade de itens por página
+
+    Retorna (itens_da_pagina, next_cursor). next_cursor é None na última página.
+    """
+    page_size = get_page_size(request, default=default_page_size)
+    position = decode_cursor(request.GET.get('cursor'))
+
+    if position:
+        value, pk = position
+        if descending:
+            queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk}))
+        else:
+            queryset = queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': pk}))
+
+    if descending:
+        queryset = queryset.order_by(f'-{field}', '-id')
+    else:
+        queryset = queryset.order_by(field, 'id')
+
+    # Buscar um item a mais para saber se existe próxima página
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.id)
+
+    return items, next_cursor
@@ -1,28 +1,19 @@
 from rest_framework import permissions
-from django.contrib.auth.models import Group
+from .roles import get_user_roles, request_has_role
 
 class IsAdmin(permissions.BasePermission):
     """Permissão para usuários Admin ou superuser"""
     def has_permission(self, request, view):
-        if not request.user or not request.user.is_authenticated:
-            return False
-        
-        # Se for superuser, automaticamente é Admin
-        if request.user.is_superuser:
-            # Garantir que está no grupo Admin
-            admin_group, created = Group.objects.get_or_create(name='Admin')
-            if not request.user.groups.filter(name='Admin').exists():
-                request.user.groups.add(admin_group)
-            return True
-        
-        return request.user.groups.filter(name='Admin').exists()
+        # Superuser é automaticamente Admin (ver core/roles.py)
+        return request_has_role(request, 'Admin')
 
 class IsUsuario(permissions.BasePermission):
     """Permissão para usuários do grupo Usuario"""
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False
-        return request.user.groups.filter(name='Usuario').exists()
+        # Superuser não é automaticamente Usuario
+        return 'Usuario' in get_user_roles(request.user, request.auth)
 
 class ReadOnlyOrCreateForUsuario(permissions.BasePermission):
     """
@@ -39,17 +30,11 @@ class ReadOnlyOrCreateForUsuario(permissions.BasePermission):
         
         # POST/PATCH/PUT permitido para Admin e Usuario
         if request.method in ['POST', 'PATCH', 'PUT']:
-            return (
-                request.user.is_superuser or 
-                request.user.groups.filter(name__in=['Admin', 'Usuario']).exists()
-            )
+            return request_has_role(request, 'Admin', 'Usuario')
         
         # DELETE apenas para Admin (incluindo superuser)
         if request.method == 'DELETE':
-            return (
-                request.user.is_superuser or 
-                request.user.groups.filter(name='Admin').exists()
-            )
+            return request_has_role(request, 'Admin')
         
         return False
 
@@ -66,22 +51,12 @@ class IsAdminOrReadOnly(permissions.BasePermission):
             return True
         
         # Escrita apenas para Admin (incluindo superuser)
-        return (
-            request.user.is_superuser or 
-            request.user.groups.filter(name='Admin').exists()
-        )
+        return request_has_role(request, 'Admin')
 
 class IsApprover(permissions.BasePermission):
     """
     Permissão para aprovadores (Admin ou grupo Aprovador)
     """
     def has_permission(self, request, view):
-        if not request.user or not request.user.is_authenticated:
-            return False
-        
-        # Superuser sempre tem permissão
-        if request.user.is_superuser:
-            return True
-        
-        # Verificar se está no grupo Admin ou Aprovador
-        return request.user.groups.filter(name__in=['Admin', 'Aprovador']).exists()
\ No newline at end of file
+        # Superuser sempre tem permissão; senão, grupo Admin ou Aprovador
+        return request_has_role(request, 'Admin', 'Aprovador')
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""
+Resolução de papéis (grupos) dos usuários
+
+Os papéis de um usuário são resolvidos uma única vez por requisição e
+guardados no cache (settings.ROLE_CACHE_SECONDS). O cache é invalidado
+sempre que os grupos do usuário mudam (ex.: set_user_role) ou o usuário é
+salvo.
+
+Com settings.JWT_ROLE_CLAIMS ativo, os papéis que vêm no access token
+(claim "roles") são usados diretamente e a autorização não consulta o banco.
+"""
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+ROLE_CLAIM = 'roles'
+
+
+def _cache_key(user_id):
+    return f'user_roles:{user_id}'
+
+
+def _load_roles(user):
+    """Busca os grupos no banco (apenas quando não há cache). Somente leitura"""
+    roles = set(user.groups.values_list('name', flat=True))
+    if user.is_superuser:
+        # Superuser é sempre Admin, mesmo sem o grupo gravado (ver _user_saved)
+        roles.add('Admin')
+    return frozenset(roles)
+
+
+def get_user_roles(user, token=None):
+    """
+    Retorna o conjunto de papéis do usuário.
+
+    Ordem: valor já resolvido nesta requisição, claim "roles" do token
+    (se JWT_ROLE_CLAIMS), cache e, por último, o banco.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, '_roles', None)
+    if roles is not None:
+        return roles
+
+    if token is not None and settings.JWT_ROLE_CLAIMS and ROLE_CLAIM in token:
+        roles = frozenset(token[ROLE_CLAIM])
+    else:
+        key = _cache_key(user.pk)
+        roles = cache.get(key)
+        if roles is None:
+            roles = _load_roles(user)
+            cache.set(key, roles, settings.ROLE_CACHE_SECONDS)
+
+    user._roles = roles
+    return roles
+
+
+def user_in_roles(user, roles, token=None):
+    """True se o usuário é superuser ou pertence a algum dos papéis"""
+    if not user or not user.is_authenticated:
+        return False
+    if user.is_superuser:
+        return True
+    return not get_user_roles(user, token).isdisjoint(roles)
+
+
+def request_has_role(request, *roles):
+    """user_in_roles para o usuário da requisição, usando as claims do token"""
+    return user_in_roles(request.user, roles, getattr(request, 'auth', None))
+
+
+def add_role_claims(token, user):
+    """Inclui papéis e dados básicos do usuário no token JWT"""
+    token[ROLE_CLAIM] = sorted(get_user_roles(user))
+    token['username'] = user.username
+    token['is_superuser'] = user.is_superuser
+    return token
+
+
+def invalidate_user_roles(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def _groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if reverse:
+        # group.user_set.add(...): instance é o Group
+        if pk_set:
+            for user_id in pk_set:
+                invalidate_user_roles(user_id)
+        else:
+            for user_id in instance.user_set.values_list('id', flat=True):
+                invalidate_user_roles(user_id)
+    else:
+        invalidate_user_roles(instance.pk)
+        instance._roles = None
+
+
+@receiver(post_save, sender=User)
+def _user_saved(sender, instance, update_fields=None, **kwargs):
+    invalidate_user_roles(instance.pk)
+    if instance.is_superuser and (update_fields is None or 'is_superuser' in update_fields):
+        # Superuser entra no grupo Admin ao ser salvo (consultas por groups__name='Admin');
+        # saves parciais como o de last_login no login não passam por aqui
+        admin_group, _ = Group.objects.get_or_create(name='Admin')
+        instance.groups.add(admin_group)
@@ -0,0 +1,254 @@
+"""
+Rotinas periódicas (comando run_scheduler)
+
+SCHEDULE declara as rotinas: a cada `every` segundos ou diariamente no
+horário `at` ('HH:MM'). Cada execução recebe um atraso aleatório de até
+`jitter` segundos, para que as rotinas (e vários processos) não disparem
+todas no mesmo instante.
+
+O momento da próxima execução é calculado a partir do histórico (JobRun),
+então reiniciar o processo não repete rotinas diárias já executadas e uma
+execução perdida enquanto o processo estava parado é feita ao voltar.
+
+Cada execução é registrada em JobRun com início, duração, linhas afetadas
+e erro. Se a execução anterior da mesma rotina ainda está em andamento
+(neste ou em outro processo), a nova é registrada como 'skipped' e não
+roda. Execuções 'running' mais antigas que SCHEDULER_STALE_SECONDS são
+consideradas abandonadas (processo encerrado no meio) e marcadas como
+'failed'.
+"""
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import JobCheckpoint, JobRun
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """Rotina agendada: func() executa e retorna a quantidade de linhas afetadas"""
+
+    def __init__(self, name, func, every=None, at=None, jitter=0, description=''):
+        if (every is None) == (at is None):
+            raise ValueError(f'Rotina {name}: informe every ou at')
+        self.name = name
+        self.func = func
+        self.every = timedelta(seconds=every) if every is not None else None
+        self.at = datetime.strptime(at, '%H:%M').time() if at is not None else None
+        self.jitter = jitter
+        self.description = description
+
+    def schedule_display(self):
+        if self.at is not None:
+            return f'diariamente às {self.at:%H:%M}'
+        return f'a cada {int(self.every.total_seconds())}s'
+
+    def due_at(self, last_started_at, now):
+        """Momento (sem jitter) em que a rotina deve executar de novo"""
+        if self.every is not None:
+            # Nunca executada: vencida desde sempre (o jitter sorteado não muda a cada verificação)
+            return last_started_at + self.every if last_started_at else datetime.min
+
+        slot = datetime.combine(now.date(), self.at)
+        if slot > now:
+            if last_started_at is None:
+                return slot
+            slot -= timedelta(days=1)
+        if last_started_at is None or last_started_at < slot:
+            # Horário de hoje (ou de ontem, se perdido) ainda não executado
+            return slot
+        return slot + timedelta(days=1)
+
+
+# ---- Rotinas ----
+
+def _make_notifications():
+    from .services import NotificationService
+
+    # Entregas atrasadas ficam só com a rotina check_late_deliveries (a marca
+    # d'água do JobCheckpoint não pode ser lida e gravada por duas rotinas)
+    return (
+        NotificationService.check_due_dates(days_ahead=3) +
+        NotificationService.check_overdue_obligations()
+    )
+
+
+def _check_late_deliveries():
+    from .services import NotificationService
+
+    return NotificationService.check_late_deliveries()
+
+
+def _send_dispatch_weekly_notifications():
+    from .services_dispatch import DispatchNotificationService
+
+    return DispatchNotificationService.send_weekly_notifications()
+
+
+def _generate_obligations():
+    from .management.commands.generate_obligations import Command
+
+    generated, _ = Command().generate(months_ahead=3)
+    return generated
+
+
+def _send_outbound_emails():
+    from . import mailer
+
+    total = 0
+    while True:
+        summary = mailer.drain_outbox()
+        if not any(summary.values()):
+            return total
+        total += sum(summary.values())
+
+
+def _purge_notifications():
+    from .services import NotificationService
+
+    return NotificationService.purge_read_notifications()
+
+
+SCHEDULE = [
+    Job('make_notifications', _make_notifications, at='07:00', jitter=300,
+        description='Vencimentos próximos e obrigações em atraso'),
+    Job('send_dispatch_weekly_notifications', _send_dispatch_weekly_notifications, at='07:30', jitter=300,
+        description='Despachos a vencer na semana e em atraso'),
+    Job('check_late_deliveries', _check_late_deliveries, every=900, jitter=60,
+        description='Entregas atrasadas alteradas desde a última execução'),
+    Job('generate_obligations', _generate_obligations, at='02:00', jitter=600,
+        description='Obrigações recorrentes dos próximos 3 meses'),
+    Job('send_outbound_emails', _send_outbound_emails, every=60, jitter=10,
+        description='Fila de emails (OutboundEmail)'),
+    Job('purge_notifications', _purge_notifications, at='03:00', jitter=600,
+        description='Notificações lidas fora do período de retenção'),
+]
+
+
+def enabled_jobs():
+    return [job for job in SCHEDULE if job.name not in settings.SCHEDULER_DISABLED_JOBS]
+
+
+def get_job(name):
+    for job in SCHEDULE:
+        if job.name == name:
+            return job
+    raise KeyError(name)
+
+
+# ---- Execução ----
+
+def _worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _start_run(job):
+    """
+    Registra o início da execução. Retorna o JobRun, ou None se a execução
+    anterior ainda está em andamento (registrada como 'skipped').
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # Trava a linha da rotina: dois processos não iniciam a mesma rotina juntos
+        lock, _ = JobCheckpoint.objects.select_for_update().get_or_create(name=f'scheduler:{job.name}')
+
+        JobRun.objects.filter(
+            job=job.name, status='running',
+            started_at__lt=now - timedelta(seconds=settings.SCHEDULER_STALE_SECONDS)
+        ).update(status='failed', finished_at=now, error='Execução abandonada (processo encerrado?)')
+
+        if JobRun.objects.filter(job=job.name, status='running').exists():
+            JobRun.objects.create(
+                job=job.name, status='skipped', started_at=now, finished_at=now,
+                error='Execução anterior ainda em andamento', worker=_worker_id()
+            )
+            return None
+
+        run = JobRun.objects.create(job=job.name, started_at=now, worker=_worker_id())
+        lock.position = {'run_id': run.id, 'started_at': now.isoformat()}
+        lock.save(update_fields=['position', 'updated_at'])
+        return run
+
+
+def run_job(job):
+    """Executa a rotina registrando o histórico. Retorna o JobRun (None se pulada)"""
+    run = _start_run(job)
+    if run is None:
+        logger.warning('Rotina %s pulada: execução anterior ainda em andamento', job.name)
+        return None
+
+    started = time.monotonic()
+    try:
+        run.rows = job.func()
+        run.status = 'success'
+    except Exception:
+        logger.exception('Falha na rotina %s', job.name)
+        run.status = 'failed'
+        run.error = traceback.format_exc()
+
+    run.finished_at = timezone.now()
+    run.duration_ms = int((time.monotonic() - started) * 1000)
+    run.save(update_fields=['status', 'rows', 'error', 'finished_at', 'duration_ms'])
+
+    JobRun.objects.filter(
+        job=job.name, started_at__lt=run.finished_at - timedelta(days=settings.SCHEDULER_HISTORY_DAYS)
+    ).delete()
+    return run
+
+
+def last_started(jobs):
+    """
+    {nome: início da última execução} em uma consulta. Execuções puladas
+    contam: a rotina só é tentada de novo no próximo horário.
+    """
+    return dict(
+        JobRun.objects.filter(
+            job__in=[job.name for job in jobs]
+        ).values('job').annotate(last=Max('started_at')).order_by().values_list('job', 'last')
+    )
+
+
+class Scheduler:
+    """Decide quais rotinas estão vencidas, aplicando o jitter de cada uma"""
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+        # nome -> (due_at, atraso sorteado para esse due_at)
+        self._jitter = {}
+
+    def next_runs(self, now=None):
+        """{nome: próxima execução com jitter}"""
+        now = now or timezone.now()
+        last = last_started(self.jobs)
+        runs = {}
+        for job in self.jobs:
+            due_at = job.due_at(last.get(job.name), now)
+            cached = self._jitter.get(job.name)
+            if cached is None or cached[0] != due_at:
+                cached = (due_at, random.uniform(0, job.jitter))
+                self._jitter[job.name] = cached
+            runs[job.name] = due_at + timedelta(seconds=cached[1])
+        return runs
+
+    def due_jobs(self, now=None):
+        now = now or timezone.now()
+        next_runs = self.next_runs(now)
+        return [job for job in self.jobs if next_runs[job.name] <= now]
+
+
+def run_job_in_thread(job):
+    """run_job para threads do pool: fecha a conexão com o banco da thread ao final"""
+    try:
+        return run_job(job)
+    finally:
+        connection.close()
@@ -1,12 +1,32 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
 from .models import State, Company, ObligationType, Obligation, Submission, AuditLog, Notification, Dispatch, DispatchSubtask
+from .roles import add_role_claims
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id','username','first_name','last_name','email']
 
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Login: inclui os papéis do usuário nas claims do token"""
+    @classmethod
+    def get_token(cls, user):
+        return add_role_claims(super().get_token(user), user)
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh: o novo access token recebe os papéis atuais (não os do login)"""
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+        user = User.objects.filter(**{jwt_settings.USER_ID_FIELD: access[jwt_settings.USER_ID_CLAIM]}).first()
+        if user is not None:
+            data['access'] = str(add_role_claims(access, user))
+        return data
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     class Meta:
@@ -71,8 +91,10 @@ class SubmissionSerializer(serializers.ModelSerializer):
         model = Submission
         fields = ['id','obligation','delivered_by','delivered_at','delivery_date','receipt_file','comments',
                  'submission_type','batch_id','approval_status','approval_decision_at','approval_decision_by',
-                 'approval_decision_by_username','approval_comment','is_effective']
-        read_only_fields = ['delivered_by','delivered_at','approval_decision_at','approval_decision_by']
+                 'approval_decision_by_username','approval_comment','is_effective',
+                 'receipt_filename','receipt_size','receipt_sha256','receipt_content_type']
+        read_only_fields = ['delivered_by','delivered_at','approval_decision_at','approval_decision_by',
+                           'receipt_filename','receipt_size','receipt_sha256','receipt_content_type']
 
     def validate(self, data):
         obligation = data.get('obligation')
@@ -198,7 +220,7 @@ class NotificationSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Notification
-        fields = ['id', 'obligation', 'type', 'priority', 'title', 'message', 
+        fields = ['id', 'obligation', 'dispatch', 'type', 'priority', 'title', 'message', 
                  'is_read', 'created_at', 'read_at']
 
 class AuditLogSerializer(serializers.ModelSerializer):
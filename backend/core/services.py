@@ -4,10 +4,13 @@ Serviços para geração automática de obrigações e notificações
 from django.utils import timezone
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
-from django.core.mail import send_mail
 from django.conf import settings
 from django.db.models import Q
-from .models import Obligation, Notification, User, ObligationType, Company, State, Submission
+from .models import Obligation, Notification, User, ObligationType, Company, State, Submission, JobCheckpoint
+from . import notification_counters
+from .notification_stream import publish as publish_notifications
+
+LATE_DELIVERIES_CHECKPOINT = 'check_late_deliveries'
 
 class NotificationService:
     """Serviço para gerenciar notificações do sistema"""
@@ -29,88 +32,104 @@ class NotificationService:
         """
         Cria notificação com deduplicação diária.
         Evita criar múltiplas notificações do mesmo tipo para a mesma obrigação no mesmo dia.
+        Retorna a notificação criada ou None se já existia.
         """
-        from datetime import date
-        
-        # Verificar se já existe notificação deste tipo para esta obrigação hoje
-        today = timezone.now().date()
-        existing = Notification.objects.filter(
+        notification = Notification(
             user=user,
             obligation=obligation,
             type=notification_type,
-            created_at__date=today
-        ).exists()
-        
-        if not existing:
-            return NotificationService.create_notification(
-                user=user,
-                title=title,
-                message=message,
-                notification_type=notification_type,
-                priority=priority,
-                obligation=obligation
-            )
+            priority=priority,
+            title=title,
+            message=message,
+            dedupe_key=Notification.make_dedupe_key(user.pk, f'obligation:{obligation.pk}', notification_type)
+        )
+        if NotificationService._bulk_create_deduplicated([notification]):
+            # bulk_create com ignore_conflicts não preenche o pk: buscar a linha inserida
+            return Notification.objects.get(dedupe_key=notification.dedupe_key)
         return None
     
     @staticmethod
-    def create_rejection_notification(submission, approver, comment=''):
+    def bulk_create_notifications(notifications):
+        """Insere várias notificações (instâncias não salvas) em um único INSERT"""
+        created = Notification.objects.bulk_create(notifications)
+        notification_counters.notifications_created(created)
+        publish_notifications(n.user_id for n in created)
+        return created
+    
+    @staticmethod
+    def build_decision_notification(submission, approver, decision, comment=''):
         """
-        Cria notificação quando uma submissão é recusada.
-        Notifica o autor da submissão.
+        Monta (sem salvar) a notificação enviada ao autor da submissão após
+        uma decisão de aprovação: 'approved', 'rejected' ou 'needs_revision'.
         """
         if not submission.delivered_by:
             return None
         
-        title = "🔴 Entrega Recusada"
-        message = (
-            f"Sua entrega da obrigação {submission.obligation.obligation_type.name} "
-            f"para {submission.obligation.company.name} ({submission.obligation.state.code}) "
-            f"foi recusada por {approver.username}."
+        obligation = submission.obligation
+        description = (
+            f"da obrigação {obligation.obligation_type.name} "
+            f"para {obligation.company.name} ({obligation.state.code})"
         )
         
+        if decision == 'approved':
+            title = "✅ Entrega Aprovada"
+            message = f"Sua entrega {description} foi aprovada por {approver.username}."
+            comment_label = 'Comentário'
+            priority = 'medium'
+        elif decision == 'rejected':
+            title = "🔴 Entrega Recusada"
+            message = f"Sua entrega {description} foi recusada por {approver.username}."
+            comment_label = 'Motivo'
+            priority = 'high'
+        else:
+            title = "⚠️ Revisão Solicitada"
+            message = f"A entrega {description} necessita de revisão. Solicitada por: {approver.username}."
+            comment_label = 'Observações'
+            priority = 'high'
+        
         if comment:
-            message += f"\n\nMotivo: {comment}"
+            message += f"\n\n{comment_label}: {comment}"
         
-        message += f"\n\nCompetência: {submission.obligation.competence}"
+        message += f"\n\nCompetência: {obligation.competence}"
         
-        return NotificationService.create_notification(
+        return Notification(
             user=submission.delivered_by,
+            obligation=obligation,
+            type='approval',
+            priority=priority,
             title=title,
-            message=message,
-            notification_type='approval',
-            priority='high',
-            obligation=submission.obligation
+            message=message
+        )
+    
+    @staticmethod
+    def _create_decision_notification(submission, approver, decision, comment=''):
+        notification = NotificationService.build_decision_notification(submission, approver, decision, comment)
+        if notification is None:
+            return None
+        return NotificationService.create_notification(
+            user=notification.user,
+            title=notification.title,
+            message=notification.message,
+            notification_type=notification.type,
+            priority=notification.priority,
+            obligation=notification.obligation
         )
     
+    @staticmethod
+    def create_rejection_notification(submission, approver, comment=''):
+        """
+        Cria notificação quando uma submissão é recusada.
+        Notifica o autor da submissão.
+        """
+        return NotificationService._create_decision_notification(submission, approver, 'rejected', comment)
+    
     @staticmethod
     def create_revision_notification(submission, approver, comment=''):
         """
         Cria notificação quando é solicitada revisão em uma submissão.
         Notifica o autor da submissão.
         """
-        if not submission.delivered_by:
-            return None
-        
-        title = "⚠️ Revisão Solicitada"
-        message = (
-            f"A entrega da obrigação {submission.obligation.obligation_type.name} "
-            f"para {submission.obligation.company.name} ({submission.obligation.state.code}) "
-            f"necessita de revisão. Solicitada por: {approver.username}."
-        )
-        
-        if comment:
-            message += f"\n\nObservações: {comment}"
-        
-        message += f"\n\nCompetência: {submission.obligation.competence}"
-        
-        return NotificationService.create_notification(
-            user=submission.delivered_by,
-            title=title,
-            message=message,
-            notification_type='approval',
-            priority='high',
-            obligation=submission.obligation
-        )
+        return NotificationService._create_decision_notification(submission, approver, 'needs_revision', comment)
     
     @staticmethod
     def create_approval_notification(submission, approver, comment=''):
@@ -118,53 +137,74 @@ class NotificationService:
         Cria notificação quando uma submissão é aprovada.
         Notifica o autor da submissão.
         """
-        if not submission.delivered_by:
-            return None
-        
-        title = "✅ Entrega Aprovada"
-        message = (
-            f"Sua entrega da obrigação {submission.obligation.obligation_type.name} "
-            f"para {submission.obligation.company.name} ({submission.obligation.state.code}) "
-            f"foi aprovada por {approver.username}."
-        )
-        
-        if comment:
-            message += f"\n\nComentário: {comment}"
-        
-        message += f"\n\nCompetência: {submission.obligation.competence}"
-        
-        return NotificationService.create_notification(
-            user=submission.delivered_by,
-            title=title,
-            message=message,
-            notification_type='approval',
-            priority='medium',
-            obligation=submission.obligation
-        )
+        return NotificationService._create_decision_notification(submission, approver, 'approved', comment)
+    
+    @staticmethod
+    def _bulk_create_deduplicated(candidates, dry_run=False):
+        """
+        Insere em lote as notificações candidatas (com dedupe_key preenchida)
+        que ainda não existem. Retorna a quantidade criada (com dry_run, a
+        quantidade que seria criada, sem inserir).
+        
+        A primeira candidata de cada chave vence. A chave começa pelo usuário,
+        então só inserções para o mesmo usuário podem conflitar: elas rodam
+        com o contador do usuário travado (locked_counters), e a consulta de
+        chaves existentes feita dentro da trava é exata, assim como a
+        contagem retornada e o ajuste dos contadores. ignore_conflicts fica
+        como garantia adicional da constraint unique.
+        """
+        unique = {}
+        for notification in candidates:
+            unique.setdefault(notification.dedupe_key, notification)
+        
+        def new_notifications():
+            keys = list(unique)
+            existing = set()
+            for i in range(0, len(keys), 500):
+                existing.update(Notification.objects.filter(
+                    dedupe_key__in=keys[i:i + 500]
+                ).values_list('dedupe_key', flat=True))
+            return [n for key, n in unique.items() if key not in existing]
+        
+        if dry_run:
+            return len(new_notifications())
+        if not unique:
+            return 0
+        
+        with notification_counters.locked_counters(n.user_id for n in unique.values()):
+            to_create = new_notifications()
+            Notification.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+            notification_counters.notifications_created(to_create)
+        publish_notifications(n.user_id for n in to_create)
+        return len(to_create)
     
     @staticmethod
     def check_due_dates(days_ahead=7):
         """
         Verifica obrigações que vencem nos próximos dias e não possuem submission aprovada.
         Usa deduplicação para evitar spam de notificações.
+        
+        Consultas em conjunto: obrigações candidatas (anti-join com as aprovadas),
+        superusers e um bulk_create deduplicado por dedupe_key.
         """
+        from django.db.models import Exists, OuterRef
+        
         today = timezone.now().date()
         due_date = today + timedelta(days=days_ahead)
         
-        # Buscar todas as obrigações que vencem no período
+        # Obrigações do período sem submission aprovada
+        approved = Submission.objects.filter(obligation=OuterRef('pk'), approval_status='approved')
         obligations = Obligation.objects.filter(
             due_date__lte=due_date,
             due_date__gte=today
-        ).select_related('company', 'obligation_type', 'state', 'responsible_user').prefetch_related('submissions')
+        ).exclude(Exists(approved)).select_related(
+            'company', 'obligation_type', 'state', 'responsible_user'
+        ).order_by('id')
         
-        notifications_created = 0
+        admins = list(User.objects.filter(is_superuser=True))
         
+        candidates = []
         for obligation in obligations:
-            # Verificar se tem submission aprovada
-            has_approved = obligation.submissions.filter(approval_status='approved').exists()
-            if has_approved:
-                continue  # Já foi entregue e aprovada, não precisa notificar
-            
             days_until_due = (obligation.due_date - today).days
             
             # Determinar prioridade baseada na proximidade
@@ -177,217 +217,330 @@ class NotificationService:
             else:
                 priority = 'low'
             
-            # Criar notificação para o usuário responsável (com deduplicação)
+            subject = f'obligation:{obligation.pk}'
+            
+            # Notificação para o usuário responsável
             if obligation.responsible_user:
-                title = f"⚠️ Obrigação vence em {days_until_due} dia(s)"
-                message = (
-                    f"A obrigação {obligation.obligation_type.name} da empresa "
-                    f"{obligation.company.name} vence em {days_until_due} dia(s) "
-                    f"({obligation.due_date.strftime('%d/%m/%Y')})."
-                )
-                
-                notification = NotificationService._create_deduplicated_notification(
+                candidates.append(Notification(
                     user=obligation.responsible_user,
                     obligation=obligation,
-                    notification_type='due_soon',
-                    title=title,
-                    message=message,
-                    priority=priority
-                )
-                if notification:
-                    notifications_created += 1
+                    type='due_soon',
+                    priority=priority,
+                    title=f"⚠️ Obrigação vence em {days_until_due} dia(s)",
+                    message=(
+                        f"A obrigação {obligation.obligation_type.name} da empresa "
+                        f"{obligation.company.name} vence em {days_until_due} dia(s) "
+                        f"({obligation.due_date.strftime('%d/%m/%Y')})."
+                    ),
+                    dedupe_key=Notification.make_dedupe_key(obligation.responsible_user.pk, subject, 'due_soon', today)
+                ))
             
-            # Notificar administradores sobre obrigações críticas (com deduplicação)
+            # Notificar administradores sobre obrigações críticas
             if priority in ['urgent', 'high']:
-                admins = User.objects.filter(is_superuser=True)
+                title = f"🚨 Obrigação crítica: {days_until_due} dia(s) para vencimento"
+                message = (
+                    f"A obrigação {obligation.obligation_type.name} da empresa "
+                    f"{obligation.company.name} ({obligation.state.code}) vence em "
+                    f"{days_until_due} dia(s). Responsável: {obligation.responsible_user.username if obligation.responsible_user else 'Não definido'}."
+                )
                 for admin in admins:
-                    title = f"🚨 Obrigação crítica: {days_until_due} dia(s) para vencimento"
-                    message = (
-                        f"A obrigação {obligation.obligation_type.name} da empresa "
-                        f"{obligation.company.name} ({obligation.state.code}) vence em "
-                        f"{days_until_due} dia(s). Responsável: {obligation.responsible_user.username if obligation.responsible_user else 'Não definido'}."
-                    )
-                    
-                    notification = NotificationService._create_deduplicated_notification(
+                    candidates.append(Notification(
                         user=admin,
                         obligation=obligation,
-                        notification_type='due_soon',
+                        type='due_soon',
+                        priority=priority,
                         title=title,
                         message=message,
-                        priority=priority
-                    )
-                    if notification:
-                        notifications_created += 1
+                        dedupe_key=Notification.make_dedupe_key(admin.pk, subject, 'due_soon', today)
+                    ))
         
-        return notifications_created
+        return NotificationService._bulk_create_deduplicated(candidates)
+    
+    @staticmethod
+    def _admin_users():
+        """Superusers e usuários do grupo Admin (resolvidos uma vez por execução)"""
+        return list(User.objects.filter(
+            Q(is_superuser=True) | Q(groups__name='Admin')
+        ).distinct().order_by('id'))
     
     @staticmethod
     def check_overdue_obligations():
         """
         Verifica obrigações em atraso (sem submission aprovada).
         Usa deduplicação para evitar spam de notificações.
+        
+        Só são consultadas as obrigações vencidas ainda em aberto que acabaram
+        de vencer ou cujo último lembrete foi há OVERDUE_REMINDER_DAYS dias
+        ou mais (ver core/overdue.py).
         """
+        from django.db.models import Exists, OuterRef
+        
         today = timezone.now().date()
+        remind_before = today - timedelta(days=max(settings.OVERDUE_REMINDER_DAYS, 1) - 1)
         
-        # Buscar todas as obrigações vencidas
-        obligations = Obligation.objects.filter(
+        candidates = Obligation.objects.filter(
+            overdue_resolved=False,
             due_date__lt=today
-        ).select_related('company', 'obligation_type', 'state', 'responsible_user').prefetch_related('submissions')
+        ).filter(
+            Q(overdue_notified_on__isnull=True) | Q(overdue_notified_on__lt=remind_before)
+        )
         
-        notifications_created = 0
+        # Obrigações entregues e aprovadas saem do acompanhamento
+        approved = Submission.objects.filter(obligation=OuterRef('pk'), approval_status='approved')
+        candidates.filter(Exists(approved)).update(overdue_resolved=True)
+        
+        obligations = list(candidates.exclude(Exists(approved)).select_related(
+            'company', 'obligation_type', 'state', 'responsible_user'
+        ).order_by('id'))
+        if not obligations:
+            return 0
+        
+        admins = NotificationService._admin_users()
         
+        notifications = []
         for obligation in obligations:
-            # Verificar se tem submission aprovada
-            has_approved = obligation.submissions.filter(approval_status='approved').exists()
-            if has_approved:
-                continue  # Já foi entregue e aprovada, não precisa notificar
-            
             days_overdue = (today - obligation.due_date).days
+            subject = f'obligation:{obligation.pk}'
             
-            # Criar notificação para o usuário responsável (com deduplicação)
+            # Notificação para o usuário responsável
             if obligation.responsible_user:
-                title = f"🔴 Obrigação em atraso há {days_overdue} dia(s)"
-                message = (
-                    f"A obrigação {obligation.obligation_type.name} da empresa "
-                    f"{obligation.company.name} está em atraso há {days_overdue} dia(s). "
-                    f"Venceu em {obligation.due_date.strftime('%d/%m/%Y')}."
-                )
-                
-                notification = NotificationService._create_deduplicated_notification(
+                notifications.append(Notification(
                     user=obligation.responsible_user,
                     obligation=obligation,
-                    notification_type='overdue',
-                    title=title,
-                    message=message,
-                    priority='urgent'
-                )
-                if notification:
-                    notifications_created += 1
-            
-            # Notificar administradores (com deduplicação)
-            # Buscar superusers e usuários no grupo Admin
-            from django.contrib.auth.models import Group
-            admin_group = Group.objects.filter(name='Admin').first()
-            if admin_group:
-                admins = User.objects.filter(
-                    Q(is_superuser=True) | Q(groups=admin_group)
-                ).distinct()
-            else:
-                admins = User.objects.filter(is_superuser=True)
+                    type='overdue',
+                    priority='urgent',
+                    title=f"🔴 Obrigação em atraso há {days_overdue} dia(s)",
+                    message=(
+                        f"A obrigação {obligation.obligation_type.name} da empresa "
+                        f"{obligation.company.name} está em atraso há {days_overdue} dia(s). "
+                        f"Venceu em {obligation.due_date.strftime('%d/%m/%Y')}."
+                    ),
+                    dedupe_key=Notification.make_dedupe_key(obligation.responsible_user.pk, subject, 'overdue', today)
+                ))
             
+            # Notificar administradores
+            title = f"🚨 Obrigação em atraso há {days_overdue} dia(s)"
+            message = (
+                f"A obrigação {obligation.obligation_type.name} da empresa "
+                f"{obligation.company.name} ({obligation.state.code}) está em atraso há "
+                f"{days_overdue} dia(s). Responsável: {obligation.responsible_user.username if obligation.responsible_user else 'Não definido'}."
+            )
             for admin in admins:
-                title = f"🚨 Obrigação em atraso há {days_overdue} dia(s)"
-                message = (
-                    f"A obrigação {obligation.obligation_type.name} da empresa "
-                    f"{obligation.company.name} ({obligation.state.code}) está em atraso há "
-                    f"{days_overdue} dia(s). Responsável: {obligation.responsible_user.username if obligation.responsible_user else 'Não definido'}."
-                )
-                
-                notification = NotificationService._create_deduplicated_notification(
+                notifications.append(Notification(
                     user=admin,
                     obligation=obligation,
-                    notification_type='overdue',
+                    type='overdue',
+                    priority='urgent',
                     title=title,
                     message=message,
-                    priority='urgent'
-                )
-                if notification:
-                    notifications_created += 1
+                    dedupe_key=Notification.make_dedupe_key(admin.pk, subject, 'overdue', today)
+                ))
+        
+        notifications_created = NotificationService._bulk_create_deduplicated(notifications)
+        
+        obligation_ids = [obligation.pk for obligation in obligations]
+        for i in range(0, len(obligation_ids), 500):
+            Obligation.objects.filter(pk__in=obligation_ids[i:i + 500]).update(overdue_notified_on=today)
         
         return notifications_created
     
     @staticmethod
-    def check_late_deliveries():
+    def check_late_deliveries(full=False, batch_size=500):
         """
         Verifica entregas atrasadas (submissions após o vencimento da obrigação).
         Notifica admins sobre entregas que foram feitas após o vencimento.
+        
+        Incremental: processa apenas submissions criadas ou alteradas depois
+        da última execução (marca d'água (updated_at, id) em JobCheckpoint).
+        full=True revarre todas as submissions, ex.: após mudar o vencimento
+        de obrigações já entregues.
+        
+        Cada entrega atrasada é notificada uma única vez por admin (dedupe_key
+        sem o dia): alterar a submission depois (aprovação, revisão) a traz de
+        volta à varredura, mas não repete o aviso.
         """
-        from django.contrib.auth.models import Group
         from django.db.models import F
         
-        today = timezone.now().date()
         notifications_created = 0
         
-        # Buscar todas as submissions feitas após o vencimento
+        checkpoint, _ = JobCheckpoint.objects.get_or_create(name=LATE_DELIVERIES_CHECKPOINT)
+        
         submissions = Submission.objects.filter(
             delivery_date__gt=F('obligation__due_date')
-        ).select_related(
+        )
+        position = checkpoint.position
+        if position and not full:
+            updated_at = datetime.fromisoformat(position['updated_at'])
+            submissions = submissions.filter(
+                Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=position['id'])
+            )
+        submissions = submissions.select_related(
             'obligation__company',
             'obligation__obligation_type',
             'obligation__state',
             'delivered_by'
-        )
+        ).order_by('updated_at', 'id')
         
+        admins = NotificationService._admin_users()
+        
+        batch = []
+        for submission in submissions.iterator(chunk_size=batch_size):
+            batch.append(submission)
+            if len(batch) >= batch_size:
+                notifications_created += NotificationService._notify_late_deliveries(batch, admins)
+                NotificationService._save_late_deliveries_checkpoint(checkpoint, batch[-1])
+                batch = []
+        if batch:
+            notifications_created += NotificationService._notify_late_deliveries(batch, admins)
+            NotificationService._save_late_deliveries_checkpoint(checkpoint, batch[-1])
+        
+        return notifications_created
+    
+    @staticmethod
+    def _save_late_deliveries_checkpoint(checkpoint, submission):
+        checkpoint.position = {'updated_at': submission.updated_at.isoformat(), 'id': submission.id}
+        checkpoint.save(update_fields=['position', 'updated_at'])
+    
+    @staticmethod
+    def _notify_late_deliveries(submissions, admins):
+        """Cria as notificações de um lote de entregas atrasadas"""
+        notifications = []
         for submission in submissions:
             days_late = (submission.delivery_date - submission.obligation.due_date).days
             
-            # Notificar administradores sobre entrega atrasada
-            admin_group = Group.objects.filter(name='Admin').first()
-            if admin_group:
-                admins = User.objects.filter(
-                    Q(is_superuser=True) | Q(groups=admin_group)
-                ).distinct()
-            else:
-                admins = User.objects.filter(is_superuser=True)
+            status_text = {
+                'approved': 'Aprovada',
+                'pending_review': 'Pendente de Revisão',
+                'needs_revision': 'Necessita Revisão',
+                'rejected': 'Recusada'
+            }.get(submission.approval_status, submission.approval_status)
             
+            title = f"⚠️ Entrega atrasada - {days_late} dia(s) após vencimento"
+            message = (
+                f"Uma entrega foi feita {days_late} dia(s) após o vencimento da obrigação "
+                f"{submission.obligation.obligation_type.name} da empresa "
+                f"{submission.obligation.company.name} ({submission.obligation.state.code}). "
+                f"Vencimento: {submission.obligation.due_date.strftime('%d/%m/%Y')}. "
+                f"Entrega: {submission.delivery_date.strftime('%d/%m/%Y')}. "
+                f"Status: {status_text}. "
+                f"Entregue por: {submission.delivered_by.username if submission.delivered_by else 'N/A'}."
+            )
+            
+            # Notificar administradores sobre entrega atrasada
             for admin in admins:
-                status_text = {
-                    'approved': 'Aprovada',
-                    'pending_review': 'Pendente de Revisão',
-                    'needs_revision': 'Necessita Revisão',
-                    'rejected': 'Recusada'
-                }.get(submission.approval_status, submission.approval_status)
-                
-                title = f"⚠️ Entrega atrasada - {days_late} dia(s) após vencimento"
-                message = (
-                    f"Uma entrega foi feita {days_late} dia(s) após o vencimento da obrigação "
-                    f"{submission.obligation.obligation_type.name} da empresa "
-                    f"{submission.obligation.company.name} ({submission.obligation.state.code}). "
-                    f"Vencimento: {submission.obligation.due_date.strftime('%d/%m/%Y')}. "
-                    f"Entrega: {submission.delivery_date.strftime('%d/%m/%Y')}. "
-                    f"Status: {status_text}. "
-                    f"Entregue por: {submission.delivered_by.username if submission.delivered_by else 'N/A'}."
-                )
-                
-                notification = NotificationService._create_deduplicated_notification(
+                notifications.append(Notification(
                     user=admin,
                     obligation=submission.obligation,
-                    notification_type='overdue',
+                    type='overdue',
+                    priority='high',
                     title=title,
                     message=message,
-                    priority='high'
-                )
-                if notification:
-                    notifications_created += 1
+                    dedupe_key=Notification.make_dedupe_key(admin.pk, f'submission:{submission.pk}', 'overdue', once=True)
+                ))
         
-        return notifications_created
+        return NotificationService._bulk_create_deduplicated(notifications)
+    
+    @staticmethod
+    def purge_read_notifications(days=None, batch_size=1000, pause=0):
+        """
+        Remove notificações lidas criadas há mais de `days` dias
+        (padrão: settings.NOTIFICATION_RETENTION_DAYS). Retorna a quantidade removida.
+        
+        Remove em lotes de batch_size, cada um em sua própria transação, para
+        não segurar locks na tabela; pause (segundos) dá folga entre lotes.
+        """
+        import time
+        from django.db import transaction
+        
+        days = settings.NOTIFICATION_RETENTION_DAYS if days is None else days
+        cutoff = timezone.now() - timedelta(days=days)
+        expired = Notification.objects.filter(is_read=True, created_at__lt=cutoff).order_by('created_at', 'id')
+        
+        deleted = 0
+        while True:
+            # Lote travado na própria transação: uma exclusão concorrente (pelo
+            # usuário) espera ou já ficou de fora, e os contadores são ajustados
+            # pelas linhas de fato excluídas (post_delete agregado por usuário)
+            with transaction.atomic(), notification_counters.batched_deletes():
+                ids = list(expired.select_for_update().values_list('id', flat=True)[:batch_size])
+                if ids:
+                    count, _ = Notification.objects.filter(id__in=ids).delete()
+                    deleted += count
+            if len(ids) < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+        
+        return deleted
     
     @staticmethod
     def send_email_notifications():
-        """Envia notificações por email para usuários com notificações não lidas"""
+        """
+        Enfileira notificações por email para usuários com notificações não lidas.
+        O envio é feito pelo comando send_outbound_emails. Retorna a quantidade
+        de emails enfileirados.
+        """
+        from django.db.models import Count
+        from . import mailer
+        
         users_with_notifications = User.objects.filter(
             notifications__is_read=False
-        ).distinct()
-        
-        emails_sent = 0
-        
-        for user in users_with_notifications:
-            unread_count = user.notifications.filter(is_read=False).count()
+        ).exclude(email='').annotate(
+            unread_count=Count('notifications')
+        ).values_list('email', 'unread_count')
+        
+        return mailer.enqueue(
+            mailer.queue_message(
+                subject=f'[Sistema] Você tem {unread_count} notificação(ões) pendente(s)',
+                body=f'Você tem {unread_count} notificação(ões) não lida(s) no sistema de Controle de Obrigações Acessórias.',
+                recipients=[email],
+                from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None) or 'noreply@sistema.com'
+            )
+            for email, unread_count in users_with_notifications
+        )
+    
+    @staticmethod
+    def queue_due_reminders(days=3):
+        """
+        Enfileira um resumo por destinatário das obrigações que vencem em
+        `days` dias: o responsável recebe as suas, administradores recebem
+        todas. Retorna (emails enfileirados, obrigações no período).
+        """
+        from . import mailer
+        
+        target = timezone.now().date() + timedelta(days=days)
+        obligations = list(Obligation.objects.filter(due_date=target).select_related(
+            'obligation_type', 'company', 'state'
+        ).order_by('company__name', 'id'))
+        if not obligations:
+            return 0, 0
+        
+        admin_ids = {admin.id for admin in NotificationService._admin_users()}
+        responsible_ids = {o.responsible_user_id for o in obligations if o.responsible_user_id}
+        recipients = User.objects.filter(
+            id__in=admin_ids | responsible_ids, is_active=True
+        ).exclude(email='').order_by('id')
+        
+        emails = []
+        for user in recipients:
+            if user.id in admin_ids:
+                items = obligations
+            else:
+                items = [o for o in obligations if o.responsible_user_id == user.id]
             
-            if unread_count > 0 and user.email:
-                try:
-                    send_mail(
-                        subject=f'[Sistema] Você tem {unread_count} notificação(ões) pendente(s)',
-                        message=f'Você tem {unread_count} notificação(ões) não lida(s) no sistema de Controle de Obrigações Acessórias.',
-                        from_email=settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@sistema.com',
-                        recipient_list=[user.email],
-                        fail_silently=True
-                    )
-                    emails_sent += 1
-                except Exception:
-                    pass
-        
-        return emails_sent
+            lines = [
+                f'- {o.obligation_type.name} — {o.company.name}/{o.state.code} ({o.competence})\n'
+                f'  Prazo de entrega: {o.delivery_deadline or "-"}\n'
+                f'  Notas: {o.notes or "-"}'
+                for o in items
+            ]
+            emails.append(mailer.queue_message(
+                subject=f'[Alerta] {len(items)} obrigação(ões) vence(m) em {days} dia(s) ({target.strftime("%d/%m/%Y")})',
+                body=f'Vencimento: {target}\n\n' + '\n'.join(lines),
+                recipients=[user.email]
+            ))
+        
+        return mailer.enqueue(emails), len(obligations)
 
 
 class ObligationPlanningService:
@@ -0,0 +1,184 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import mailer
+from core.models import OutboundEmail
+
+LOCMEM = 'django.core.mail.backends.locmem.EmailBackend'
+FAILING = 'core.tests.FailingBackend'
+
+
+class FailingBackend(LocmemBackend):
+    """locmem que recusa destinatários contendo 'fail' e conta aberturas de conexão"""
+    opened = 0
+
+    def open(self):
+        FailingBackend.opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        for message in messages:
+            if any('fail' in address for address in message.to):
+                raise ConnectionError(f'recusado: {message.to[0]}')
+        return super().send_messages(messages)
+
+
+def _messages(count, prefix='user'):
+    return [
+        mailer.build_message(f'Assunto {i}', 'corpo', [f'{prefix}{i}@example.com'])
+        for i in range(count)
+    ]
+
+
+@override_settings(EMAIL_BACKEND=LOCMEM, EMAIL_WORKERS=1, EMAIL_BATCH_SIZE=50, EMAIL_RATE_LIMIT=0)
+class SendMessagesTests(TestCase):
+    def test_sends_all_messages_in_input_order(self):
+        results = mailer.send_messages(_messages(5))
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual([result['to'] for result in results], [[f'user{i}@example.com'] for i in range(5)])
+        self.assertTrue(all(result['sent'] and result['error'] is None for result in results))
+        self.assertEqual(mailer.count_sent(results), 5)
+
+    def test_one_connection_per_batch(self):
+        with mock.patch('core.mailer.get_connection', wraps=mailer.get_connection) as get_connection:
+            results = mailer.send_messages(_messages(5), batch_size=2)
+
+        self.assertEqual(get_connection.call_count, 3)
+        self.assertEqual(mailer.count_sent(results), 5)
+
+    def test_parallel_batches_keep_order(self):
+        results = mailer.send_messages(_messages(7), workers=3, batch_size=2)
+
+        self.assertEqual(len(mail.outbox), 7)
+        self.assertEqual([result['subject'] for result in results], [f'Assunto {i}' for i in range(7)])
+
+    def test_failure_does_not_stop_the_batch(self):
+        messages = _messages(2) + _messages(1, prefix='fail') + _messages(2, prefix='other')
+        FailingBackend.opened = 0
+
+        results = mailer.send_messages(messages, backend=FAILING)
+
+        self.assertEqual([result['sent'] for result in results], [True, True, False, True, True])
+        self.assertIn('recusado', results[2]['error'])
+        self.assertEqual(len(mail.outbox), 4)
+        # Conexão reaberta após a falha
+        self.assertEqual(FailingBackend.opened, 2)
+
+    def test_empty_input(self):
+        self.assertEqual(mailer.send_messages([]), [])
+
+
+class RateLimiterTests(TestCase):
+    def test_spaces_calls(self):
+        with mock.patch('core.mailer.time.monotonic', return_value=100.0), \
+                mock.patch('core.mailer.time.sleep') as sleep:
+            limiter = mailer.RateLimiter(10)
+            for _ in range(4):
+                limiter.acquire()
+
+        waits = [call.args[0] for call in sleep.call_args_list]
+        self.assertEqual(len(waits), 3)
+        for expected, wait in zip([0.1, 0.2, 0.3], waits):
+            self.assertAlmostEqual(wait, expected)
+
+    def test_disabled(self):
+        limiter = mailer.RateLimiter(0)
+        with mock.patch('core.mailer.time.sleep') as sleep:
+            for _ in range(10):
+                limiter.acquire()
+        sleep.assert_not_called()
+
+
+@override_settings(
+    EMAIL_BACKEND=LOCMEM, EMAIL_WORKERS=1, EMAIL_BATCH_SIZE=50, EMAIL_RATE_LIMIT=0,
+    EMAIL_MAX_ATTEMPTS=3, EMAIL_RETRY_BASE_SECONDS=60, EMAIL_SEND_LEASE_SECONDS=300
+)
+class OutboxTests(TestCase):
+    def _make_due(self):
+        OutboundEmail.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+    def test_enqueue_deduplicates_same_email(self):
+        message = mailer.queue_message('Assunto', 'corpo', ['a@example.com'])
+        duplicate = mailer.queue_message('Assunto', 'corpo', ['a@example.com'])
+
+        self.assertEqual(mailer.enqueue([message, duplicate]), 1)
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+        # Já na fila: nada inserido
+        self.assertEqual(mailer.enqueue([mailer.queue_message('Assunto', 'corpo', ['a@example.com'])]), 0)
+
+    def test_enqueue_without_dedupe_key_always_inserts(self):
+        emails = [mailer.queue_message('Assunto', 'corpo', ['a@example.com'], dedupe_key=None) for _ in range(2)]
+
+        self.assertEqual(mailer.enqueue(emails), 2)
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+
+    def test_drain_sends_pending(self):
+        mailer.enqueue([mailer.queue_message('Assunto', 'corpo', ['a@example.com'])])
+
+        summary = mailer.drain_outbox()
+
+        self.assertEqual(summary, {'sent': 1, 'retry': 0, 'dead': 0})
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, 'sent')
+        self.assertIsNotNone(email.sent_at)
+        self.assertIsNone(email.locked_by)
+        self.assertEqual(len(mail.outbox), 1)
+        # Nada mais vencido
+        self.assertEqual(mailer.drain_outbox(), {'sent': 0, 'retry': 0, 'dead': 0})
+
+    def test_retry_backoff_then_dead(self):
+        mailer.enqueue([mailer.queue_message('Assunto', 'corpo', ['fail@example.com'])])
+
+        before = timezone.now()
+        self.assertEqual(mailer.drain_outbox(backend=FAILING), {'sent': 0, 'retry': 1, 'dead': 0})
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertIn('recusado', email.last_error)
+        self.assertGreaterEqual(email.next_attempt_at, before + timedelta(seconds=60))
+
+        # Ainda não vencido: não é reservado
+        self.assertEqual(mailer.drain_outbox(backend=FAILING), {'sent': 0, 'retry': 0, 'dead': 0})
+
+        self._make_due()
+        before = timezone.now()
+        mailer.drain_outbox(backend=FAILING)
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 2)
+        self.assertGreaterEqual(email.next_attempt_at, before + timedelta(seconds=120))
+
+        self._make_due()
+        self.assertEqual(mailer.drain_outbox(backend=FAILING), {'sent': 0, 'retry': 0, 'dead': 1})
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('dead', 3))
+
+        self.assertEqual(mailer.requeue_dead(), 1)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('pending', 0))
+
+    def test_retry_delay_is_capped(self):
+        self.assertEqual(mailer.retry_delay(1), timedelta(seconds=60))
+        self.assertEqual(mailer.retry_delay(3), timedelta(seconds=240))
+        self.assertEqual(mailer.retry_delay(30), timedelta(days=1))
+
+    def test_leased_emails_are_not_claimed_twice(self):
+        mailer.enqueue([mailer.queue_message('Assunto', 'corpo', ['a@example.com'])])
+
+        claimed = mailer._claim_outbox(10, 'worker-1', timezone.now())
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(mailer._claim_outbox(10, 'worker-2', timezone.now()), [])
+
+    def test_stats(self):
+        mailer.enqueue([
+            mailer.queue_message('A', 'corpo', ['a@example.com']),
+            mailer.queue_message('B', 'corpo', ['fail@example.com']),
+        ])
+        mailer.drain_outbox(backend=FAILING)
+
+        stats = mailer.outbox_stats()
+        self.assertEqual((stats['pending'], stats['due'], stats['sent'], stats['dead']), (1, 0, 1, 0))
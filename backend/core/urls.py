@@ -7,7 +7,7 @@ from .views import (
     ObligationViewSet, SubmissionViewSet, report_summary, report_detailed, report_csv, report_xlsx, 
     dashboard_metrics, bulk_import_obligations, bulk_import_companies, 
     download_template, send_reminders, get_notifications, mark_notification_read,
-    mark_all_notifications_read, get_notification_stats, generate_obligations,
+    mark_all_notifications_read, get_notification_stats, notifications_stream, generate_obligations,
     check_due_dates, check_overdue_obligations, send_email_notifications,
     advanced_reports_summary, user_performance_report
 )
@@ -15,7 +15,8 @@ from .views_recurrence import preview_recurrence, generate_recurrence
 from .views_deliveries import get_company_obligations, download_delivery_template, bulk_deliveries, bulk_attachments, list_deliveries
 from .views_users import list_users_admin, set_user_role, get_user_history, get_user_stats, delete_user, change_user_password, create_user
 from .views_approvals import (
-    pending_approvals, approve_submission, reject_submission, request_revision,
+    pending_approvals, approve_submission, reject_submission, request_revision, bulk_decision,
+    claim_submissions, release_submissions,
     resubmit_submission, submission_timeline, download_attachment, my_deliveries
 )
 from .views_dispatches import DispatchViewSet, DispatchSubtaskViewSet, run_dispatch_notifications, recalculate_dispatch_progress
@@ -56,6 +57,7 @@ urlpatterns = [
     # Notificações
     path('notifications/', get_notifications, name='notifications'),
     path('notifications/stats/', get_notification_stats, name='notification_stats'),
+    path('notifications/stream/', notifications_stream, name='notifications_stream'),
     path('notifications/<int:notification_id>/read/', mark_notification_read, name='mark_notification_read'),
     path('notifications/read-all/', mark_all_notifications_read, name='mark_all_notifications_read'),
     # Planejamento Automático
@@ -78,6 +80,9 @@ urlpatterns = [
     # Sistema de Aprovação
     path('approvals/pending/', pending_approvals, name='pending_approvals'),
     path('approvals/my-deliveries/', my_deliveries, name='my_deliveries'),
+    path('approvals/bulk/', bulk_decision, name='bulk_decision'),
+    path('approvals/claim/', claim_submissions, name='claim_submissions'),
+    path('approvals/release/', release_submissions, name='release_submissions'),
     path('approvals/<int:submission_id>/approve/', approve_submission, name='approve_submission'),
     path('approvals/<int:submission_id>/reject/', reject_submission, name='reject_submission'),
     path('approvals/<int:submission_id>/request-revision/', request_revision, name='request_revision'),
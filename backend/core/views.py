@@ -1,18 +1,19 @@
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, renderer_classes
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.contrib.auth.models import User, Group
-from django.db.models import Count, F, Q, Exists, OuterRef
-from django.http import HttpResponse
+from django.contrib.auth.models import User
+from django.db.models import Count, F, Q, Exists, OuterRef, Sum
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse, StreamingHttpResponse
 import csv
 from django.utils import timezone
-from django.core.mail import send_mail
 import io
 import datetime
 from openpyxl import Workbook
 
-from .models import State, Company, ObligationType, Obligation, Submission, Notification
+from .models import State, Company, ObligationType, Obligation, Submission, Notification, NotificationCounter
 from .serializers import (
     UserSerializer, RegisterSerializer,
     StateSerializer, CompanySerializer, ObligationTypeSerializer,
@@ -20,6 +21,11 @@ from .serializers import (
 )
 from .services import NotificationService, ObligationPlanningService
 from .permissions import IsAdmin, IsUsuario, ReadOnlyOrCreateForUsuario, IsAdminOrReadOnly
+from .roles import get_user_roles, user_in_roles
+from . import audit as audit_log
+from . import notification_counters
+from .pagination import keyset_paginate
+from .notification_stream import EventStreamRenderer, event_stream, publish as publish_notifications
 
 class IsAuthenticatedOrCreate(permissions.IsAuthenticated):
     def has_permission(self, request, view):
@@ -48,13 +54,8 @@ def get_current_user(request):
     """Retorna informações do usuário atual"""
     try:
         user = request.user
-        groups = list(user.groups.values_list('name', flat=True))
-        
-        # Se for superuser, automaticamente tem role Admin
-        if user.is_superuser and 'Admin' not in groups:
-            admin_group, created = Group.objects.get_or_create(name='Admin')
-            user.groups.add(admin_group)
-            groups = list(user.groups.values_list('name', flat=True))
+        # Superuser automaticamente tem role Admin (ver core/roles.py)
+        groups = sorted(get_user_roles(user, request.auth))
         
         return Response({
             'id': user.id,
@@ -252,7 +253,7 @@ def report_detailed(request):
     ).prefetch_related(
         Prefetch('submissions', queryset=Submission.objects.select_related(
             'delivered_by', 'approval_decision_by'
-        ).order_by('-delivered_at'))
+        ).annotate(attachments_total=Count('attachments')).order_by('-delivered_at'))
     )
     
     # Aplicar filtros
@@ -316,7 +317,11 @@ def report_detailed(request):
     rows = []
     for obligation in qs:
         # Determinar status - considerar apenas submissions aprovadas
-        latest_submission = obligation.submissions.filter(approval_status='approved').order_by('-delivered_at').first()
+        # (submissions já pré-carregadas em ordem de -delivered_at)
+        submissions = list(obligation.submissions.all())
+        latest_submission = next(
+            (submission for submission in submissions if submission.approval_status == 'approved'), None
+        )
         
         if latest_submission:
             status = 'entregue'
@@ -340,8 +345,8 @@ def report_detailed(request):
             continue
         
         # Contar anexos (receipt_file + attachments)
-        receipt_files = obligation.submissions.filter(receipt_file__isnull=False).count()
-        attachment_files = sum(submission.attachments.count() for submission in obligation.submissions.all())
+        receipt_files = sum(1 for submission in submissions if submission.receipt_file)
+        attachment_files = sum(submission.attachments_total for submission in submissions)
         total_attachments = receipt_files + attachment_files
         
         # Informações da última entrega
@@ -364,7 +369,7 @@ def report_detailed(request):
                 'delivery_date': latest_submission.delivery_date.isoformat(),
                 'comments': latest_submission.comments or '',
                 'has_receipt_file': bool(latest_submission.receipt_file),
-                'attachments_count': latest_submission.attachments.count(),
+                'attachments_count': latest_submission.attachments_total,
                 'approval_status': latest_submission.approval_status,
                 'approval_decision_at': latest_submission.approval_decision_at.isoformat() if latest_submission.approval_decision_at else None,
                 'approval_decision_by': approver_info,
@@ -802,20 +807,11 @@ ROLE_FISCAL = 'Fiscal'
 ROLE_VISUALIZADOR = 'Visualizador'
 
 def user_has_role(user, role):
-    return user.is_superuser or user.groups.filter(name=role).exists()
+    return user_in_roles(user, (role,))
 
 def audit(user, action, instance, changes=None):
-    from .models import AuditLog
-    try:
-        AuditLog.objects.create(
-            user=user if user.is_authenticated else None,
-            action=action,
-            model=instance.__class__.__name__,
-            object_id=str(instance.pk),
-            changes=changes or {},
-        )
-    except Exception:
-        pass
+    # Gravado em lote ao fim da requisição (core/audit.py)
+    audit_log.log_instance(user, action, instance, changes or {})
 
 
 @api_view(['GET'])
@@ -986,6 +982,11 @@ def dashboard_metrics(request):
     months = sorted(total.keys())[-6:]
     atraso_series = [atrasos.get(m,0) for m in months]
     
+    # Soma dos contadores por usuário em vez de COUNT(*) nas notificações
+    notification_totals = NotificationCounter.objects.aggregate(
+        total=Coalesce(Sum('total'), 0), unread=Coalesce(Sum('unread'), 0)
+    )
+    
     return Response({
         # Métricas gerais
         'total_obligations': total_obligations,
@@ -1026,10 +1027,7 @@ def dashboard_metrics(request):
         'delivered_obligations_month': sum(1 for o in Obligation.objects.filter(competence=current_month) if o.submissions.filter(approval_status='approved').exists()),
         
         # Estatísticas de notificações
-        'notifications': {
-            'total': Notification.objects.count(),
-            'unread': Notification.objects.filter(is_read=False).count()
-        },
+        'notifications': notification_totals,
         
         # Filtros aplicados
         'filters_applied': {
@@ -1320,58 +1318,81 @@ def download_template(request, template_type):
 
 @api_view(['POST'])
 def send_reminders(request):
+    """Enfileira um resumo por usuário das obrigações que vencem em `days` dias"""
     days = int(request.data.get('days', 3))
-    today = timezone.now().date()
-    target = today + datetime.timedelta(days=days)
-    count = 0
-    recipients = [u.email for u in User.objects.exclude(email='').all()]
-    for o in Obligation.objects.filter(due_date=target):
-        try:
-            send_mail(
-                subject=f'[Alerta] Obrigação vence em {days} dia(s): {o.obligation_type.name} — {o.company.name}/{o.state.code} ({o.competence})',
-                message=f'Vencimento: {o.due_date}\nPrazo de entrega: {o.delivery_deadline or "-"}\nNotas: {o.notes or "-"}',
-                from_email=EMAIL_HOST_USER if 'EMAIL_HOST_USER' in globals() else None,
-                recipient_list=recipients,
-                fail_silently=True
-            )
-            count += 1
-        except Exception:
-            pass
-    return Response({'emails_sent_for': count})
+    emails_queued, obligations = NotificationService.queue_due_reminders(days)
+    # Envio pelo comando send_outbound_emails
+    return Response({'emails_queued': emails_queued, 'obligations': obligations})
 
 # Views para Notificações
 @api_view(['GET'])
 def get_notifications(request):
-    """Lista notificações do usuário"""
-    notifications = Notification.objects.filter(user=request.user).order_by('-created_at')
-    serializer = NotificationSerializer(notifications, many=True)
-    return Response(serializer.data)
+    """
+    Lista notificações do usuário, mais recentes primeiro, paginadas por cursor.
+    
+    Query params:
+    - unread_only=true: apenas não lidas
+    - type: due_soon | overdue | reminder | system | approval
+    - cursor / page_size (padrão 20): ver core/pagination.py
+    """
+    notifications = Notification.objects.filter(user_id=request.user.id)
+    if request.GET.get('unread_only', '').lower() in ('1', 'true'):
+        notifications = notifications.filter(is_read=False)
+    if request.GET.get('type'):
+        notifications = notifications.filter(type=request.GET['type'])
+    
+    page, next_cursor = keyset_paginate(notifications, request, 'created_at', default_page_size=20)
+    total, unread = notification_counters.get_counts(request.user.id)
+    
+    return Response({
+        'results': NotificationSerializer(page, many=True).data,
+        'next_cursor': next_cursor,
+        'total': total,
+        'unread': unread
+    })
 
 @api_view(['POST'])
 def mark_notification_read(request, notification_id):
     """Marca uma notificação como lida"""
-    try:
-        notification = Notification.objects.get(id=notification_id, user=request.user)
-        notification.is_read = True
-        notification.read_at = timezone.now()
-        notification.save()
-        return Response({'status': 'success'})
-    except Notification.DoesNotExist:
+    if not notification_counters.mark_read(request.user.id, notification_id):
         return Response({'error': 'Notificação não encontrada'}, status=404)
+    publish_notifications([request.user.id])
+    return Response({'status': 'success'})
 
 @api_view(['POST'])
 def mark_all_notifications_read(request):
     """Marca todas as notificações como lidas"""
-    Notification.objects.filter(user=request.user, is_read=False).update(
-        is_read=True, read_at=timezone.now()
-    )
+    notification_counters.mark_all_read(request.user.id)
+    publish_notifications([request.user.id])
     return Response({'status': 'success'})
 
+@api_view(['GET'])
+@renderer_classes([EventStreamRenderer, JSONRenderer])
+def notifications_stream(request):
+    """
+    Stream SSE de notificações e contagem de não lidas do usuário
+    (ver core/notification_stream.py). Aceita Last-Event-ID (ou ?last_id=)
+    para retomar de onde parou.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    response = StreamingHttpResponse(
+        event_stream(request.user.id, last_event_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @api_view(['GET'])
 def get_notification_stats(request):
-    """Estatísticas de notificações"""
-    total = Notification.objects.filter(user=request.user).count()
-    unread = Notification.objects.filter(user=request.user, is_read=False).count()
+    """Estatísticas de notificações (contador materializado, ver core/notification_counters.py)"""
+    # user_id: não carrega o User quando a autenticação é stateless
+    total, unread = notification_counters.get_counts(request.user.id)
     
     return Response({
         'total': total,
@@ -1435,12 +1456,12 @@ def check_overdue_obligations(request):
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def send_email_notifications(request):
-    """Envia notificações por email"""
+    """Enfileira notificações por email (enviadas pelo comando send_outbound_emails)"""
     try:
-        emails_sent = NotificationService.send_email_notifications()
+        emails_queued = NotificationService.send_email_notifications()
         return Response({
-            'emails_sent': emails_sent,
-            'message': f'{emails_sent} emails enviados'
+            'emails_queued': emails_queued,
+            'message': f'{emails_queued} emails enfileirados para envio'
         })
     except Exception as e:
         return Response({'error': str(e)}, status=400)
@@ -1,9 +1,6 @@
 """
 Views para o fluxo de aprovação de entregas
 """
-import os
-import mimetypes
-from django.http import FileResponse, HttpResponse
 from django.db import transaction
 from django.utils import timezone
 from django.core.mail import send_mail
@@ -12,15 +9,19 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status, permissions
 
-from .models import Submission, SubmissionAttachment, Notification, AuditLog
+from .models import Submission, SubmissionAttachment, SubmissionEvent, Notification
+from . import audit as audit_log
 from .permissions import IsApprover
+from .roles import request_has_role
 from .serializers import SubmissionSerializer
 from .services import NotificationService
+from .downloads import serve_file, receipt_filename, attachment_download_url
+from .pagination import keyset_paginate
 
 
 def audit_approval_action(user, submission, action, comment=None):
     """
-    Registrar ação de aprovação no audit log
+    Registrar ação de aprovação no audit log e na timeline da submission
     """
     changes = {
         'approval_status': submission.approval_status,
@@ -29,21 +30,172 @@ def audit_approval_action(user, submission, action, comment=None):
     if comment:
         changes['comment'] = comment
     
-    AuditLog.objects.create(
-        user=user,
-        action=action,
-        model='Submission',
-        object_id=str(submission.id),
-        changes=changes
+    entry = audit_log.log(user, action, 'Submission', submission.id, changes)
+    # Mesmo timestamp do AuditLog: backfill_submission_events não duplica
+    SubmissionEvent.objects.create(
+        submission=submission,
+        event_type=action,
+        actor_id=user.pk,
+        comment=comment,
+        timestamp=entry.timestamp
     )
 
 
+APPROVAL_STATUS_INFO = {
+    'pending_review': {'label': 'Pendente de Revisão', 'icon': '⏳', 'color': 'gray'},
+    'approved': {'label': 'Aprovada', 'icon': '✅', 'color': 'green'},
+    'rejected': {'label': 'Recusada', 'icon': '❌', 'color': 'red'},
+    'needs_revision': {'label': 'Necessita Revisão', 'icon': '⚠️', 'color': 'yellow'}
+}
+
+
+TIMELINE_EVENT_INFO = {
+    'approved': {'label': 'Aprovada', 'icon': '✅', 'color': 'green'},
+    'rejected': {'label': 'Recusada', 'icon': '❌', 'color': 'red'},
+    'revision_requested': {'label': 'Revisão Solicitada', 'icon': '⚠️', 'color': 'yellow'},
+    'resubmitted': {'label': 'Reenviada', 'icon': '🔄', 'color': 'purple'}
+}
+
+
+def lease_conflict_response(submission, user):
+    """
+    Resposta 409 se a submission está reservada (lease válido) por outro
+    aprovador, ou None se o usuário pode decidir.
+    """
+    if submission.is_claimed_by_other(user, timezone.now()):
+        return Response(
+            {
+                'error': f'Submission em análise por {submission.claimed_by.username}',
+                'claimed_by': submission.claimed_by.username,
+                'claim_expires_at': submission.claim_expires_at.isoformat()
+            },
+            status=status.HTTP_409_CONFLICT
+        )
+    return None
+
+
+def approval_facets(queryset, status_filter=None):
+    """
+    Contagens por status, empresa e tipo de obrigação em um único GROUP BY.
+    
+    A contagem por status ignora o filtro de status (para mostrar as demais
+    abas); empresa e tipo consideram apenas o status filtrado.
+    """
+    from django.db.models import Count
+    
+    rows = queryset.order_by().values(
+        'approval_status',
+        'obligation__company_id',
+        'obligation__company__name',
+        'obligation__obligation_type_id',
+        'obligation__obligation_type__name',
+    ).annotate(total=Count('id'))
+    
+    by_status = {key: 0 for key in APPROVAL_STATUS_INFO}
+    by_company = {}
+    by_type = {}
+    total = 0
+    
+    for row in rows:
+        by_status[row['approval_status']] = by_status.get(row['approval_status'], 0) + row['total']
+        if status_filter and row['approval_status'] != status_filter:
+            continue
+        
+        total += row['total']
+        company = by_company.setdefault(row['obligation__company_id'], {
+            'id': row['obligation__company_id'],
+            'name': row['obligation__company__name'],
+            'count': 0
+        })
+        company['count'] += row['total']
+        obligation_type = by_type.setdefault(row['obligation__obligation_type_id'], {
+            'id': row['obligation__obligation_type_id'],
+            'name': row['obligation__obligation_type__name'],
+            'count': 0
+        })
+        obligation_type['count'] += row['total']
+    
+    return total, {
+        'status': by_status,
+        'company': sorted(by_company.values(), key=lambda x: x['count'], reverse=True),
+        'obligation_type': sorted(by_type.values(), key=lambda x: x['count'], reverse=True)
+    }
+
+
+def serialize_queue_item(submission):
+    """Item da fila de aprovação (requer select_related/prefetch de pending_approvals)"""
+    attachments = submission.attachments.all()
+    
+    # Preparar lista de anexos com IDs
+    attachments_list = []
+    if submission.receipt_file:
+        attachments_list.append({
+            'id': f'receipt_{submission.id}',
+            'type': 'receipt',
+            'filename': receipt_filename(submission),
+            'size': submission.receipt_size,
+            'content_type': submission.receipt_content_type,
+            'url': attachment_download_url(submission.id, f'receipt_{submission.id}')
+        })
+    
+    for att in attachments:
+        attachments_list.append({
+            'id': att.id,
+            'type': 'attachment',
+            'filename': att.original_filename,
+            'size': att.size,
+            'content_type': att.content_type,
+            'uploaded_at': att.created_at.isoformat()
+        })
+    
+    delivered_by = submission.delivered_by
+    decision_by = submission.approval_decision_by
+    
+    return {
+        'id': submission.id,
+        'company': {
+            'id': submission.obligation.company.id,
+            'name': submission.obligation.company.name,
+            'cnpj': submission.obligation.company.cnpj
+        },
+        'obligation': {
+            'id': submission.obligation.id,
+            'name': submission.obligation.obligation_name or submission.obligation.obligation_type.name,
+            'type': submission.obligation.obligation_type.name,
+            'state': submission.obligation.state.code,
+            'competence': submission.obligation.competence,
+            'due_date': submission.obligation.due_date.isoformat()
+        },
+        'delivery_date': submission.delivery_date.isoformat(),
+        'delivered_at': submission.delivered_at.isoformat(),
+        'delivered_by': {
+            'id': delivered_by.id if delivered_by else None,
+            'username': delivered_by.username if delivered_by else None,
+            'full_name': f"{delivered_by.first_name} {delivered_by.last_name}".strip() if delivered_by else None
+        },
+        'submission_type': submission.submission_type,
+        'comments': submission.comments,
+        'attachments_count': len(attachments_list),
+        'attachments': attachments_list,
+        'approval_status': submission.approval_status,
+        'approval_comment': submission.approval_comment,
+        'approval_decision_at': submission.approval_decision_at.isoformat() if submission.approval_decision_at else None,
+        'approval_decision_by': {
+            'id': decision_by.id if decision_by else None,
+            'username': decision_by.username if decision_by else None,
+            'full_name': f"{decision_by.first_name} {decision_by.last_name}".strip() if decision_by else None
+        },
+        'claimed_by': submission.claimed_by.username if submission.claimed_by else None,
+        'claim_expires_at': submission.claim_expires_at.isoformat() if submission.claim_expires_at else None
+    }
+
+
 @api_view(['GET'])
 @permission_classes([IsApprover])
 def pending_approvals(request):
     """
     GET /api/approvals/pending/
-    Lista submissions para aprovação (somente Admin/Aprovador)
+    Fila de submissions para aprovação (somente Admin/Aprovador)
     
     Query params:
     - company: ID da empresa
@@ -52,17 +204,14 @@ def pending_approvals(request):
     - start_date: data inicial
     - end_date: data final
     - status: filtro por status (pending_review, approved, rejected, needs_revision)
+    - cursor / page_size: paginação por cursor, ordenada por delivered_at, id
+    
+    A resposta inclui as contagens por status, empresa e tipo (facets).
     """
     from django.db.models import Q
     
     # Query base - TODAS as entregas (não apenas pendentes)
-    queryset = Submission.objects.all().select_related(
-        'obligation__company',
-        'obligation__state',
-        'obligation__obligation_type',
-        'delivered_by',
-        'approval_decision_by'
-    ).prefetch_related('attachments').order_by('-delivered_at')
+    queryset = Submission.objects.all()
     
     # Filtros
     company_id = request.GET.get('company')
@@ -72,10 +221,6 @@ def pending_approvals(request):
     end_date = request.GET.get('end_date')
     status_filter = request.GET.get('status')
     
-    # Filtro por status (se não especificado, mostra todos)
-    if status_filter:
-        queryset = queryset.filter(approval_status=status_filter)
-    
     if company_id:
         queryset = queryset.filter(obligation__company_id=company_id)
     
@@ -95,80 +240,32 @@ def pending_approvals(request):
     if end_date:
         queryset = queryset.filter(delivered_at__date__lte=end_date)
     
-    # Serializar dados
-    results = []
-    for submission in queryset:
-        # Contar anexos
-        attachments_count = submission.attachments.count()
-        if submission.receipt_file:
-            attachments_count += 1
-        
-        # Preparar lista de anexos com IDs
-        attachments_list = []
-        if submission.receipt_file:
-            attachments_list.append({
-                'id': f'receipt_{submission.id}',
-                'type': 'receipt',
-                'filename': os.path.basename(submission.receipt_file.name),
-                'url': submission.receipt_file.url if submission.receipt_file else None
-            })
-        
-        for att in submission.attachments.all():
-            attachments_list.append({
-                'id': att.id,
-                'type': 'attachment',
-                'filename': att.original_filename,
-                'uploaded_at': att.created_at.isoformat()
-            })
-        
-        # Informações de status e decisão
-        status_info = {
-            'pending_review': {'label': 'Pendente de Revisão', 'icon': '⏳', 'color': 'gray'},
-            'approved': {'label': 'Aprovada', 'icon': '✅', 'color': 'green'},
-            'rejected': {'label': 'Recusada', 'icon': '❌', 'color': 'red'},
-            'needs_revision': {'label': 'Necessita Revisão', 'icon': '⚠️', 'color': 'yellow'}
-        }
-        
-        results.append({
-            'id': submission.id,
-            'company': {
-                'id': submission.obligation.company.id,
-                'name': submission.obligation.company.name,
-                'cnpj': submission.obligation.company.cnpj
-            },
-            'obligation': {
-                'id': submission.obligation.id,
-                'name': submission.obligation.obligation_name or submission.obligation.obligation_type.name,
-                'type': submission.obligation.obligation_type.name,
-                'state': submission.obligation.state.code,
-                'competence': submission.obligation.competence,
-                'due_date': submission.obligation.due_date.isoformat()
-            },
-            'delivery_date': submission.delivery_date.isoformat(),
-            'delivered_at': submission.delivered_at.isoformat(),
-            'delivered_by': {
-                'id': submission.delivered_by.id if submission.delivered_by else None,
-                'username': submission.delivered_by.username if submission.delivered_by else None,
-                'full_name': f"{submission.delivered_by.first_name} {submission.delivered_by.last_name}".strip() if submission.delivered_by else None
-            },
-            'submission_type': submission.submission_type,
-            'comments': submission.comments,
-            'attachments_count': attachments_count,
-            'attachments': attachments_list,
-            'approval_status': submission.approval_status,
-            'approval_comment': submission.approval_comment,
-            'approval_decision_at': submission.approval_decision_at.isoformat() if submission.approval_decision_at else None,
-            'approval_decision_by': {
-                'id': submission.approval_decision_by.id if submission.approval_decision_by else None,
-                'username': submission.approval_decision_by.username if submission.approval_decision_by else None,
-                'full_name': f"{submission.approval_decision_by.first_name} {submission.approval_decision_by.last_name}".strip() if submission.approval_decision_by else None
-            },
-            'status_info': status_info.get(submission.approval_status, {})
-        })
+    total, facets = approval_facets(queryset, status_filter)
+    
+    # Filtro por status (se não especificado, mostra todos)
+    if status_filter:
+        queryset = queryset.filter(approval_status=status_filter)
+    
+    queryset = queryset.select_related(
+        'obligation__company',
+        'obligation__state',
+        'obligation__obligation_type',
+        'delivered_by',
+        'approval_decision_by',
+        'claimed_by'
+    ).prefetch_related('attachments')
+    
+    page, next_cursor = keyset_paginate(queryset, request, 'delivered_at', descending=False)
+    
+    results = [serialize_queue_item(submission) for submission in page]
     
     return Response({
-        'count': len(results),
-        'results': results
+        'count': total,
+        'results': results,
+        'next_cursor': next_cursor,
+        'facets': facets,
+        # Rótulos/ícones por status, enviados uma vez em vez de por linha
+        'status_info': APPROVAL_STATUS_INFO
     })
 
 
@@ -179,29 +276,37 @@ def approve_submission(request, submission_id):
     POST /api/approvals/{submission_id}/approve/
     Aprovar uma submission (somente Admin/Aprovador)
     """
-    try:
-        submission = Submission.objects.select_related(
-            'obligation__company',
-            'delivered_by'
-        ).get(id=submission_id)
-    except Submission.DoesNotExist:
-        return Response(
-            {'error': 'Submission não encontrada'},
-            status=status.HTTP_404_NOT_FOUND
-        )
-    
-    # Verificar se está pendente
-    if submission.approval_status != 'pending_review':
-        return Response(
-            {'error': f'Submission não está pendente de revisão (status atual: {submission.approval_status})'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
     with transaction.atomic():
+        # Trava a linha: status e reserva são verificados e alterados sob o mesmo lock
+        try:
+            submission = Submission.objects.select_for_update(of=('self',)).select_related(
+                'obligation__company',
+                'delivered_by',
+                'claimed_by'
+            ).get(id=submission_id)
+        except Submission.DoesNotExist:
+            return Response(
+                {'error': 'Submission não encontrada'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        # Verificar se está pendente
+        if submission.approval_status != 'pending_review':
+            return Response(
+                {'error': f'Submission não está pendente de revisão (status atual: {submission.approval_status})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        conflict = lease_conflict_response(submission, request.user)
+        if conflict:
+            return conflict
+        
         # Atualizar submission
         submission.approval_status = 'approved'
         submission.approval_decision_at = timezone.now()
         submission.approval_decision_by = request.user
+        submission.claimed_by = None
+        submission.claim_expires_at = None
         submission.approval_comment = request.data.get('comment', '')
         submission.save()
         
@@ -235,37 +340,45 @@ def reject_submission(request, submission_id):
     
     Body: { "comment": "motivo da recusa..." }
     """
-    try:
-        submission = Submission.objects.select_related(
-            'obligation__company',
-            'delivered_by'
-        ).get(id=submission_id)
-    except Submission.DoesNotExist:
-        return Response(
-            {'error': 'Submission não encontrada'},
-            status=status.HTTP_404_NOT_FOUND
-        )
-    
-    # Validar comentário obrigatório
-    comment = request.data.get('comment', '').strip()
-    if not comment:
-        return Response(
-            {'error': 'O comentário é obrigatório para recusar uma entrega'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    # Verificar se está pendente
-    if submission.approval_status != 'pending_review':
-        return Response(
-            {'error': f'Submission não está pendente de revisão (status atual: {submission.approval_status})'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
     with transaction.atomic():
+        # Trava a linha: status e reserva são verificados e alterados sob o mesmo lock
+        try:
+            submission = Submission.objects.select_for_update(of=('self',)).select_related(
+                'obligation__company',
+                'delivered_by',
+                'claimed_by'
+            ).get(id=submission_id)
+        except Submission.DoesNotExist:
+            return Response(
+                {'error': 'Submission não encontrada'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        # Validar comentário obrigatório
+        comment = request.data.get('comment', '').strip()
+        if not comment:
+            return Response(
+                {'error': 'O comentário é obrigatório para recusar uma entrega'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Verificar se está pendente
+        if submission.approval_status != 'pending_review':
+            return Response(
+                {'error': f'Submission não está pendente de revisão (status atual: {submission.approval_status})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        conflict = lease_conflict_response(submission, request.user)
+        if conflict:
+            return conflict
+        
         # Atualizar submission
         submission.approval_status = 'rejected'
         submission.approval_decision_at = timezone.now()
         submission.approval_decision_by = request.user
+        submission.claimed_by = None
+        submission.claim_expires_at = None
         submission.approval_comment = comment
         submission.save()
         
@@ -300,37 +413,45 @@ def request_revision(request, submission_id):
     
     Body: { "comment": "o que precisa ser corrigido..." }
     """
-    try:
-        submission = Submission.objects.select_related(
-            'obligation__company',
-            'delivered_by'
-        ).get(id=submission_id)
-    except Submission.DoesNotExist:
-        return Response(
-            {'error': 'Submission não encontrada'},
-            status=status.HTTP_404_NOT_FOUND
-        )
-    
-    # Validar comentário obrigatório
-    comment = request.data.get('comment', '').strip()
-    if not comment:
-        return Response(
-            {'error': 'O comentário é obrigatório para solicitar revisão'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    # Verificar se está pendente
-    if submission.approval_status != 'pending_review':
-        return Response(
-            {'error': f'Submission não está pendente de revisão (status atual: {submission.approval_status})'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
     with transaction.atomic():
+        # Trava a linha: status e reserva são verificados e alterados sob o mesmo lock
+        try:
+            submission = Submission.objects.select_for_update(of=('self',)).select_related(
+                'obligation__company',
+                'delivered_by',
+                'claimed_by'
+            ).get(id=submission_id)
+        except Submission.DoesNotExist:
+            return Response(
+                {'error': 'Submission não encontrada'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        # Validar comentário obrigatório
+        comment = request.data.get('comment', '').strip()
+        if not comment:
+            return Response(
+                {'error': 'O comentário é obrigatório para solicitar revisão'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Verificar se está pendente
+        if submission.approval_status != 'pending_review':
+            return Response(
+                {'error': f'Submission não está pendente de revisão (status atual: {submission.approval_status})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        conflict = lease_conflict_response(submission, request.user)
+        if conflict:
+            return conflict
+        
         # Atualizar submission
         submission.approval_status = 'needs_revision'
         submission.approval_decision_at = timezone.now()
         submission.approval_decision_by = request.user
+        submission.claimed_by = None
+        submission.claim_expires_at = None
         submission.approval_comment = comment
         submission.save()
         
@@ -356,6 +477,263 @@ def request_revision(request, submission_id):
     })
 
 
+BULK_DECISIONS = {
+    # decisão: (novo status, ação no audit log, comentário obrigatório)
+    'approve': ('approved', 'approved', False),
+    'reject': ('rejected', 'rejected', True),
+    'request_revision': ('needs_revision', 'revision_requested', True),
+}
+BULK_DECISION_MAX_IDS = 500
+
+
+@api_view(['POST'])
+@permission_classes([IsApprover])
+def bulk_decision(request):
+    """
+    POST /api/approvals/bulk/
+    Aprovar, recusar ou solicitar revisão de várias submissions de uma vez
+    (somente Admin/Aprovador)
+    
+    Body: {
+        "ids": [1, 2, 3],
+        "decision": "approve" | "reject" | "request_revision",
+        "comment": "..."  (obrigatório para reject/request_revision)
+    }
+    
+    As transições são validadas em uma consulta, aplicadas com um único UPDATE
+    e o audit log e as notificações são inseridos em lote.
+    Retorna o resultado por id.
+    """
+    decision = request.data.get('decision')
+    comment = (request.data.get('comment') or '').strip()
+    ids = request.data.get('ids') or []
+    
+    if decision not in BULK_DECISIONS:
+        return Response(
+            {'error': 'Decisão inválida. Use approve, reject ou request_revision'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    new_status, audit_action, comment_required = BULK_DECISIONS[decision]
+    
+    if comment_required and not comment:
+        return Response(
+            {'error': 'O comentário é obrigatório para esta decisão'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if not isinstance(ids, list):
+        return Response({'error': 'ids deve ser uma lista de inteiros'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        ids = list(dict.fromkeys(int(submission_id) for submission_id in ids))
+    except (TypeError, ValueError):
+        return Response({'error': 'ids deve ser uma lista de inteiros'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not ids:
+        return Response({'error': 'Nenhuma submission informada'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if len(ids) > BULK_DECISION_MAX_IDS:
+        return Response(
+            {'error': f'Máximo de {BULK_DECISION_MAX_IDS} submissions por requisição'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    decision_at = timezone.now()
+    results = {}
+    
+    with transaction.atomic():
+        # Validar todas as transições em uma consulta
+        submissions = {
+            submission.id: submission
+            for submission in Submission.objects.select_for_update(of=('self',)).select_related(
+                'obligation__company',
+                'obligation__state',
+                'obligation__obligation_type',
+                'delivered_by',
+                'claimed_by'
+            ).filter(id__in=ids)
+        }
+        
+        eligible = []
+        for submission_id in ids:
+            submission = submissions.get(submission_id)
+            if submission is None:
+                results[submission_id] = {'id': submission_id, 'success': False, 'error': 'Submission não encontrada'}
+            elif submission.approval_status != 'pending_review':
+                results[submission_id] = {
+                    'id': submission_id,
+                    'success': False,
+                    'error': f'Submission não está pendente de revisão (status atual: {submission.approval_status})'
+                }
+            elif submission.is_claimed_by_other(request.user, decision_at):
+                results[submission_id] = {
+                    'id': submission_id,
+                    'success': False,
+                    'error': f'Submission em análise por {submission.claimed_by.username}'
+                }
+            else:
+                eligible.append(submission)
+        
+        if eligible:
+            # Aplicar todas as decisões com um único UPDATE
+            Submission.objects.filter(
+                id__in=[submission.id for submission in eligible],
+                approval_status='pending_review'
+            ).update(
+                approval_status=new_status,
+                approval_decision_at=decision_at,
+                approval_decision_by=request.user,
+                approval_comment=comment,
+                claimed_by=None,
+                claim_expires_at=None,
+                # update() não aplica auto_now; check_late_deliveries depende de updated_at
+                updated_at=decision_at
+            )
+            
+            events = []
+            notifications = []
+            for submission in eligible:
+                submission.approval_status = new_status
+                submission.approval_decision_at = decision_at
+                submission.approval_decision_by = request.user
+                submission.approval_comment = comment
+                submission.updated_at = decision_at
+                
+                changes = {'approval_status': new_status, 'action': audit_action, 'bulk': True}
+                if comment:
+                    changes['comment'] = comment
+                entry = audit_log.log(request.user, audit_action, 'Submission', submission.id, changes)
+                events.append(SubmissionEvent(
+                    submission=submission,
+                    event_type=audit_action,
+                    actor_id=request.user.pk,
+                    comment=comment or None,
+                    timestamp=entry.timestamp
+                ))
+                
+                notification = NotificationService.build_decision_notification(
+                    submission, request.user, new_status, comment
+                )
+                if notification:
+                    notifications.append(notification)
+                
+                results[submission.id] = {
+                    'id': submission.id,
+                    'success': True,
+                    'approval_status': new_status
+                }
+            
+            SubmissionEvent.objects.bulk_create(events)
+            NotificationService.bulk_create_notifications(notifications)
+    
+    succeeded = len(eligible)
+    return Response({
+        'decision': decision,
+        'approval_status': new_status,
+        'approval_decision_at': decision_at.isoformat(),
+        'approval_decision_by': request.user.username,
+        'succeeded': succeeded,
+        'failed': len(ids) - succeeded,
+        'results': [results[submission_id] for submission_id in ids]
+    })
+
+
+CLAIM_MAX_COUNT = 50
+
+
+@api_view(['POST'])
+@permission_classes([IsApprover])
+def claim_submissions(request):
+    """
+    POST /api/approvals/claim/
+    Reserva para o aprovador as próximas N submissions pendentes sem reserva
+    válida (ou já reservadas por ele, renovando o prazo).
+    
+    Body: { "count": 10 }
+    
+    A reserva expira sozinha após settings.APPROVAL_LEASE_SECONDS. No
+    PostgreSQL usa SELECT ... FOR UPDATE SKIP LOCKED, para que aprovadores
+    simultâneos recebam submissions diferentes; no SQLite (escritas
+    serializadas) um UPDATE condicional faz o mesmo papel.
+    """
+    from datetime import timedelta
+    from django.db import connection
+    from django.db.models import Q
+    
+    try:
+        count = max(1, min(int(request.data.get('count', 10)), CLAIM_MAX_COUNT))
+    except (TypeError, ValueError):
+        return Response({'error': 'count deve ser um número inteiro'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.APPROVAL_LEASE_SECONDS)
+    available = (
+        Q(claimed_by__isnull=True) |
+        Q(claim_expires_at__isnull=True) |
+        Q(claim_expires_at__lte=now) |
+        Q(claimed_by=request.user)
+    )
+    candidates = Submission.objects.filter(
+        approval_status='pending_review'
+    ).filter(available).order_by('delivered_at', 'id')
+    
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            claimed_ids = list(
+                candidates.select_for_update(skip_locked=True, of=('self',)).values_list('id', flat=True)[:count]
+            )
+            Submission.objects.filter(id__in=claimed_ids).update(
+                claimed_by=request.user, claim_expires_at=expires_at
+            )
+        else:
+            candidate_ids = list(candidates.values_list('id', flat=True)[:count])
+            Submission.objects.filter(
+                id__in=candidate_ids, approval_status='pending_review'
+            ).filter(available).update(claimed_by=request.user, claim_expires_at=expires_at)
+            claimed_ids = list(Submission.objects.filter(
+                id__in=candidate_ids, claimed_by=request.user, claim_expires_at=expires_at
+            ).values_list('id', flat=True))
+    
+    submissions = Submission.objects.filter(id__in=claimed_ids).select_related(
+        'obligation__company',
+        'obligation__state',
+        'obligation__obligation_type',
+        'delivered_by',
+        'approval_decision_by',
+        'claimed_by'
+    ).prefetch_related('attachments').order_by('delivered_at', 'id')
+    
+    return Response({
+        'count': len(claimed_ids),
+        'claim_expires_at': expires_at.isoformat(),
+        'results': [serialize_queue_item(submission) for submission in submissions]
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsApprover])
+def release_submissions(request):
+    """
+    POST /api/approvals/release/
+    Libera reservas do aprovador logado.
+    
+    Body: { "ids": [1, 2] }  (sem ids, libera todas as reservas do usuário)
+    """
+    queryset = Submission.objects.filter(claimed_by=request.user)
+    ids = request.data.get('ids')
+    if ids:
+        if not isinstance(ids, list):
+            return Response({'error': 'ids deve ser uma lista de inteiros'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = list(dict.fromkeys(int(submission_id) for submission_id in ids))
+        except (TypeError, ValueError):
+            return Response({'error': 'ids deve ser uma lista de inteiros'}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = queryset.filter(id__in=ids)
+    
+    released = queryset.update(claimed_by=None, claim_expires_at=None)
+    return Response({'released': released})
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def resubmit_submission(request, submission_id):
@@ -467,10 +845,7 @@ def submission_timeline(request, submission_id):
         )
     
     # Verificar permissão: Admin/Aprovador ou autor
-    is_approver = (
-        request.user.is_superuser or
-        request.user.groups.filter(name__in=['Admin', 'Aprovador']).exists()
-    )
+    is_approver = request_has_role(request, 'Admin', 'Aprovador')
     is_author = submission.delivered_by == request.user
     
     if not (is_approver or is_author):
@@ -479,12 +854,8 @@ def submission_timeline(request, submission_id):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    # Buscar eventos do audit log
-    events = AuditLog.objects.filter(
-        model='Submission',
-        object_id=str(submission.id),
-        action__in=['created', 'approved', 'rejected', 'revision_requested', 'resubmitted']
-    ).select_related('user').order_by('timestamp')
+    # Eventos de aprovação (índice submission + timestamp)
+    events = submission.events.select_related('actor').order_by('timestamp', 'id')
     
     # Montar timeline
     timeline = []
@@ -503,28 +874,17 @@ def submission_timeline(request, submission_id):
         'color': 'blue'
     })
     
-    # Eventos do audit log
     for event in events:
         event_data = {
-            'event': event.action,
+            'event': event.event_type,
             'timestamp': event.timestamp.isoformat(),
             'by': {
-                'username': event.user.username if event.user else None,
-                'full_name': f"{event.user.first_name} {event.user.last_name}".strip() if event.user else None
+                'username': event.actor.username if event.actor else None,
+                'full_name': f"{event.actor.first_name} {event.actor.last_name}".strip() if event.actor else None
             },
-            'comment': event.changes.get('comment') if event.changes else None
+            'comment': event.comment or None
         }
-        
-        # Personalizar por tipo de evento
-        if event.action == 'approved':
-            event_data.update({'label': 'Aprovada', 'icon': '✅', 'color': 'green'})
-        elif event.action == 'rejected':
-            event_data.update({'label': 'Recusada', 'icon': '❌', 'color': 'red'})
-        elif event.action == 'revision_requested':
-            event_data.update({'label': 'Revisão Solicitada', 'icon': '⚠️', 'color': 'yellow'})
-        elif event.action == 'resubmitted':
-            event_data.update({'label': 'Reenviada', 'icon': '🔄', 'color': 'purple'})
-        
+        event_data.update(TIMELINE_EVENT_INFO.get(event.event_type, {}))
         timeline.append(event_data)
     
     # Status atual
@@ -560,6 +920,8 @@ def download_attachment(request, submission_id, attachment_id):
     Download seguro de anexo
     
     Autorização: Admin/Aprovador ou autor da submission
+    
+    A transferência segue settings.ATTACHMENT_DOWNLOAD_MODE (ver core/downloads.py).
     """
     try:
         submission = Submission.objects.select_related('delivered_by').get(id=submission_id)
@@ -570,10 +932,7 @@ def download_attachment(request, submission_id, attachment_id):
         )
     
     # Verificar permissão: Admin/Aprovador ou autor
-    is_approver = (
-        request.user.is_superuser or
-        request.user.groups.filter(name__in=['Admin', 'Aprovador']).exists()
-    )
+    is_approver = request_has_role(request, 'Admin', 'Aprovador')
     is_author = submission.delivered_by == request.user
     
     if not (is_approver or is_author):
@@ -591,8 +950,7 @@ def download_attachment(request, submission_id, attachment_id):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        file_path = submission.receipt_file.path
-        filename = os.path.basename(submission.receipt_file.name)
+        filename = receipt_filename(submission)
         file_obj = submission.receipt_file
     else:
         # Download de attachment
@@ -604,28 +962,23 @@ def download_attachment(request, submission_id, attachment_id):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        file_path = attachment.file.path
         filename = attachment.original_filename
         file_obj = attachment.file
     
     # Registrar no audit log
-    AuditLog.objects.create(
-        user=request.user,
-        action='download_attachment',
-        model='Submission',
-        object_id=str(submission.id),
-        changes={'attachment_id': str(attachment_id), 'filename': filename}
-    )
+    audit_log.log(request.user, 'download_attachment', 'Submission', submission.id, {
+        'attachment_id': str(attachment_id),
+        'filename': filename
+    })
     
-    # Retornar arquivo
+    # Retornar arquivo (em processo, via servidor web ou URL assinada)
     try:
-        content_type, _ = mimetypes.guess_type(filename)
-        response = FileResponse(
-            open(file_path, 'rb'),
-            content_type=content_type or 'application/octet-stream'
+        return serve_file(request, file_obj, filename)
+    except FileNotFoundError:
+        return Response(
+            {'error': 'Arquivo não encontrado no armazenamento'},
+            status=status.HTTP_404_NOT_FOUND
         )
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
     except Exception as e:
         return Response(
             {'error': f'Erro ao baixar arquivo: {str(e)}'},
@@ -639,38 +992,48 @@ def my_deliveries(request):
     """
     GET /api/approvals/my-deliveries/
     Listar entregas do usuário logado com status e timeline
+    
+    Query params:
+    - status: filtro por status
+    - cursor / page_size: paginação por cursor, ordenada por delivered_at desc
+    
+    status_counts traz o total por status (badges) em uma única agregação.
     """
+    from django.db.models import Count
+    
     # Query: apenas entregas do usuário logado
-    queryset = Submission.objects.filter(
-        delivered_by=request.user
-    ).select_related(
+    base_queryset = Submission.objects.filter(delivered_by_id=request.user.id)
+    
+    status_counts = {key: 0 for key in APPROVAL_STATUS_INFO}
+    for row in base_queryset.order_by().values('approval_status').annotate(total=Count('id')):
+        status_counts[row['approval_status']] = row['total']
+    
+    # Filtros opcionais
+    status_filter = request.GET.get('status')
+    if status_filter:
+        queryset = base_queryset.filter(approval_status=status_filter)
+        total = status_counts.get(status_filter, 0)
+    else:
+        queryset = base_queryset
+        total = sum(status_counts.values())
+    
+    queryset = queryset.select_related(
         'obligation__company',
         'obligation__state',
         'obligation__obligation_type',
         'approval_decision_by'
-    ).prefetch_related('attachments').order_by('-delivered_at')
+    ).annotate(attachments_total=Count('attachments'))
     
-    # Filtros opcionais
-    status_filter = request.GET.get('status')
-    if status_filter:
-        queryset = queryset.filter(approval_status=status_filter)
+    page, next_cursor = keyset_paginate(queryset, request, 'delivered_at')
     
     # Serializar dados
     results = []
-    for submission in queryset:
-        # Contar anexos
-        attachments_count = submission.attachments.count()
+    for submission in page:
+        # Contar anexos (recibo + anexos)
+        attachments_count = submission.attachments_total
         if submission.receipt_file:
             attachments_count += 1
         
-        # Status info
-        status_info = {
-            'pending_review': {'label': 'Pendente de Revisão', 'icon': '⏳', 'color': 'gray'},
-            'approved': {'label': 'Aprovada', 'icon': '✅', 'color': 'green'},
-            'rejected': {'label': 'Recusada', 'icon': '❌', 'color': 'red'},
-            'needs_revision': {'label': 'Necessita Revisão', 'icon': '⚠️', 'color': 'yellow'}
-        }
-        
         results.append({
             'id': submission.id,
             'company': submission.obligation.company.name,
@@ -688,11 +1051,12 @@ def my_deliveries(request):
             'approval_decision_by': submission.approval_decision_by.username if submission.approval_decision_by else None,
             'attachments_count': attachments_count,
             'can_resubmit': submission.approval_status == 'needs_revision',
-            'status_info': status_info.get(submission.approval_status, {})
+            'status_info': APPROVAL_STATUS_INFO.get(submission.approval_status, {})
         })
     
     return Response({
-        'count': len(results),
-        'results': results
+        'count': total,
+        'results': results,
+        'next_cursor': next_cursor,
+        'status_counts': status_counts
     })
-
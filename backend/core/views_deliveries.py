@@ -11,19 +11,16 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework import permissions
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Company, Obligation, Submission, SubmissionAttachment, AuditLog
+from .models import Company, Obligation, Submission, SubmissionAttachment
+from . import audit as audit_log
 from .serializers import ObligationSerializer
+from .pagination import keyset_paginate
+from .downloads import attachment_download_url
 
 
 def audit(user, action, obj, changes=None):
-    """Registrar evento no audit log"""
-    AuditLog.objects.create(
-        user=user,
-        action=action,
-        model=obj.__class__.__name__,
-        object_id=obj.id if hasattr(obj, 'id') else None,
-        changes=changes or {}
-    )
+    """Registrar evento no audit log (gravado em lote ao fim da requisição)"""
+    audit_log.log(user, action, obj.__class__.__name__, getattr(obj, 'id', None), changes or {})
 
 
 @api_view(['GET'])
@@ -32,27 +29,56 @@ def get_company_obligations(request, company_id):
     """
     Listar obrigações de uma empresa para select dependente
     GET /api/companies/{id}/obligations/
+    
+    Query params (typeahead no servidor):
+    - q: busca por nome da obrigação, tipo ou estado
+    - competence: competência exata (MM/AAAA)
+    - limit: quantidade máxima de itens (padrão 50, máximo 200)
+    
+    Ordenado pelo vencimento mais recente.
     """
-    try:
-        company = Company.objects.get(id=company_id)
-        obligations = Obligation.objects.filter(company=company).select_related(
-            'state', 'obligation_type'
-        ).order_by('-competence', 'obligation_type__name')
-        
-        data = []
-        for obligation in obligations:
-            label = f"{obligation.obligation_name or obligation.obligation_type.name} • {obligation.state.code} • {obligation.competence}"
-            data.append({
-                'id': obligation.id,
-                'label': label,
-                'competence': obligation.competence,
-                'due_date': obligation.due_date.isoformat() if obligation.due_date else None,
-                'has_submission': obligation.submissions.exists()
-            })
-        
-        return Response(data)
-    except Company.DoesNotExist:
+    from django.db.models import Q, Exists, OuterRef
+    
+    if not Company.objects.filter(id=company_id).exists():
         return Response({'error': 'Empresa não encontrada'}, status=status.HTTP_404_NOT_FOUND)
+    
+    q = request.GET.get('q', '').strip()
+    competence = request.GET.get('competence', '').strip()
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 50)), 200))
+    except ValueError:
+        limit = 50
+    
+    obligations = Obligation.objects.filter(company_id=company_id)
+    
+    if competence:
+        obligations = obligations.filter(competence=competence)
+    
+    if q:
+        obligations = obligations.filter(
+            Q(obligation_name__icontains=q) |
+            Q(obligation_type__name__icontains=q) |
+            Q(state__code__iexact=q)
+        )
+    
+    obligations = obligations.annotate(
+        has_submission=Exists(Submission.objects.filter(obligation=OuterRef('pk')))
+    ).select_related(
+        'state', 'obligation_type'
+    ).order_by('-due_date', 'obligation_type__name', 'id')[:limit]
+    
+    data = []
+    for obligation in obligations:
+        label = f"{obligation.obligation_name or obligation.obligation_type.name} • {obligation.state.code} • {obligation.competence}"
+        data.append({
+            'id': obligation.id,
+            'label': label,
+            'competence': obligation.competence,
+            'due_date': obligation.due_date.isoformat() if obligation.due_date else None,
+            'has_submission': obligation.has_submission
+        })
+    
+    return Response(data)
 
 
 @api_view(['GET'])
@@ -406,41 +432,34 @@ def list_deliveries(request):
     """
     Listar todas as entregas com filtros
     GET /api/deliveries/
+
+    Retorna apenas a submission mais recente de cada obrigação, escolhida por
+    uma subquery correlacionada na mesma consulta. Paginação por cursor
+    (?cursor=...&page_size=...) ordenada por delivered_at, id decrescentes.
+    
+    O total só é calculado com ?with_total=1: o COUNT avalia a subquery para
+    todas as linhas filtradas, então o cliente pede apenas na primeira página.
+    Sem o parâmetro, 'total' é null.
     """
-    from django.db.models import Q
+    from django.db.models import Q, Count, OuterRef, Subquery
     
     # Filtros
     search = request.GET.get('search', '').strip()
     company_id = request.GET.get('company', '').strip()
     status = request.GET.get('status', '').strip()
+    with_total = request.GET.get('with_total', '').lower() in ('1', 'true')
     
-    # Query base - obter apenas a submission mais recente de cada obrigação
-    from django.db.models import Max
+    # Filtros aplicados às linhas externas: a subquery escolhe a submission
+    # mais recente da obrigação sem filtros e só é avaliada para as linhas
+    # que passam por eles (uma entrega some da lista se a mais recente não passar)
+    qs = Submission.objects.all()
     
-    # Primeiro, encontrar a submission mais recente de cada obrigação
-    latest_submissions = Submission.objects.values('obligation').annotate(
-        latest_delivered_at=Max('delivered_at')
-    )
+    if company_id:
+        qs = qs.filter(obligation__company_id=company_id)
     
-    # Obter as submissions mais recentes
-    latest_submission_ids = []
-    for item in latest_submissions:
-        latest_submission = Submission.objects.filter(
-            obligation=item['obligation'],
-            delivered_at=item['latest_delivered_at']
-        ).first()
-        if latest_submission:
-            latest_submission_ids.append(latest_submission.id)
-    
-    # Query base com as submissions mais recentes
-    qs = Submission.objects.filter(id__in=latest_submission_ids).select_related(
-        'obligation__company', 
-        'obligation__state', 
-        'obligation__obligation_type',
-        'delivered_by'
-    ).prefetch_related('attachments').order_by('-delivered_at')
+    if status:
+        qs = qs.filter(submission_type=status)
     
-    # Aplicar filtros
     if search:
         qs = qs.filter(
             Q(obligation__company__name__icontains=search) |
@@ -449,21 +468,41 @@ def list_deliveries(request):
             Q(comments__icontains=search)
         )
     
-    if company_id:
-        qs = qs.filter(obligation__company_id=company_id)
+    # Submission mais recente de cada obrigação (índice obligation, delivered_at, id)
+    latest_submission = Submission.objects.filter(
+        obligation=OuterRef('obligation')
+    ).order_by('-delivered_at', '-id').values('id')[:1]
     
-    if status:
-        qs = qs.filter(submission_type=status)
+    qs = qs.filter(id=Subquery(latest_submission)).select_related(
+        'obligation__company', 
+        'obligation__state', 
+        'obligation__obligation_type',
+        'delivered_by'
+    )
+    
+    page, next_cursor = keyset_paginate(qs, request, 'delivered_at')
+    
+    # Contagem de anexos apenas para as submissions da página
+    attachment_counts = dict(
+        SubmissionAttachment.objects.filter(
+            submission_id__in=[submission.id for submission in page]
+        ).values_list('submission_id').annotate(total=Count('id'))
+    )
+    
+    # Informações de status
+    status_info = {
+        'entregue': {'label': 'Entregue', 'icon': '✅', 'color': 'green'},
+        'atrasada': {'label': 'Atrasada', 'icon': '⚠️', 'color': 'red'},
+        'pendente': {'label': 'Pendente de Aprovação', 'icon': '⏳', 'color': 'yellow'}
+    }
     
     # Serializar dados
-    today = timezone.now().date()
     deliveries = []
-    for submission in qs:
+    for submission in page:
         # Contar anexos
-        attachments_count = 0
+        attachments_count = attachment_counts.get(submission.id, 0)
         if submission.receipt_file:
             attachments_count += 1
-        attachments_count += submission.attachments.count()
         
         # Determinar status da entrega
         # Se aprovada, status é "Entregue"
@@ -477,13 +516,6 @@ def list_deliveries(request):
             # Entrega antes do vencimento mas não aprovada = Pendente
             delivery_status = 'pendente'
         
-        # Informações de status
-        status_info = {
-            'entregue': {'label': 'Entregue', 'icon': '✅', 'color': 'green'},
-            'atrasada': {'label': 'Atrasada', 'icon': '⚠️', 'color': 'red'},
-            'pendente': {'label': 'Pendente de Aprovação', 'icon': '⏳', 'color': 'yellow'}
-        }
-        
         deliveries.append({
             'id': submission.id,
             'company': submission.obligation.company.name,
@@ -500,7 +532,9 @@ def list_deliveries(request):
             'attachments_count': attachments_count,
             'batch_id': str(submission.batch_id) if submission.batch_id else None,
             'has_receipt': bool(submission.receipt_file),
-            'receipt_url': submission.receipt_file.url if submission.receipt_file else None,
+            'receipt_url': attachment_download_url(submission.id, f'receipt_{submission.id}') if submission.receipt_file else None,
+            'receipt_filename': submission.receipt_filename,
+            'receipt_size': submission.receipt_size,
             'approval_status': submission.approval_status,
             'delivery_status': delivery_status,
             'status_info': status_info.get(delivery_status, {}),
@@ -509,7 +543,8 @@ def list_deliveries(request):
     
     return Response({
         'deliveries': deliveries,
-        'total': len(deliveries),
+        'total': qs.count() if with_total else None,
+        'next_cursor': next_cursor,
         'filters_applied': {
             'search': search,
             'company': company_id,
@@ -12,6 +12,7 @@ from django.db import transaction
 from .models import Dispatch, DispatchSubtask, Company, Notification
 from .serializers import DispatchSerializer, DispatchSubtaskSerializer
 from .permissions import ReadOnlyOrCreateForUsuario, IsAdmin, IsAdminOrReadOnly
+from .roles import request_has_role
 from .views import audit
 
 
@@ -27,7 +28,7 @@ class IsAdminOrResponsible(permissions.BasePermission):
         return False
 
     def has_object_permission(self, request, view, obj):
-        if request.user.is_superuser or request.user.groups.filter(name='Admin').exists():
+        if request_has_role(request, 'Admin'):
             return True
         
         # Read permissions are allowed to any authenticated user if they have access to the company
@@ -57,7 +58,7 @@ class DispatchViewSet(viewsets.ModelViewSet):
         qs = Dispatch.objects.select_related('company', 'responsible', 'created_by').prefetch_related('subtasks')
         
         # Admin vê todos os despachos
-        if user.is_superuser or user.groups.filter(name='Admin').exists():
+        if request_has_role(self.request, 'Admin'):
             qs = qs.all()
         else:
             # Para teste, permitir que usuários vejam todos os despachos
@@ -7,7 +7,8 @@ from django.db import models
 from django.db.models import Q
 from django.utils import timezone
 from datetime import datetime
-from .models import AuditLog
+from . import audit as audit_log
+from .audit_archive import audit_history
 from .permissions import IsAdmin
 from .serializers import UserSerializer
 
@@ -123,12 +124,12 @@ def set_user_role(request, user_id):
     user.groups.add(group)
     
     # Registrar no AuditLog
-    AuditLog.objects.create(
-        user=request.user,
-        action='grant_role',
-        model='User',
-        object_id=str(user.id),
-        changes={
+    audit_log.log(
+        request.user,
+        'grant_role',
+        'User',
+        user.id,
+        {
             'old_groups': list(User.objects.get(id=user_id).groups.values_list('name', flat=True)),
             'new_role': role
         }
@@ -153,8 +154,8 @@ def get_user_history(request, user_id):
     except User.DoesNotExist:
         return Response({'error': 'Usuário não encontrado'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Buscar logs do usuário
-    logs = AuditLog.objects.filter(user=user).order_by('-timestamp')
+    # Buscar logs do usuário (tabela + arquivo morto, ver core/audit_archive.py)
+    logs = audit_history(user_id=user.id)
     
     # Paginação
     paginator = UserPagination()
@@ -164,12 +165,13 @@ def get_user_history(request, user_id):
     log_data = []
     for log in paginated_logs:
         log_info = {
-            'id': log.id,
-            'action': log.action,
-            'model': log.model,
-            'object_id': log.object_id,
-            'timestamp': log.timestamp,
-            'changes': log.changes,
+            'id': log['id'],
+            'action': log['action'],
+            'model': log['model'],
+            'object_id': log['object_id'],
+            'timestamp': log['timestamp'],
+            'changes': log['changes'],
+            'archived': log['archived'],
         }
         log_data.append(log_info)
     
@@ -236,12 +238,12 @@ def delete_user(request, user_id):
         )
     
     # Registrar no AuditLog antes de excluir
-    AuditLog.objects.create(
-        user=request.user,
-        action='deleted',
-        model='User',
-        object_id=str(user.id),
-        changes={
+    audit_log.log(
+        request.user,
+        'deleted',
+        'User',
+        user.id,
+        {
             'username': user.username,
             'email': user.email,
             'groups': list(user.groups.values_list('name', flat=True))
@@ -277,12 +279,12 @@ def change_user_password(request, user_id):
         return Response({'error': 'A senha deve ter pelo menos 6 caracteres'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Registrar no AuditLog antes de alterar
-    AuditLog.objects.create(
-        user=request.user,
-        action='password_changed',
-        model='User',
-        object_id=str(user.id),
-        changes={
+    audit_log.log(
+        request.user,
+        'password_changed',
+        'User',
+        user.id,
+        {
             'username': user.username,
             'email': user.email,
             'action': 'Senha alterada por admin'
@@ -393,12 +395,12 @@ def create_user(request):
             user.groups.add(group)
             
             # Registrar no AuditLog
-            AuditLog.objects.create(
-                user=request.user,
-                action='create_user',
-                model='User',
-                object_id=str(user.id),
-                changes={
+            audit_log.log(
+                request.user,
+                'create_user',
+                'User',
+                user.id,
+                {
                     'username': username,
                     'email': email,
                     'first_name': first_name,
@@ -33,6 +33,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.audit.AuditBufferMiddleware',
 ]
 
 ROOT_URLCONF = 'obrigacoes.urls'
@@ -105,8 +106,16 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:3000",
 ]
 
+# Autenticação sem consulta ao banco por requisição (core/authentication.py).
+# Usa as claims do token, inclusive os papéis (independe de JWT_ROLE_CLAIMS).
+JWT_STATELESS_AUTH = os.getenv('JWT_STATELESS_AUTH', 'False') == 'True'
+# tempo (segundos) que a lista de usuários revogados (inativos) fica em cache
+JWT_REVOCATION_CACHE_SECONDS = int(os.getenv('JWT_REVOCATION_CACHE_SECONDS', '60'))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        'core.authentication.ClaimsJWTAuthentication'
+        if JWT_STATELESS_AUTH else
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
@@ -118,16 +127,86 @@ from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=6),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+    # tokens com claims de papéis (roles, username, is_superuser)
+    'TOKEN_OBTAIN_SERIALIZER': 'core.serializers.RoleTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'core.serializers.RoleTokenRefreshSerializer',
 }
 
+# ---- Cache (papéis de usuários) ----
+# Em produção com vários workers use um cache compartilhado, ex.:
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://...
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+# tempo (segundos) que os papéis de um usuário ficam em cache
+ROLE_CACHE_SECONDS = int(os.getenv('ROLE_CACHE_SECONDS', '300'))
+# usar os papéis do access token sem consultar o banco; uma troca de papel
+# só vale para tokens emitidos (ou renovados) depois dela
+JWT_ROLE_CLAIMS = os.getenv('JWT_ROLE_CLAIMS', 'False') == 'True'
+
+
+# ---- Audit log ----
+# gravar os eventos em uma thread em segundo plano (core/audit.py)
+AUDIT_ASYNC = os.getenv('AUDIT_ASYNC', 'False') == 'True'
+# entradas mais antigas que isso vão para o arquivo morto (archive_audit_logs)
+AUDIT_RETENTION_DAYS = int(os.getenv('AUDIT_RETENTION_DAYS', '365'))
+AUDIT_ARCHIVE_DIR = os.getenv('AUDIT_ARCHIVE_DIR') or os.path.join(BASE_DIR, 'audit_archive')
+
+
+# ---- Fila de aprovação ----
+# duração (segundos) da reserva de uma submission por um aprovador
+APPROVAL_LEASE_SECONDS = int(os.getenv('APPROVAL_LEASE_SECONDS', '900'))
+
+
+# ---- Notificações automáticas ----
+# intervalo (dias) entre lembretes de uma mesma obrigação em atraso
+OVERDUE_REMINDER_DAYS = int(os.getenv('OVERDUE_REMINDER_DAYS', '1'))
+# notificações lidas mais antigas que isso são removidas (purge_notifications)
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', '180'))
+# stream SSE (notifications/stream/): consulta ao banco para notificações
+# criadas em outros processos (0 = só avisos do próprio processo), keepalive,
+# duração máxima da conexão e espera do cliente antes de reconectar (ms).
+# Cada stream aberto ocupa uma thread do servidor durante a conexão: use
+# runserver (com threads) ou gunicorn com --worker-class gthread, nunca
+# workers síncronos; a duração curta limita quanto tempo a thread fica presa.
+NOTIFICATION_STREAM_POLL_SECONDS = int(os.getenv('NOTIFICATION_STREAM_POLL_SECONDS', '30'))
+NOTIFICATION_STREAM_HEARTBEAT_SECONDS = int(os.getenv('NOTIFICATION_STREAM_HEARTBEAT_SECONDS', '15'))
+NOTIFICATION_STREAM_MAX_SECONDS = int(os.getenv('NOTIFICATION_STREAM_MAX_SECONDS', '55'))
+NOTIFICATION_STREAM_RETRY_MS = int(os.getenv('NOTIFICATION_STREAM_RETRY_MS', '5000'))
+
 
 # ---- Email (configure via env) ----
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
 EMAIL_PORT = int(os.getenv('EMAIL_PORT', '587'))
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+# envio em lote (core/mailer.py): threads, mensagens por conexão e limite
+# de mensagens por segundo somando todas as threads (0 = sem limite)
+EMAIL_WORKERS = int(os.getenv('EMAIL_WORKERS', '4'))
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', '50'))
+EMAIL_RATE_LIMIT = float(os.getenv('EMAIL_RATE_LIMIT', '0'))
+# fila de envio (send_outbound_emails): tentativas antes de 'dead', espera
+# base entre tentativas (dobra a cada falha) e reserva de um lote pelo worker
+EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', '6'))
+EMAIL_RETRY_BASE_SECONDS = int(os.getenv('EMAIL_RETRY_BASE_SECONDS', '60'))
+EMAIL_SEND_LEASE_SECONDS = int(os.getenv('EMAIL_SEND_LEASE_SECONDS', '300'))
+
+# ---- Rotinas periódicas (run_scheduler, core/scheduler.py) ----
+# intervalo (segundos) entre verificações de rotinas vencidas e rotinas
+# executando em paralelo
+SCHEDULER_TICK_SECONDS = int(os.getenv('SCHEDULER_TICK_SECONDS', '15'))
+SCHEDULER_WORKERS = int(os.getenv('SCHEDULER_WORKERS', '2'))
+# execução 'running' mais antiga que isso é considerada abandonada (processo caiu)
+SCHEDULER_STALE_SECONDS = int(os.getenv('SCHEDULER_STALE_SECONDS', '21600'))
+# dias de histórico (JobRun) mantidos por rotina
+SCHEDULER_HISTORY_DAYS = int(os.getenv('SCHEDULER_HISTORY_DAYS', '30'))
+# rotinas desativadas, separadas por vírgula (ex.: send_outbound_emails)
+SCHEDULER_DISABLED_JOBS = [name.strip() for name in os.getenv('SCHEDULER_DISABLED_JOBS', '').split(',') if name.strip()]
 
 # ---- File Storage (S3 optional) ----
 DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
@@ -139,3 +218,11 @@ if os.getenv('AWS_STORAGE_BUCKET_NAME'):
     AWS_STORAGE_BUCKET_NAME = os.getenv('AWS_STORAGE_BUCKET_NAME')
     AWS_S3_REGION_NAME = os.getenv('AWS_S3_REGION_NAME', None)
     AWS_QUERYSTRING_AUTH = False  # public URLs for receipts
+
+# ---- Download de anexos ----
+# django (padrão, com Range/ETag) | x-accel-redirect (nginx) | x-sendfile (Apache)
+ATTACHMENT_DOWNLOAD_MODE = os.getenv('ATTACHMENT_DOWNLOAD_MODE', 'django')
+# location interna do nginx que aponta para MEDIA_ROOT
+ATTACHMENT_ACCEL_PREFIX = os.getenv('ATTACHMENT_ACCEL_PREFIX', '/protected-media/')
+# validade (segundos) das URLs assinadas quando o armazenamento é S3
+ATTACHMENT_SIGNED_URL_EXPIRE = int(os.getenv('ATTACHMENT_SIGNED_URL_EXPIRE', '300'))
@@ -285,8 +285,15 @@ export async function downloadTemplate(templateType){
 }
 
 // Notificações
-export async function getNotifications(){
-  const r = await api('/notifications/')
+// Retorna { results, next_cursor, total, unread }
+export async function getNotifications({ unreadOnly = false, type = '', cursor = null } = {}){
+  const params = new URLSearchParams()
+  if (unreadOnly) params.append('unread_only', 'true')
+  if (type) params.append('type', type)
+  if (cursor) params.append('cursor', cursor)
+  
+  const queryString = params.toString()
+  const r = await api(queryString ? `/notifications/?${queryString}` : '/notifications/')
   return r.json()
 }
 
@@ -295,6 +302,107 @@ export async function getNotificationStats(){
   return r.json()
 }
 
+// Renova o token de acesso com o refresh token salvo no login
+// Retorna true se conseguiu
+export async function refreshAccessToken(){
+  const refresh = localStorage.getItem('refresh')
+  if (!refresh) return false
+  try {
+    const r = await fetch(API + '/auth/refresh/', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ refresh })
+    })
+    if (!r.ok) return false
+    const data = await r.json()
+    localStorage.setItem('access', data.access)
+    if (data.refresh) localStorage.setItem('refresh', data.refresh)
+    return true
+  } catch (error) {
+    console.error('Erro ao renovar token:', error)
+    return false
+  }
+}
+
+const STREAM_MAX_RETRY_MS = 60000
+
+// Stream SSE de notificações (fetch em vez de EventSource para enviar o token)
+// handlers: { notification(n), unread({total, unread}), reload(), unauthorized() }
+// Falhas seguidas reconectam com espera exponencial (até STREAM_MAX_RETRY_MS).
+// Em 401 tenta renovar o token uma vez; sem token válido (ou 403) o stream para.
+// Retorna uma função para encerrar o stream
+export function subscribeNotifications(handlers = {}){
+  const controller = new AbortController()
+  let lastEventId = null
+  let retryMs = 5000
+  let failures = 0
+
+  const dispatch = (chunk) => {
+    let event = 'message', data = '', id = null
+    chunk.split('\n').forEach(line => {
+      if (line.startsWith('event:')) event = line.slice(6).trim()
+      else if (line.startsWith('data:')) data += line.slice(5).trim()
+      else if (line.startsWith('id:')) id = line.slice(3).trim()
+      else if (line.startsWith('retry:')) retryMs = parseInt(line.slice(6), 10) || retryMs
+    })
+    if (id) lastEventId = id
+    if (handlers[event]) handlers[event](data ? JSON.parse(data) : {})
+  }
+
+  const stop = () => {
+    console.warn('Stream de notificações encerrado: sem autorização')
+    if (handlers.unauthorized) handlers.unauthorized()
+  }
+
+  const connect = async () => {
+    let refreshed = false
+    while (!controller.signal.aborted) {
+      try {
+        const headers = { Accept: 'text/event-stream' }
+        const token = localStorage.getItem('access')
+        if (!token) return stop()
+        headers['Authorization'] = 'Bearer ' + token
+        if (lastEventId) headers['Last-Event-ID'] = lastEventId
+        const response = await fetch(API + '/notifications/stream/', { headers, signal: controller.signal })
+        if (response.status === 401 && !refreshed) {
+          // Token expirado: renova e tenta de novo imediatamente
+          refreshed = true
+          if (await refreshAccessToken()) continue
+          return stop()
+        }
+        if (response.status === 401 || response.status === 403) return stop()
+        if (!response.ok || !response.body) throw new Error('Stream de notificações indisponível: ' + response.status)
+
+        refreshed = false
+        failures = 0
+        const reader = response.body.getReader()
+        const decoder = new TextDecoder()
+        let buffer = ''
+        while (true) {
+          const { value, done } = await reader.read()
+          if (done) break
+          buffer += decoder.decode(value, { stream: true })
+          let index
+          while ((index = buffer.indexOf('\n\n')) >= 0) {
+            dispatch(buffer.slice(0, index))
+            buffer = buffer.slice(index + 2)
+          }
+        }
+      } catch (error) {
+        if (controller.signal.aborted) return
+        failures += 1
+        console.error('Erro no stream de notificações:', error)
+      }
+      // Fim normal da conexão: reconecta após retryMs; falhas seguidas dobram a espera
+      const delay = Math.min(retryMs * 2 ** failures, STREAM_MAX_RETRY_MS)
+      await new Promise(resolve => setTimeout(resolve, delay))
+    }
+  }
+
+  connect()
+  return () => controller.abort()
+}
+
 export async function markNotificationRead(notificationId){
   const r = await api(`/notifications/${notificationId}/read/`, {
     method: 'POST'
@@ -482,8 +590,17 @@ export async function createUser(userData){
 
 // ===== ENTREGAS PRO =====
 
-export async function getCompanyObligations(companyId) {
-  const r = await api(`/companies/${companyId}/obligations/`)
+export async function getCompanyObligations(companyId, filters = {}) {
+  const params = new URLSearchParams()
+  
+  if (filters.q) params.append('q', filters.q)
+  if (filters.competence) params.append('competence', filters.competence)
+  if (filters.limit) params.append('limit', filters.limit)
+  
+  const queryString = params.toString()
+  const url = queryString ? `/companies/${companyId}/obligations/?${queryString}` : `/companies/${companyId}/obligations/`
+  
+  const r = await api(url)
   if (!r.ok) {
     const errorData = await r.json().catch(() => ({ error: 'Erro desconhecido' }))
     throw new Error(errorData.error || `Erro ${r.status}: ${r.statusText}`)
@@ -567,7 +684,8 @@ export async function bulkAttachments(files) {
   return r.json()
 }
 
-export async function getDeliveries(filters = {}) {
+// withTotal: pede a contagem total (consulta mais cara; só na primeira página)
+export async function getDeliveries(filters = {}, cursor = null, withTotal = false) {
   const params = new URLSearchParams()
   
   if (filters.search) {
@@ -579,6 +697,12 @@ export async function getDeliveries(filters = {}) {
   if (filters.status) {
     params.append('status', filters.status)
   }
+  if (cursor) {
+    params.append('cursor', cursor)
+  }
+  if (withTotal) {
+    params.append('with_total', '1')
+  }
   
   const queryString = params.toString()
   const url = queryString ? `/deliveries/?${queryString}` : '/deliveries/'
@@ -594,7 +718,7 @@ export async function getDeliveries(filters = {}) {
 
 // ===== SISTEMA DE APROVAÇÃO =====
 
-export async function getPendingApprovals(filters = {}) {
+export async function getPendingApprovals(filters = {}, cursor = null) {
   const params = new URLSearchParams()
   
   if (filters.company) params.append('company', filters.company)
@@ -603,6 +727,7 @@ export async function getPendingApprovals(filters = {}) {
   if (filters.start_date) params.append('start_date', filters.start_date)
   if (filters.end_date) params.append('end_date', filters.end_date)
   if (filters.status) params.append('status', filters.status)  // Filtro de status
+  if (cursor) params.append('cursor', cursor)
   
   const queryString = params.toString()
   const url = queryString ? `/approvals/pending/?${queryString}` : '/approvals/pending/'
@@ -661,6 +786,51 @@ export async function requestRevision(submissionId, comment) {
   return r.json()
 }
 
+export async function bulkDecision(ids, decision, comment = '') {
+  const r = await api('/approvals/bulk/', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ ids, decision, comment })
+  })
+  
+  if (!r.ok) {
+    const errorData = await r.json().catch(() => ({ error: 'Erro desconhecido' }))
+    throw new Error(errorData.error || `Erro ${r.status}: ${r.statusText}`)
+  }
+  
+  return r.json()
+}
+
+export async function claimSubmissions(count = 10) {
+  const r = await api('/approvals/claim/', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ count })
+  })
+
+  if (!r.ok) {
+    const errorData = await r.json().catch(() => ({ error: 'Erro desconhecido' }))
+    throw new Error(errorData.error || `Erro ${r.status}: ${r.statusText}`)
+  }
+
+  return r.json()
+}
+
+export async function releaseSubmissions(ids = []) {
+  const r = await api('/approvals/release/', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ ids })
+  })
+
+  if (!r.ok) {
+    const errorData = await r.json().catch(() => ({ error: 'Erro desconhecido' }))
+    throw new Error(errorData.error || `Erro ${r.status}: ${r.statusText}`)
+  }
+
+  return r.json()
+}
+
 export async function resubmitSubmission(submissionId, formData) {
   const r = await api(`/approvals/${submissionId}/resubmit/`, {
     method: 'POST',
@@ -701,13 +871,24 @@ export async function downloadAttachment(submissionId, attachmentId) {
     throw new Error(`Erro ${r.status}: ${r.statusText}`)
   }
   
+  // Armazenamento S3: o backend retorna uma URL assinada de curta duração
+  if ((r.headers.get('Content-Type') || '').includes('application/json')) {
+    const { url } = await r.json()
+    window.location.href = url
+    return
+  }
+  
   const blob = await r.blob()
   const contentDisposition = r.headers.get('Content-Disposition')
   let filename = 'arquivo'
   
   if (contentDisposition) {
-    const filenameMatch = contentDisposition.match(/filename="?(.+)"?/)
-    if (filenameMatch) {
+    // Nomes não ASCII chegam no formato RFC 5987 (filename*=utf-8''...)
+    const utf8Match = contentDisposition.match(/filename\*=utf-8''([^;]+)/i)
+    const filenameMatch = contentDisposition.match(/filename="?([^";]+)"?/)
+    if (utf8Match) {
+      filename = decodeURIComponent(utf8Match[1])
+    } else if (filenameMatch) {
       filename = filenameMatch[1]
     }
   }
@@ -722,9 +903,10 @@ export async function downloadAttachment(submissionId, attachmentId) {
   URL.revokeObjectURL(downloadUrl)
 }
 
-export async function getMyDeliveries(statusFilter = '') {
+export async function getMyDeliveries(statusFilter = '', cursor = null) {
   const params = new URLSearchParams()
   if (statusFilter) params.append('status', statusFilter)
+  if (cursor) params.append('cursor', cursor)
   
   const queryString = params.toString()
   const url = queryString ? `/approvals/my-deliveries/?${queryString}` : '/approvals/my-deliveries/'
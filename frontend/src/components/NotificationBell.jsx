@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react'
 import { Bell, X, Eye, Check } from 'lucide-react'
 import { useNavigate } from 'react-router-dom'
-import { getNotifications, markNotificationRead, markAllNotificationsRead } from '../api'
+import { getNotifications, markNotificationRead, markAllNotificationsRead, subscribeNotifications } from '../api'
 
 const NotificationBell = () => {
   const [notifications, setNotifications] = useState([])
@@ -16,8 +16,8 @@ const NotificationBell = () => {
     try {
       setLoading(true)
       const data = await getNotifications()
-      setNotifications(data || [])
-      setUnreadCount(data.filter(n => !n.is_read).length)
+      setNotifications(data.results || [])
+      setUnreadCount(data.unread || 0)
     } catch (err) {
       console.error('Erro ao carregar notificações:', err)
     } finally {
@@ -25,11 +25,17 @@ const NotificationBell = () => {
     }
   }
 
-  // Carregar notificações ao montar e a cada 60s
+  // Carregar notificações ao montar; depois o stream envia novas e a contagem
   useEffect(() => {
     fetchNotifications()
-    const interval = setInterval(fetchNotifications, 60000) // 60 segundos
-    return () => clearInterval(interval)
+    const unsubscribe = subscribeNotifications({
+      notification: (notification) => {
+        setNotifications(prev => [notification, ...prev.filter(n => n.id !== notification.id)])
+      },
+      unread: (stats) => setUnreadCount(stats.unread),
+      reload: () => fetchNotifications()
+    })
+    return unsubscribe
   }, [])
 
   // Fechar dropdown ao clicar fora
@@ -58,6 +64,8 @@ const NotificationBell = () => {
         navigate('/my-deliveries')
       } else if (notification.obligation) {
         navigate('/obligations')
+      } else if (notification.dispatch) {
+        navigate('/despacho')
       }
     } catch (err) {
       console.error('Erro ao marcar notificação:', err)
@@ -46,6 +46,12 @@ const formatCNPJ = (cnpj) => {
 export default function Approvals() {
   const [loading, setLoading] = useState(false)
   const [pendingApprovals, setPendingApprovals] = useState([])
+  const [totalCount, setTotalCount] = useState(0)
+  // Contagens por status, empresa e tipo (com os filtros atuais)
+  const [facets, setFacets] = useState({ status: {}, company: [], obligation_type: [] })
+  const [statusInfo, setStatusInfo] = useState({})
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [companies, setCompanies] = useState([])
   const [obligationTypes, setObligationTypes] = useState([])
   const [selectedSubmission, setSelectedSubmission] = useState(null)
@@ -91,6 +97,10 @@ export default function Approvals() {
       setLoading(true)
       const data = await getPendingApprovals(filters)
       setPendingApprovals(data.results || [])
+      setTotalCount(data.count || 0)
+      setFacets(data.facets || { status: {}, company: [], obligation_type: [] })
+      setStatusInfo(data.status_info || {})
+      setNextCursor(data.next_cursor || null)
     } catch (error) {
       showMessage(`Erro ao carregar aprovações: ${error.message}`, 'error')
     } finally {
@@ -98,6 +108,26 @@ export default function Approvals() {
     }
   }
 
+  const loadMoreApprovals = async () => {
+    if (!nextCursor) return
+    try {
+      setLoadingMore(true)
+      const data = await getPendingApprovals(filters, nextCursor)
+      setPendingApprovals(prev => [...prev, ...(data.results || [])])
+      setNextCursor(data.next_cursor || null)
+    } catch (error) {
+      showMessage(`Erro ao carregar aprovações: ${error.message}`, 'error')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
+  // Quantidade de entregas de uma empresa/tipo nos facets
+  const facetCount = (items, id) => {
+    const item = (items || []).find(facet => String(facet.id) === String(id))
+    return item ? item.count : 0
+  }
+
   const selectSubmission = async (submission) => {
     try {
       setSelectedSubmission(submission)
@@ -230,7 +260,7 @@ export default function Approvals() {
                 <option value="">Todas as empresas</option>
                 {companies.map((company) => (
                   <option key={company.id} value={company.id}>
-                    [{company.code}] {company.name}
+                    [{company.code}] {company.name} ({facetCount(facets.company, company.id)})
                   </option>
                 ))}
               </select>
@@ -246,7 +276,7 @@ export default function Approvals() {
                 <option value="">Todos os tipos</option>
                 {obligationTypes.map((type) => (
                   <option key={type.id} value={type.id}>
-                    {type.name}
+                    {type.name} ({facetCount(facets.obligation_type, type.id)})
                   </option>
                 ))}
               </select>
@@ -260,10 +290,11 @@ export default function Approvals() {
                 className="w-full p-3 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent"
               >
                 <option value="">Todos os status</option>
-                <option value="pending_review">Pendente de Revisão</option>
-                <option value="approved">Aprovada</option>
-                <option value="rejected">Recusada</option>
-                <option value="needs_revision">Necessita Revisão</option>
+                {['pending_review', 'approved', 'rejected', 'needs_revision'].map((status) => (
+                  <option key={status} value={status}>
+                    {statusInfo[status]?.label || status} ({facets.status?.[status] || 0})
+                  </option>
+                ))}
               </select>
             </div>
           </div>
@@ -283,7 +314,7 @@ export default function Approvals() {
           <div className="bg-white rounded-lg shadow-lg">
             <div className="px-6 py-4 border-b border-gray-200">
               <h2 className="text-xl font-bold text-gray-900">
-                Entregas ({pendingApprovals.length})
+                Entregas ({totalCount})
               </h2>
             </div>
 
@@ -346,6 +377,17 @@ export default function Approvals() {
                       </div>
                     </div>
                   ))}
+                  {nextCursor && (
+                    <div className="p-4 text-center">
+                      <button
+                        onClick={loadMoreApprovals}
+                        disabled={loadingMore}
+                        className="px-4 py-2 text-sm font-medium text-blue-600 hover:text-blue-800 disabled:opacity-50"
+                      >
+                        {loadingMore ? 'Carregando...' : 'Carregar mais'}
+                      </button>
+                    </div>
+                  )}
                 </div>
               )}
             </div>
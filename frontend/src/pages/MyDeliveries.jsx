@@ -17,6 +17,10 @@ export default function MyDeliveries() {
   const [message, setMessage] = useState('')
   const [messageType, setMessageType] = useState('')
   const [statusFilter, setStatusFilter] = useState('')
+  const [totalCount, setTotalCount] = useState(0)
+  const [statusCounts, setStatusCounts] = useState({})
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   
   const [resubmitForm, setResubmitForm] = useState({
     delivery_date: '',
@@ -34,6 +38,9 @@ export default function MyDeliveries() {
       setLoading(true)
       const data = await getMyDeliveries(statusFilter)
       setDeliveries(data.results || [])
+      setTotalCount(data.count || 0)
+      setStatusCounts(data.status_counts || {})
+      setNextCursor(data.next_cursor || null)
     } catch (error) {
       showMessage(`Erro ao carregar entregas: ${error.message}`, 'error')
     } finally {
@@ -41,6 +48,20 @@ export default function MyDeliveries() {
     }
   }
 
+  const loadMoreDeliveries = async () => {
+    if (!nextCursor) return
+    try {
+      setLoadingMore(true)
+      const data = await getMyDeliveries(statusFilter, nextCursor)
+      setDeliveries(prev => [...prev, ...(data.results || [])])
+      setNextCursor(data.next_cursor || null)
+    } catch (error) {
+      showMessage(`Erro ao carregar entregas: ${error.message}`, 'error')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const selectDelivery = async (delivery) => {
     try {
       setSelectedDelivery(delivery)
@@ -179,10 +200,10 @@ export default function MyDeliveries() {
             className="w-full md:w-64 p-3 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent"
           >
             <option value="">Todos os status</option>
-            <option value="pending_review">Pendente de Revisão</option>
-            <option value="approved">Aprovada</option>
-            <option value="rejected">Recusada</option>
-            <option value="needs_revision">Necessita Revisão</option>
+            <option value="pending_review">Pendente de Revisão ({statusCounts.pending_review || 0})</option>
+            <option value="approved">Aprovada ({statusCounts.approved || 0})</option>
+            <option value="rejected">Recusada ({statusCounts.rejected || 0})</option>
+            <option value="needs_revision">Necessita Revisão ({statusCounts.needs_revision || 0})</option>
           </select>
         </div>
 
@@ -191,7 +212,7 @@ export default function MyDeliveries() {
           <div className="bg-white rounded-lg shadow-lg">
             <div className="px-6 py-4 border-b border-gray-200">
               <h2 className="text-xl font-bold text-gray-900">
-                Suas Entregas ({deliveries.length})
+                Suas Entregas ({totalCount})
               </h2>
             </div>
 
@@ -241,6 +262,17 @@ export default function MyDeliveries() {
                       </div>
                     </div>
                   ))}
+                  {nextCursor && (
+                    <div className="p-4 text-center">
+                      <button
+                        onClick={loadMoreDeliveries}
+                        disabled={loadingMore}
+                        className="px-4 py-2 text-sm font-medium text-blue-600 hover:text-blue-800 disabled:opacity-50"
+                      >
+                        {loadingMore ? 'Carregando...' : 'Carregar mais'}
+                      </button>
+                    </div>
+                  )}
                 </div>
               )}
             </div>
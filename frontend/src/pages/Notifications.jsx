@@ -8,14 +8,28 @@ export default function Notifications() {
   const [loading, setLoading] = useState(true)
   const [filter, setFilter] = useState('all') // all, unread, read
   const [typeFilter, setTypeFilter] = useState('all') // all, due_soon, overdue, approval, reminder
+  const [totalCount, setTotalCount] = useState(0)
+  const [unreadCount, setUnreadCount] = useState(0)
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const navigate = useNavigate()
 
-  // Buscar notificações
+  // Filtros aplicados no servidor ('Lidas' é filtrado sobre as páginas carregadas)
+  const queryFilters = (cursor = null) => ({
+    unreadOnly: filter === 'unread',
+    type: typeFilter !== 'all' ? typeFilter : '',
+    cursor
+  })
+
+  // Buscar notificações (primeira página)
   const fetchNotifications = async () => {
     try {
       setLoading(true)
-      const data = await getNotifications()
-      setNotifications(data || [])
+      const data = await getNotifications(queryFilters())
+      setNotifications(data.results || [])
+      setNextCursor(data.next_cursor || null)
+      setTotalCount(data.total || 0)
+      setUnreadCount(data.unread || 0)
     } catch (err) {
       console.error('Erro ao carregar notificações:', err)
     } finally {
@@ -23,9 +37,24 @@ export default function Notifications() {
     }
   }
 
+  // Próxima página
+  const loadMoreNotifications = async () => {
+    if (!nextCursor) return
+    try {
+      setLoadingMore(true)
+      const data = await getNotifications(queryFilters(nextCursor))
+      setNotifications(prev => [...prev, ...(data.results || [])])
+      setNextCursor(data.next_cursor || null)
+    } catch (err) {
+      console.error('Erro ao carregar notificações:', err)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   useEffect(() => {
     fetchNotifications()
-  }, [])
+  }, [filter, typeFilter])
 
   // Marcar como lida
   const handleMarkAsRead = async (notificationId) => {
@@ -53,6 +82,8 @@ export default function Notifications() {
       navigate('/my-deliveries')
     } else if (notification.obligation) {
       navigate('/obligations')
+    } else if (notification.dispatch) {
+      navigate('/despacho')
     }
   }
 
@@ -96,10 +127,6 @@ export default function Notifications() {
     }
   }
 
-  // Estatísticas
-  const totalCount = notifications.length
-  const unreadCount = notifications.filter(n => !n.is_read).length
-
   if (loading) {
     return (
       <div className="min-h-screen bg-gray-50 p-6">
@@ -281,7 +308,7 @@ export default function Notifications() {
                               Marcar como lida
                             </button>
                           )}
-                          {(notification.type === 'approval' || notification.obligation) && (
+                          {(notification.type === 'approval' || notification.obligation || notification.dispatch) && (
                             <button
                               onClick={() => handleNavigate(notification)}
                               className="flex items-center gap-1 text-sm text-gray-600 hover:text-gray-900 font-medium"
@@ -299,6 +326,18 @@ export default function Notifications() {
             })}
           </div>
         )}
+
+        {nextCursor && (
+          <div className="mt-6 text-center">
+            <button
+              onClick={loadMoreNotifications}
+              disabled={loadingMore}
+              className="px-4 py-2 text-sm font-medium text-blue-600 hover:text-blue-800 disabled:opacity-50"
+            >
+              {loadingMore ? 'Carregando...' : 'Carregar mais'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   )
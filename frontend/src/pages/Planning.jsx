@@ -508,7 +508,7 @@ export default function Planning() {
                           </div>
                         )}
                         
-                        {results.data.emails_sent !== undefined && (
+                        {results.data.emails_queued !== undefined && (
                           <div className="bg-white rounded-lg p-3 border border-purple-200">
                             <div className="flex items-center">
                               <div className="flex-shrink-0">
@@ -517,8 +517,8 @@ export default function Planning() {
                                 </div>
                               </div>
                               <div className="ml-3">
-                                <p className="text-xs font-medium text-purple-800">Emails Enviados</p>
-                                <p className="text-lg font-bold text-purple-900">{results.data.emails_sent}</p>
+                                <p className="text-xs font-medium text-purple-800">Emails na Fila</p>
+                                <p className="text-lg font-bold text-purple-900">{results.data.emails_queued}</p>
                               </div>
                             </div>
                           </div>
@@ -6,6 +6,9 @@ import {
 import Layout from '../components/Layout'
 import { ChevronDown, ChevronUp, Plus, Upload, List, RotateCcw, FileText, Download } from 'lucide-react'
 
+// Máximo de obrigações carregadas no select (o restante é encontrado pela busca)
+const OBLIGATIONS_LIMIT = 50
+
 // Função para formatar data sem problemas de timezone
 function formatDateWithoutTimezone(dateString) {
   if (!dateString) return ''
@@ -32,6 +35,9 @@ export default function Submissions() {
   // Estados para modo individual
   const [selectedCompany, setSelectedCompany] = useState('')
   const [obligations, setObligations] = useState([])
+  const [loadingObligations, setLoadingObligations] = useState(false)
+  // Busca no servidor: o endpoint retorna no máximo OBLIGATIONS_LIMIT itens
+  const [obligationSearch, setObligationSearch] = useState({ q: '', competence: '' })
   const [individualForm, setIndividualForm] = useState({
     obligation: '',
     delivery_date: '',
@@ -49,6 +55,9 @@ export default function Submissions() {
 
   // Estados para lista de entregas
   const [deliveries, setDeliveries] = useState([])
+  const [deliveriesTotal, setDeliveriesTotal] = useState(0)
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [filters, setFilters] = useState({
     search: '',
     company: '',
@@ -61,12 +70,21 @@ export default function Submissions() {
   }, [])
 
   useEffect(() => {
-    if (selectedCompany) {
-      loadCompanyObligations(selectedCompany)
-    } else {
+    // Nova empresa: limpa a busca e a obrigação escolhida da empresa anterior
+    setObligationSearch({ q: '', competence: '' })
+    setObligations([])
+    setIndividualForm(prev => ({ ...prev, obligation: '' }))
+  }, [selectedCompany])
+
+  useEffect(() => {
+    if (!selectedCompany) {
       setObligations([])
+      return
     }
-  }, [selectedCompany])
+    // Aguarda a digitação parar antes de consultar
+    const timer = setTimeout(() => loadCompanyObligations(selectedCompany), 300)
+    return () => clearTimeout(timer)
+  }, [selectedCompany, obligationSearch])
 
   useEffect(() => {
     loadDeliveries()
@@ -83,30 +101,61 @@ export default function Submissions() {
 
   async function loadCompanyObligations(companyId) {
     try {
-      setLoading(true)
-      const data = await getCompanyObligations(companyId)
-      setObligations(data)
+      setLoadingObligations(true)
+      const competence = obligationSearch.competence.trim()
+      const data = await getCompanyObligations(companyId, {
+        q: obligationSearch.q.trim(),
+        // só filtra com a competência completa (MM/AAAA)
+        competence: /^\d{2}\/\d{4}$/.test(competence) ? competence : '',
+        limit: OBLIGATIONS_LIMIT
+      })
+      // Mantém a obrigação já selecionada mesmo que saia do resultado da busca
+      setObligations(prev => {
+        const selected = prev.find(obligation => obligation.id == individualForm.obligation)
+        if (selected && !data.some(obligation => obligation.id == selected.id)) {
+          return [selected, ...data]
+        }
+        return data
+      })
     } catch (error) {
       showMessage('Erro ao carregar obrigações: ' + error.message, 'error')
       setObligations([])
     } finally {
-      setLoading(false)
+      setLoadingObligations(false)
     }
   }
 
   async function loadDeliveries() {
     try {
       setLoading(true)
-      const data = await getDeliveries(filters)
+      const data = await getDeliveries(filters, null, true)
       setDeliveries(data.deliveries || [])
+      setDeliveriesTotal(data.total || 0)
+      setNextCursor(data.next_cursor || null)
     } catch (error) {
       showMessage('Erro ao carregar entregas: ' + error.message, 'error')
       setDeliveries([])
+      setDeliveriesTotal(0)
+      setNextCursor(null)
     } finally {
       setLoading(false)
     }
   }
 
+  async function loadMoreDeliveries() {
+    if (!nextCursor) return
+    try {
+      setLoadingMore(true)
+      const data = await getDeliveries(filters, nextCursor)
+      setDeliveries(prev => [...prev, ...(data.deliveries || [])])
+      setNextCursor(data.next_cursor || null)
+    } catch (error) {
+      showMessage('Erro ao carregar entregas: ' + error.message, 'error')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   function showMessage(text, type = 'success') {
     setMessage(text)
     setMessageType(type)
@@ -324,7 +373,7 @@ export default function Submissions() {
                 <h2 className="text-lg font-semibold text-gray-900">{section.title}</h2>
                 {section.id === 'lista' && (
                   <span className="bg-gray-100 text-gray-600 px-2 py-1 rounded-full text-sm">
-                    {deliveries.length} entrega(s)
+                    {deliveriesTotal} entrega(s)
                   </span>
                 )}
               </div>
@@ -367,7 +416,26 @@ export default function Submissions() {
                         <label className="block text-sm font-medium text-gray-700 mb-1">
                           Obrigação *
                         </label>
-                        {loading ? (
+                        {selectedCompany && (
+                          <div className="flex gap-2 mb-2">
+                            <input
+                              type="text"
+                              value={obligationSearch.q}
+                              onChange={(e) => setObligationSearch(prev => ({ ...prev, q: e.target.value }))}
+                              placeholder="Buscar por obrigação, tipo ou UF"
+                              className="flex-1 p-2 border border-gray-300 rounded-lg text-sm focus:ring-2 focus:ring-blue-500 focus:border-transparent"
+                            />
+                            <input
+                              type="text"
+                              value={obligationSearch.competence}
+                              onChange={(e) => setObligationSearch(prev => ({ ...prev, competence: e.target.value }))}
+                              placeholder="Competência (MM/AAAA)"
+                              maxLength={7}
+                              className="w-44 p-2 border border-gray-300 rounded-lg text-sm focus:ring-2 focus:ring-blue-500 focus:border-transparent"
+                            />
+                          </div>
+                        )}
+                        {loadingObligations && obligations.length === 0 ? (
                           <div className="w-full p-3 border border-gray-300 rounded-lg bg-gray-100">
                             Carregando obrigações...
                           </div>
@@ -393,6 +461,11 @@ export default function Submissions() {
                             Selecione uma empresa primeiro
                           </p>
                         )}
+                        {selectedCompany && obligations.length >= OBLIGATIONS_LIMIT && (
+                          <p className="mt-1 text-sm text-gray-500">
+                            Mostrando as {OBLIGATIONS_LIMIT} obrigações com vencimento mais recente. Use a busca para encontrar outras.
+                          </p>
+                        )}
                         {selectedCompany && individualForm.obligation && (() => {
                           const selectedObligation = obligations.find(obligation => obligation.id == individualForm.obligation)
                           return selectedObligation?.has_submission && (
@@ -761,6 +834,17 @@ export default function Submissions() {
                           </tbody>
                         </table>
                       </div>
+                      {nextCursor && (
+                        <div className="p-4 text-center">
+                          <button
+                            onClick={loadMoreDeliveries}
+                            disabled={loadingMore}
+                            className="px-4 py-2 text-sm font-medium text-blue-600 hover:text-blue-800 disabled:opacity-50"
+                          >
+                            {loadingMore ? 'Carregando...' : 'Carregar mais'}
+                          </button>
+                        </div>
+                      )}
                     </div>
                   </div>
                 )}